@@ -1,48 +1,198 @@
 # backend/app.py
+import hmac
+import json
+import logging
 import os
 import sys
-from flask import Flask, request, jsonify
+import threading
+import time
+import click
+from flask import Flask, Blueprint, current_app, has_app_context, request, jsonify
 from flask_cors import CORS
-import requests
-import uuid
-from datetime import datetime, timedelta
-import jwt
-from sqlalchemy import text  
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
 
 # Add the root directory to Python path so we can import models
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Now import from models (which is at root level)
-from models.database import db
+from models.database import db, configure_database, foreign_key_violations, print_database_report
 from models.user import User
 from models.transfer import Transfer
 from models.exchange_rate import ExchangeRate
+from models.rate_quote import RateQuote
+from models.worker_lease import WorkerLease
+from models.currency import Currency, sync_currencies
+from services.json_provider import init_json
+from services.precomputed import cached_json_response, STATIC_CACHE_CONTROL
+from services.metrics import REGISTRY, init_metrics, record_rate_cache, timed_upstream_get
+from services.query_profiler import init_query_profiler
+from services.request_profiler import init_request_profiler
+from services.structured_logging import init_logging
+from services.rate_stream import RATE_STREAM, init_rate_stream, parse_last_version, snapshot_id
+from services.rate_lookup import PAIR_RATES
+from services.conversion_graph import RATE_PLANS, ConversionPlanner, Route
+from services.rate_history import RESOLUTIONS, init_rate_history, rate_history, record_snapshot
+from services.rate_ttl import RATE_VOLATILITY, init_rate_ttl, snapshot_currencies
+from services.fee_schedule import current_schedule, init_fee_schedule
+from services.id_generator import init_id_generator, new_tracking_number
+from services.transfer_reads import changes_since, export_csv, list_transfers
+from services.rate_quotes import QuoteError, init_rate_quotes, issue_quote, purge_expired_quotes, redeem_quote
+
+# `requests`, `jwt` and the NumPy-backed fee simulation are imported inside the
+# handlers that use them, so importing this module (worker boot, test
+# collection) stays cheap.
 
 # JWT Secret Key
 SECRET_KEY = os.getenv('SECRET_KEY', 'remitlite-secret-key-2024')
 
-def create_app():
-    """Application factory pattern"""
+logger = logging.getLogger('remitlite.api')
+
+api = Blueprint('api', __name__)
+
+def create_app(config=None):
+    """Application factory pattern.
+
+    Building the app has no side effects: it doesn't touch the database,
+    create tables, make directories or print anything. The instance folder
+    and the ones under it are created on first use. Use
+    `flask --app app init-db` to create the schema.
+    """
     app = Flask(__name__)
+    if config:
+        app.config.update(config)
     CORS(app)
+    init_json(app)
+    
+    # JSON-lines logs written off the request thread, tagged with X-Request-ID
+    init_logging(app)
     
-    # Configure database
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///remitlite.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Configure database from DATABASE_URL / DB_* / SQLITE_* settings
+    configure_database(app)
     
-    # Initialize database with app
-    db.init_app(app)
+    # Fee brackets come from fee_schedule.json (FEE_SCHEDULE_PATH), reloaded on change
+    init_fee_schedule(app)
     
-    # Create tables if they don't exist
+    # Every snapshot is queued for this app's rate history (RATE_HISTORY_DIR)
+    init_rate_history(app)
+    # Per-currency cache TTLs between RATE_TTL_MIN and RATE_TTL_MAX
+    init_rate_ttl(app)
+    # Locked quotes signed with SECRET_KEY, valid for RATE_QUOTE_TTL seconds
+    init_rate_quotes(app, SECRET_KEY)
+    # Transfer IDs and tracking numbers from a worker ID leased in the database
+    init_id_generator(app)
+    # Listener cap for processes that also serve the API (RATE_STREAM_MAX_SUBSCRIBERS)
+    init_rate_stream(app)
+    
+    app.register_blueprint(api)
+    register_commands(app)
+    
+    # Per-route latency, status counts and SQL counts, exposed at /api/metrics
+    # plus opt-in per-request SQL profiling (SQL_PROFILER=1)
     with app.app_context():
+        init_metrics(app, db.engine)
+        init_query_profiler(app, db.engine)
+    
+    # On-demand sampling profiler (X-Profile header or 1-in-N sampling)
+    init_request_profiler(app)
+    
+    return app
+
+def register_commands(app):
+    """Explicit maintenance commands, run via `flask --app app <command>`"""
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create database tables if they don't exist."""
+        from services.storage_migration import add_version_column, storage_format
+        
+        with db.engine.connect() as connection:
+            if storage_format(connection) == 'legacy':
+                # This code can't read legacy tables; don't let a release start it on them
+                raise click.ClickException("users/transfers use the legacy storage format: "
+                                           "run `flask --app app migrate-storage --swap` first")
         db.create_all()
+        with db.engine.begin() as connection:
+            sync_currencies(connection)
+            versioned = add_version_column(connection)
+            orphans = foreign_key_violations(connection)
         print("✅ Database tables created!")
+        for table, count in orphans.items():
+            # Enforced since SQLITE_FOREIGN_KEYS=ON: writes touching these rows will fail
+            print(f"⚠️  {table}: {count:,} rows reference missing parents (PRAGMA foreign_key_check); "
+                  "fix them or set SQLITE_FOREIGN_KEYS=OFF")
+        if versioned:
+            print("✅ Added transfers.version for ?since= delta sync (existing rows are version 0)")
+        print_database_report(app)
     
-    return app
+    @app.cli.command('migrate-storage')
+    @click.option('--chunk-size', default=5000, show_default=True, help='Rows per transaction.')
+    @click.option('--swap', is_flag=True, help='Finish the copy under a write lock and swap the tables in.')
+    @click.option('--drop-legacy', is_flag=True, help='Drop the tables a swap left behind.')
+    @click.option('--if-legacy', is_flag=True, help='Do nothing unless the tables are still legacy (for release steps).')
+    def migrate_storage_command(chunk_size, swap, drop_legacy, if_legacy):
+        """Copy users/transfers to compact keys and minor-unit amounts, in chunks."""
+        from services.storage_migration import (StorageMigration, StorageMigrationError, storage_format,
+                                                drop_legacy as drop)
+        
+        if if_legacy:
+            with db.engine.connect() as connection:
+                if storage_format(connection) != 'legacy':
+                    print("✅ Storage is already compact (or empty); nothing to migrate")
+                    return
+        if drop_legacy:
+            print(f"✅ Dropped {', '.join(drop(db.engine)) or 'nothing'}")
+            return
+        migration = StorageMigration(db.engine, chunk_size=chunk_size, log=print)
+        try:
+            result = migration.swap() if swap else migration.copy()
+        except StorageMigrationError as e:
+            raise click.ClickException(str(e))
+        print(f"✅ {result}" + ("" if swap else "; run again with --swap to switch over"))
+    
+    @app.cli.command('db-report')
+    def db_report_command():
+        """Show the effective database settings."""
+        print_database_report(app)
+    
+    @app.cli.command('simulate-fees')
+    @click.argument('schedules', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+    @click.option('--since', type=click.DateTime(), help='Only transfers created at or after this time.')
+    @click.option('--until', type=click.DateTime(), help='Only transfers created before this time.')
+    @click.option('--status', 'statuses', multiple=True, help='Only transfers with this status (repeatable).')
+    @click.option('--chunk-size', default=250000, show_default=True, help='Rows per chunk.')
+    def simulate_fees_command(schedules, since, until, statuses, chunk_size):
+        """Revenue impact of candidate fee schedule files over stored transfers."""
+        from services.fee_simulation import simulate
+        
+        candidates = {}
+        for path in schedules:
+            with open(path) as f:
+                candidates[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+        candidates.setdefault('current_schedule', current_schedule())
+        report = simulate(db.engine, candidates, since=since, until=until,
+                          statuses=statuses or None, chunk_size=chunk_size)
+        print(json.dumps(report, indent=2))
 
-# Create the Flask app
-app = create_app()
+    @app.cli.command('compact-rate-history')
+    def compact_rate_history_command():
+        """Fold and expire rate history past its retention."""
+        store = rate_history(app)
+        changed = store.compact()
+        print(f"✅ Compacted {changed} points/bars in {store.directory or 'memory'}")
+
+    @app.cli.command('purge-rate-quotes')
+    def purge_rate_quotes_command():
+        """Delete expired rate quotes."""
+        print(f"✅ Purged {purge_expired_quotes()} expired rate quotes")
+
+def __getattr__(name):
+    # `gunicorn --chdir backend app:app` and `from app import app` still work, but the
+    # default app is only built the first time somebody asks for it
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ==================== EXCHANGE RATES CACHE & ENDPOINTS ====================
 
@@ -50,10 +200,18 @@ app = create_app()
 exchange_rates_cache = {
     'data': None,
     'timestamp': None,
-    'expires_at': None
+    'expires_at': None,  # when the first currency falls due
+    'due': {},  # currency -> when it needs refreshing, from its volatility
+    'source': None,
+    'version': 0  # bumped on every new snapshot; keys the precomputed response
 }
 
-CACHE_DURATION = 300  # 5 minutes in seconds
+CACHE_DURATION = 300  # 5 minutes in seconds; fallback rates and unknown volatility
+BASE_CURRENCIES = ['USD', 'EUR', 'GBP']
+
+# Held by whoever is fetching rates, so concurrent misses share one fetch
+_rate_refresh_lock = threading.Lock()
+_rate_refresh_thread = None
 
 def get_cached_rates():
     """Get cached rates if they are still valid"""
@@ -63,11 +221,62 @@ def get_cached_rates():
         return exchange_rates_cache['data']
     return None
 
-def set_cached_rates(rates_data):
-    """Set rates in cache with expiration"""
+def set_cached_rates(rates_data, source='external_api', refreshed=None):
+    """Set rates in cache; each currency expires after its own TTL
+
+    `refreshed` names the currencies that were just fetched (default: all of
+    them). The others keep their due time.
+    """
+    now = datetime.now()
+    if refreshed is None:
+        refreshed = snapshot_currencies(rates_data)
+    if source != 'fallback':
+        RATE_VOLATILITY.observe(rates_data, now.timestamp(), refreshed)
     exchange_rates_cache['data'] = rates_data
-    exchange_rates_cache['timestamp'] = datetime.now()
-    exchange_rates_cache['expires_at'] = datetime.now() + timedelta(seconds=CACHE_DURATION)
+    exchange_rates_cache['source'] = source
+    exchange_rates_cache['version'] += 1
+    exchange_rates_cache['timestamp'] = now
+    # Best route for every pair, so conversions are a dict lookup
+    RATE_PLANS.rebuild(rates_data, exchange_rates_cache['version'])
+    schedule_rate_refresh(snapshot_currencies(rates_data), refreshed, fixed_ttl=source == 'fallback')
+    # Push the changed pairs to /api/rates/stream subscribers
+    RATE_STREAM.publish(rates_data)
+    # Written by the history's background thread, not this one
+    record_snapshot(rates_data)
+
+def schedule_rate_refresh(currencies, refreshed, fixed_ttl=False):
+    """Due times: refreshed currencies get their TTL, overdue ones retry after the minimum"""
+    now = datetime.now()
+    previous = exchange_rates_cache['due']
+    due = {}
+    for currency in currencies:
+        if currency in refreshed:
+            ttl = CACHE_DURATION if fixed_ttl else RATE_VOLATILITY.ttl(currency)
+        elif previous.get(currency) and previous[currency] > now:
+            due[currency] = previous[currency]
+            continue
+        else:
+            ttl = RATE_VOLATILITY.min_ttl
+        due[currency] = now + timedelta(seconds=ttl)
+    exchange_rates_cache['due'] = due
+    exchange_rates_cache['expires_at'] = min(due.values()) if due else now
+
+def due_currencies():
+    now = datetime.now()
+    return {currency for currency, at in exchange_rates_cache['due'].items() if at <= now}
+
+def get_rate_cache_age():
+    """Seconds since the cached snapshot was fetched, None when empty"""
+    if not exchange_rates_cache['timestamp']:
+        return None
+    return (datetime.now() - exchange_rates_cache['timestamp']).total_seconds()
+
+REGISTRY.gauge('remitlite_rate_cache_age_seconds', 'Age of the cached rate snapshot',
+               callback=get_rate_cache_age)
+REGISTRY.gauge('remitlite_rate_cache_version', 'Version of the cached rate snapshot',
+               callback=lambda: exchange_rates_cache['version'])
+REGISTRY.gauge('remitlite_rate_stream_subscribers', 'Open /api/rates/stream connections',
+               callback=lambda: RATE_STREAM.subscribers)
 
 def get_fallback_rates():
     """Comprehensive fallback exchange rates"""
@@ -110,81 +319,183 @@ def get_fallback_rates():
         }
     }
 
-@app.route('/api/exchange-rates', methods=['GET'])
+_fallback_plans = None
+
+def fallback_plans():
+    """Routes over the fallback table, built on first use"""
+    global _fallback_plans
+    if _fallback_plans is None:
+        _fallback_plans = ConversionPlanner().rebuild(get_fallback_rates())
+    return _fallback_plans
+
+def fetch_provider_rates(bases=BASE_CURRENCIES, symbols=None):
+    """Latest rates for each base currency from the provider; {} if every call fails"""
+    import requests
+    
+    all_rates = {}
+    
+    for base_currency in bases:
+        url = f'https://api.exchangerate.host/latest?base={base_currency}'
+        if symbols:
+            url += f"&symbols={','.join(sorted(symbols))}"
+        try:
+            response = timed_upstream_get('latest', url, timeout=5)
+            
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('success'):
+                    # Extract major currencies and African currencies
+                    target_currencies = {
+                        # Major currencies
+                        'USD', 'EUR', 'GBP', 'JPY', 'CAD', 'AUD', 'CHF', 'CNY',
+                        # African currencies  
+                        'ZAR', 'NGN', 'EGP', 'KES', 'GHS', 'MAD', 'XOF', 'ETB',
+                        'UGX', 'RWF', 'TZS', 'AOA',
+                        # Asian currencies
+                        'INR', 'SGD', 'HKD', 'KRW', 'TRY', 'AED', 'SAR', 'THB', 'MYR'
+                    }
+                    
+                    filtered_rates = {}
+                    for currency in target_currencies:
+                        if currency in data['rates']:
+                            filtered_rates[currency] = data['rates'][currency]
+                    
+                    all_rates[base_currency] = filtered_rates
+                    
+        except requests.exceptions.Timeout:
+            logger.warning("Timeout fetching rates", extra={'base': base_currency})
+            continue
+        except Exception as e:
+            logger.warning("Error fetching rates: %s", e, extra={'base': base_currency})
+            continue
+    
+    return all_rates
+
+def refresh_rate_snapshot():
+    """Fetch the currencies that are due (all of them for an empty or fallback cache)
+
+    Returns 'external_api', 'fallback', or 'cache' when the provider was
+    unreachable and the previous rates stay in place until the retry.
+    """
+    current = exchange_rates_cache['data']
+    if not current or exchange_rates_cache['source'] != 'external_api':
+        all_rates = fetch_provider_rates()
+        if all_rates:
+            set_cached_rates(all_rates)
+            return 'external_api'
+        set_cached_rates(get_fallback_rates(), source='fallback')
+        return 'fallback'
+    
+    # One call for the due currencies against the anchor base; the other
+    # bases' rows are cross rates through it
+    anchor = BASE_CURRENCIES[0]
+    due = due_currencies() or snapshot_currencies(current)
+    fetched = fetch_provider_rates([anchor], None if anchor in due else due).get(anchor)
+    if not fetched:
+        schedule_rate_refresh(snapshot_currencies(current), set())
+        return 'cache'
+    refreshed = snapshot_currencies(current) if anchor in due else due & (set(fetched) | {anchor})
+    merged = {base: dict(quotes) for base, quotes in current.items()}
+    merged.setdefault(anchor, {}).update(fetched)
+    anchor_rates = merged[anchor]
+    for base in BASE_CURRENCIES[1:]:
+        if not anchor_rates.get(base):
+            continue
+        row = merged.setdefault(base, {})
+        quotes = anchor_rates if base in refreshed else refreshed & set(anchor_rates)
+        for quote in quotes:
+            row[quote] = round(anchor_rates[quote] / anchor_rates[base], 6)
+    set_cached_rates(merged, refreshed=refreshed)
+    return 'external_api'
+
+def load_rate_snapshot():
+    """Fill an empty cache; concurrent callers wait for the one fetch. Returns its source"""
+    with _rate_refresh_lock:
+        if exchange_rates_cache['data'] is not None:
+            return 'cache'
+        return refresh_rate_snapshot()
+
+def refresh_rates_in_background():
+    """Refresh the due currencies on a background thread; False if a refresh is already running"""
+    global _rate_refresh_thread
+    if not _rate_refresh_lock.acquire(blocking=False):
+        return False
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def run():
+        try:
+            if app is None:
+                refresh_rate_snapshot()
+            else:
+                # The app's context, so its rate history records the snapshot
+                with app.app_context():
+                    refresh_rate_snapshot()
+        except Exception:
+            logger.exception("Background rate refresh failed")
+        finally:
+            _rate_refresh_lock.release()
+
+    _rate_refresh_thread = threading.Thread(target=run, name='rate-refresh', daemon=True)
+    _rate_refresh_thread.start()
+    return True
+
+def wait_for_rate_refresh(timeout=None):
+    """Wait for the background refresh started last, if any"""
+    if _rate_refresh_thread is not None:
+        _rate_refresh_thread.join(timeout)
+
+def ensure_rate_snapshot():
+    """Current rates without waiting on the provider, unless the cache is empty
+
+    Once a currency is due the table is served stale while a background
+    thread refetches the due currencies, so one volatile currency doesn't
+    make every request wait on an upstream call.
+    """
+    cached_rates = get_cached_rates()
+    if cached_rates:
+        return cached_rates
+    if exchange_rates_cache['data'] is None:
+        load_rate_snapshot()
+    else:
+        refresh_rates_in_background()
+    return exchange_rates_cache['data']
+
+@api.route('/api/exchange-rates', methods=['GET'])
 def get_exchange_rates():
     """Get comprehensive exchange rates with caching"""
     try:
         # Check cache first
-        cached_rates = get_cached_rates()
-        if cached_rates:
-            return jsonify({
-                'rates': cached_rates,
-                'source': 'cache',
-                'cached': True,
-                'timestamp': exchange_rates_cache['timestamp'].isoformat()
-            })
-        
-        # If no cache, fetch from external API
-        base_currencies = ['USD', 'EUR', 'GBP']
-        all_rates = {}
-        
-        for base_currency in base_currencies:
-            try:
-                response = requests.get(
-                    f'https://api.exchangerate.host/latest?base={base_currency}',
-                    timeout=5
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        # Extract major currencies and African currencies
-                        target_currencies = {
-                            # Major currencies
-                            'USD', 'EUR', 'GBP', 'JPY', 'CAD', 'AUD', 'CHF', 'CNY',
-                            # African currencies  
-                            'ZAR', 'NGN', 'EGP', 'KES', 'GHS', 'MAD', 'XOF', 'ETB',
-                            'UGX', 'RWF', 'TZS', 'AOA',
-                            # Asian currencies
-                            'INR', 'SGD', 'HKD', 'KRW', 'TRY', 'AED', 'SAR', 'THB', 'MYR'
-                        }
-                        
-                        filtered_rates = {}
-                        for currency in target_currencies:
-                            if currency in data['rates']:
-                                filtered_rates[currency] = data['rates'][currency]
-                        
-                        all_rates[base_currency] = filtered_rates
-                        
-            except requests.exceptions.Timeout:
-                print(f"Timeout fetching rates for {base_currency}")
-                continue
-            except Exception as e:
-                print(f"Error fetching rates for {base_currency}: {e}")
-                continue
-        
-        # If we got some rates, cache them
-        if all_rates:
-            set_cached_rates(all_rates)
-            return jsonify({
-                'rates': all_rates,
-                'source': 'external_api',
-                'cached': False,
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            # If external API fails, return fallback rates
-            fallback_rates = get_fallback_rates()
-            set_cached_rates(fallback_rates)
-            return jsonify({
-                'rates': fallback_rates,
-                'source': 'fallback',
-                'cached': False,
-                'timestamp': datetime.now().isoformat()
-            })
+        fresh = get_cached_rates() is not None
+        record_rate_cache('exchange-rates', fresh)
+        if exchange_rates_cache['data'] is not None:
+            snapshot = dict(exchange_rates_cache)
+            if not fresh:
+                # Some currencies are due: serve this table while they refresh
+                refresh_rates_in_background()
+            # Serialized once per snapshot; unchanged clients get a 304
+            return cached_json_response(
+                'exchange-rates', snapshot['version'],
+                lambda: {
+                    'rates': snapshot['data'],
+                    'source': 'cache',
+                    'cached': True,
+                    'version': snapshot['version'],
+                    'timestamp': snapshot['timestamp'].isoformat()
+                }
+            )
+        
+        # Cold cache: fetch everything now, once for all waiting requests;
+        # the provider being down means fallback rates
+        source = load_rate_snapshot()
+        return jsonify({
+            'rates': exchange_rates_cache['data'],
+            'source': source,
+            'cached': False,
+            'timestamp': datetime.now().isoformat()
+        })
             
     except Exception as e:
-        print(f"Error in get_exchange_rates: {e}")
+        logger.exception("Error in get_exchange_rates")
         # Return fallback rates in case of complete failure
         fallback_rates = get_fallback_rates()
         return jsonify({
@@ -194,7 +505,7 @@ def get_exchange_rates():
             'timestamp': datetime.now().isoformat()
         })
 
-@app.route('/api/convert-rate', methods=['GET'])
+@api.route('/api/convert-rate', methods=['GET'])
 def convert_exchange_rate():
     """Convert between two specific currencies"""
     try:
@@ -202,71 +513,25 @@ def convert_exchange_rate():
         to_currency = request.args.get('to', 'EUR').upper()
         amount = float(request.args.get('amount', 1))
         
-        if from_currency == to_currency:
-            return jsonify({
-                'from': from_currency,
-                'to': to_currency,
-                'amount': amount,
-                'converted_amount': amount,
-                'rate': 1.0
-            })
-        
-        # Try to get rate from cache first
-        cached_rates = get_cached_rates()
-        if cached_rates and from_currency in cached_rates:
-            if to_currency in cached_rates[from_currency]:
-                rate = cached_rates[from_currency][to_currency]
-                return jsonify({
-                    'from': from_currency,
-                    'to': to_currency,
-                    'amount': amount,
-                    'converted_amount': round(amount * rate, 2),
-                    'rate': round(rate, 4)
-                })
-        
-        # If not in cache, fetch directly from API
-        response = requests.get(
-            f'https://api.exchangerate.host/convert?from={from_currency}&to={to_currency}',
-            timeout=5
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('success'):
-                rate = data['result']
-                return jsonify({
-                    'from': from_currency,
-                    'to': to_currency,
-                    'amount': amount,
-                    'converted_amount': round(amount * rate, 2),
-                    'rate': round(rate, 4)
-                })
-        
-        # Fallback to backup rates
-        backup_rates = get_fallback_rates()
-        if from_currency in backup_rates and to_currency in backup_rates[from_currency]:
-            rate = backup_rates[from_currency][to_currency]
-            return jsonify({
-                'from': from_currency,
-                'to': to_currency,
-                'amount': amount,
-                'converted_amount': round(amount * rate, 2),
-                'rate': round(rate, 4),
-                'source': 'fallback'
-            })
-        
-        # Ultimate fallback
-        return jsonify({
+        # Precomputed best route, or the per-pair LRU; the provider is only
+        # asked about currencies outside the snapshot
+        route = MoneyConverter.quote(from_currency, to_currency, endpoint='convert-rate')
+        if route.rate is None:
+            return jsonify({'error': f'Unsupported currency pair {from_currency}-{to_currency}'}), 400
+        result = {
             'from': from_currency,
             'to': to_currency,
             'amount': amount,
-            'converted_amount': amount,
-            'rate': 1.0,
-            'source': 'default'
-        })
+            'converted_amount': round(amount * route.rate, 2),
+            'rate': round(route.rate, 4),
+            'source': route.source,
+            'path': list(route.path)
+        }
+        # Read-only: locked quotes are issued by POST /api/convert with "lock": true
+        return jsonify(result)
         
     except Exception as e:
-        print(f"Error in convert_exchange_rate: {e}")
+        logger.exception("Error in convert_exchange_rate")
         return jsonify({
             'from': from_currency,
             'to': to_currency,
@@ -277,7 +542,65 @@ def convert_exchange_rate():
             'error': str(e)
         })
 
-@app.route('/api/refresh-rates', methods=['POST'])
+@api.route('/api/rates/stream', methods=['GET'])
+def stream_exchange_rates():
+    """Server-sent events: a snapshot, then only the pairs that change"""
+    if RATE_STREAM.full:
+        # This process also serves the API; listeners belong on the gevent `stream` process
+        return jsonify({'error': 'rate stream is at capacity'}), 503, {'Retry-After': '30'}
+    ensure_rate_snapshot()
+    # While anyone is listening, keep the snapshot fresh server-side so
+    # subscribers get pushed deltas instead of polling
+    app = current_app._get_current_object()
+
+    def refresh():
+        # In this app's context, so its history records the refreshed snapshots
+        with app.app_context():
+            ensure_rate_snapshot()
+
+    RATE_STREAM.ensure_refresher(refresh)
+    return current_app.response_class(
+        RATE_STREAM.subscribe(parse_last_version(request)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+RATE_HISTORY_DEFAULT_DAYS = 30
+
+def parse_timestamp(value):
+    """Epoch seconds from epoch seconds or ISO-8601 (naive means UTC), None if absent"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+@api.route('/api/rates/history', methods=['GET'])
+def get_rate_history():
+    """OHLC bars for one pair over [start, end) at minute, hour or day resolution"""
+    from_currency = request.args.get('from', 'USD').upper()
+    to_currency = request.args.get('to', 'EUR').upper()
+    resolution = request.args.get('resolution', 'auto')
+    try:
+        end = parse_timestamp(request.args.get('end')) or time.time()
+        start = parse_timestamp(request.args.get('start')) or end - RATE_HISTORY_DEFAULT_DAYS * 86400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if resolution != 'auto' and resolution not in RESOLUTIONS:
+        return jsonify({'error': f"resolution must be auto, {', '.join(RESOLUTIONS)}"}), 400
+    if start >= end:
+        return jsonify({'error': 'start must be before end'}), 400
+    
+    bars = rate_history().bars(from_currency, to_currency, start, end, resolution)
+    if bars is None:
+        return jsonify({'error': f'No rate history for {from_currency}-{to_currency}'}), 404
+    return jsonify(dict(bars, **{'from': from_currency, 'to': to_currency, 'start': start, 'end': end}))
+
+@api.route('/api/refresh-rates', methods=['POST'])
 def refresh_exchange_rates():
     """Force refresh of exchange rates cache"""
     try:
@@ -298,8 +621,10 @@ def refresh_exchange_rates():
 
 # ==================== AUTHENTICATION ROUTES ====================
 
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
 def register():
+    import jwt
+    
     try:
         data = request.get_json()
         
@@ -339,8 +664,10 @@ def register():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
 def login():
+    import jwt
+    
     try:
         data = request.get_json()
         
@@ -371,8 +698,10 @@ def login():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/auth/profile', methods=['GET'])
+@api.route('/api/auth/profile', methods=['GET'])
 def get_profile():
+    import jwt
+    
     try:
         token = request.headers.get('Authorization', '').replace('Bearer ', '')
         if not token:
@@ -394,34 +723,105 @@ def get_profile():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ==================== ADMIN ROUTES ====================
+
+def admin_token_error():
+    """None if the request carries ADMIN_TOKEN in X-Admin-Token, else an error response"""
+    token = current_app.config.get('ADMIN_TOKEN') or os.getenv('ADMIN_TOKEN', '')
+    if not token:
+        return jsonify({'error': 'Admin endpoints are disabled (set ADMIN_TOKEN)'}), 404
+    supplied = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({'error': 'Admin token required'}), 403
+    return None
+
+def parse_iso_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+@api.route('/api/admin/fee-simulation', methods=['POST'])
+def fee_simulation():
+    """Revenue and customer-cost deltas of candidate fee schedules over stored transfers"""
+    from services.fee_simulation import simulate, SIMULATION_AVAILABLE, DEFAULT_CHUNK_SIZE
+    
+    error = admin_token_error()
+    if error:
+        return error
+    if not SIMULATION_AVAILABLE:
+        return jsonify({'error': 'Fee simulation needs NumPy installed'}), 501
+    
+    data = request.get_json() or {}
+    try:
+        candidates = dict(data.get('candidates') or {})
+        if data.get('include_current', True):
+            candidates.setdefault('current_schedule', current_schedule())
+        
+        options = {
+            'since': parse_iso_datetime(data.get('since')),
+            'until': parse_iso_datetime(data.get('until')),
+            'statuses': data.get('statuses'),
+            'chunk_size': int(data.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        }
+        if data.get('bands'):
+            options['bands'] = [float(edge) for edge in data['bands']]
+        
+        report = simulate(db.engine, candidates, **options)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(report)
+
 # ==================== EXISTING APPLICATION CODE ====================
 
 class MoneyConverter:
+    """Pair rates served from the shared snapshot, so every endpoint agrees"""
+
+    @staticmethod
+    def quote(from_currency, to_currency, endpoint='convert'):
+        """Route(rate, path, source), with rate None when nothing can price the pair
+
+        source is identity, cache (a quoted rate), derived (an inverse or
+        multi-hop route), external_api, fallback or unsupported.
+        """
+        if from_currency == to_currency:
+            return Route(1.0, (from_currency,), 'identity')
+        ensure_rate_snapshot()
+        version = exchange_rates_cache['version']
+        key = (from_currency, to_currency)
+
+        found = RATE_PLANS.route(*key) or PAIR_RATES.get(key, version)
+        record_rate_cache(endpoint, found is not None)
+        if found is not None:
+            return found
+        found = MoneyConverter.fetch_pair_rate(from_currency, to_currency)
+        if found is None:
+            # Remember the miss as well, so an unknown pair doesn't cost an
+            # upstream call on every request
+            fallback = fallback_plans().route(*key)
+            found = fallback._replace(source='fallback') if fallback else Route(None, (), 'unsupported')
+        PAIR_RATES.put(key, version, found)
+        return found
+
     @staticmethod
     def get_exchange_rate(from_currency, to_currency):
-        """Get live exchange rate from free API"""
-        try:
-            url = f"https://api.exchangerate.host/convert?from={from_currency}&to={to_currency}"
-            response = requests.get(url)
-            data = response.json()
-            
-            if data['success']:
-                return data['result']
-            else:
-                return MoneyConverter.get_backup_rate(from_currency, to_currency)
-        except:
-            return MoneyConverter.get_backup_rate(from_currency, to_currency)
-    
+        return MoneyConverter.quote(from_currency, to_currency).rate
+
     @staticmethod
-    def get_backup_rate(from_currency, to_currency):
-        """Backup rates in case everything fails"""
-        backup_rates = {
-            'USD_EUR': 0.85, 'USD_GBP': 0.73, 'USD_INR': 83.0,
-            'EUR_USD': 1.18, 'GBP_USD': 1.37, 'INR_USD': 0.012,
-            'USD_CAD': 1.35, 'USD_AUD': 1.52, 'USD_JPY': 150.0,
-        }
-        key = f"{from_currency}_{to_currency}"
-        return backup_rates.get(key, 1.0)
+    def fetch_pair_rate(from_currency, to_currency):
+        """Route for a pair the snapshot can't price, None on failure"""
+        try:
+            response = timed_upstream_get(
+                'convert',
+                f'https://api.exchangerate.host/convert?from={from_currency}&to={to_currency}',
+                timeout=5
+            )
+            data = response.json() if response.status_code == 200 else {}
+        except Exception as e:
+            logger.warning("Error fetching pair rate: %s", e,
+                           extra={'pair': f'{from_currency}-{to_currency}'})
+            return None
+        if data.get('success') and data.get('result'):
+            return Route(data['result'], (from_currency, to_currency), 'external_api')
+        return None
 
 class UserService:
     @staticmethod
@@ -442,40 +842,37 @@ class UserService:
             # Set a temporary password or leave it null if your model allows
             user.set_password(None)  # This will set password_hash to None
             db.session.add(user)
-            db.session.commit()
-            print(f"✅ Created new user: {name}")
+            # Flush for the id; the caller commits once for the whole transfer
+            db.session.flush()
+            logger.debug("Created new user", extra={'user_id': user.id})
         else:
-            print(f"✅ Found existing user: {name}")
+            logger.debug("Found existing user", extra={'user_id': user.id})
         
         return user
 class TransferService:
+    DELIVERY_TIMES = {
+        'US': '1-2 hours', 'CA': '2-3 hours', 'GB': '1-2 hours',
+        'FR': '1-3 hours', 'DE': '1-3 hours', 'IN': '2-4 hours',
+        'AU': '3-5 hours', 'JP': '2-4 hours'
+    }
+    DEFAULT_DELIVERY_TIME = '3-5 business days'
+    
     @staticmethod
     def generate_tracking_number():
-        return f"RM{str(uuid.uuid4())[:8].upper()}"
+        # RM + a time-ordered ID: unique without retries, sorts by creation time
+        return new_tracking_number()
     
     @staticmethod
-    def calculate_fee(amount):
-        if amount <= 100:
-            return 2.99
-        elif amount <= 500:
-            return 4.99
-        elif amount <= 1000:
-            return 7.99
-        else:
-            return amount * 0.01
+    def calculate_fee(amount, from_currency=None, to_currency=None):
+        return current_schedule().quote(amount, from_currency, to_currency)
     
     @staticmethod
     def get_delivery_time(country_code):
-        delivery_map = {
-            'US': '1-2 hours', 'CA': '2-3 hours', 'GB': '1-2 hours',
-            'FR': '1-3 hours', 'DE': '1-3 hours', 'IN': '2-4 hours',
-            'AU': '3-5 hours', 'JP': '2-4 hours'
-        }
-        return delivery_map.get(country_code, '3-5 business days')
+        return TransferService.DELIVERY_TIMES.get(country_code, TransferService.DEFAULT_DELIVERY_TIME)
 
 # ========== API ROUTES ==========
 
-@app.route('/')
+@api.route('/')
 def home():
     return jsonify({
         "message": "RemitLite API is running! 🚀",
@@ -484,20 +881,26 @@ def home():
             "exchange_rates": "/api/exchange-rates (GET)",
             "convert_rate": "/api/convert-rate (GET)",
             "refresh_rates": "/api/refresh-rates (POST)",
+            "rates_stream": "/api/rates/stream (GET, text/event-stream)",
+            "rates_history": "/api/rates/history (GET)",
             "auth_register": "/api/auth/register (POST)",
             "auth_login": "/api/auth/login (POST)", 
             "auth_profile": "/api/auth/profile (GET)",
             "health_check": "/api/health (GET)",
             "currencies": "/api/currencies (GET)",
+            "bootstrap": "/api/bootstrap (GET)",
             "convert": "/api/convert (POST)",
             "estimate": "/api/estimate (POST)", 
             "transfers": "/api/transfers (GET)",
-            "create_transfer": "/api/transfer (POST)"
+            "create_transfer": "/api/transfer (POST)",
+            "metrics": "/api/metrics (GET)",
+            "export_transfers": "/api/transfers/export (GET, X-Admin-Token)",
+            "fee_simulation": "/api/admin/fee-simulation (POST, X-Admin-Token)"
         },
         "timestamp": datetime.now().isoformat()
     })
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     try:
         # Check database connection
@@ -515,64 +918,153 @@ def health_check():
             'error': str(e)
         }), 500
 
-@app.route('/api/currencies', methods=['GET'])
+CURRENCIES = [
+    {'code': 'USD', 'name': 'US Dollar', 'symbol': '$', 'flag': '🇺🇸'},
+    {'code': 'EUR', 'name': 'Euro', 'symbol': '€', 'flag': '🇪🇺'},
+    {'code': 'GBP', 'name': 'British Pound', 'symbol': '£', 'flag': '🇬🇧'},
+    {'code': 'JPY', 'name': 'Japanese Yen', 'symbol': '¥', 'flag': '🇯🇵'},
+    {'code': 'CAD', 'name': 'Canadian Dollar', 'symbol': 'C$', 'flag': '🇨🇦'},
+    {'code': 'AUD', 'name': 'Australian Dollar', 'symbol': 'A$', 'flag': '🇦🇺'},
+    {'code': 'CHF', 'name': 'Swiss Franc', 'symbol': 'CHF', 'flag': '🇨🇭'},
+    {'code': 'CNY', 'name': 'Chinese Yuan', 'symbol': '¥', 'flag': '🇨🇳'},
+    {'code': 'ZAR', 'name': 'South African Rand', 'symbol': 'R', 'flag': '🇿🇦'},
+    {'code': 'NGN', 'name': 'Nigerian Naira', 'symbol': '₦', 'flag': '🇳🇬'},
+    {'code': 'EGP', 'name': 'Egyptian Pound', 'symbol': 'E£', 'flag': '🇪🇬'},
+    {'code': 'KES', 'name': 'Kenyan Shilling', 'symbol': 'KSh', 'flag': '🇰🇪'},
+    {'code': 'GHS', 'name': 'Ghanaian Cedi', 'symbol': '₵', 'flag': '🇬🇭'},
+    {'code': 'XOF', 'name': 'West African CFA', 'symbol': 'CFA', 'flag': '🇸🇳'},
+]
+
+@api.route('/api/currencies', methods=['GET'])
 def get_currencies():
-    currencies = [
-        {'code': 'USD', 'name': 'US Dollar', 'symbol': '$', 'flag': '🇺🇸'},
-        {'code': 'EUR', 'name': 'Euro', 'symbol': '€', 'flag': '🇪🇺'},
-        {'code': 'GBP', 'name': 'British Pound', 'symbol': '£', 'flag': '🇬🇧'},
-        {'code': 'JPY', 'name': 'Japanese Yen', 'symbol': '¥', 'flag': '🇯🇵'},
-        {'code': 'CAD', 'name': 'Canadian Dollar', 'symbol': 'C$', 'flag': '🇨🇦'},
-        {'code': 'AUD', 'name': 'Australian Dollar', 'symbol': 'A$', 'flag': '🇦🇺'},
-        {'code': 'CHF', 'name': 'Swiss Franc', 'symbol': 'CHF', 'flag': '🇨🇭'},
-        {'code': 'CNY', 'name': 'Chinese Yuan', 'symbol': '¥', 'flag': '🇨🇳'},
-        {'code': 'ZAR', 'name': 'South African Rand', 'symbol': 'R', 'flag': '🇿🇦'},
-        {'code': 'NGN', 'name': 'Nigerian Naira', 'symbol': '₦', 'flag': '🇳🇬'},
-        {'code': 'EGP', 'name': 'Egyptian Pound', 'symbol': 'E£', 'flag': '🇪🇬'},
-        {'code': 'KES', 'name': 'Kenyan Shilling', 'symbol': 'KSh', 'flag': '🇰🇪'},
-        {'code': 'GHS', 'name': 'Ghanaian Cedi', 'symbol': '₵', 'flag': '🇬🇭'},
-        {'code': 'XOF', 'name': 'West African CFA', 'symbol': 'CFA', 'flag': '🇸🇳'},
-    ]
-    return jsonify(currencies)
-
-@app.route('/api/convert', methods=['POST'])
+    return cached_json_response('currencies', 'static', lambda: CURRENCIES,
+                                cache_control=STATIC_CACHE_CONTROL)
+
+def utc_isoformat(value):
+    """ISO-8601 with a +00:00 offset for a naive server-local datetime (browsers read bare ISO as local)"""
+    return value.astimezone(timezone.utc).isoformat()
+
+def bootstrap_payload(snapshot, fee_schedule):
+    return {
+        'version': snapshot['version'],
+        'currencies': CURRENCIES,
+        'rates': snapshot['data'],
+        'source': snapshot['source'],
+        'rates_timestamp': utc_isoformat(snapshot['timestamp']),
+        'rates_expire_at': utc_isoformat(snapshot['expires_at']),
+        # The stream's event ID for these rates: /api/rates/stream?since=<rates_id> skips the snapshot
+        'rates_id': snapshot_id(snapshot['data']),
+        'fee_schedule': fee_schedule.data,
+        'fee_schedule_version': fee_schedule.revision,
+        'delivery_times': TransferService.DELIVERY_TIMES,
+        'default_delivery_time': TransferService.DEFAULT_DELIVERY_TIME
+    }
+
+@api.route('/api/bootstrap', methods=['GET'])
+def get_bootstrap():
+    """Everything the frontend needs on load, keyed by the rate snapshot version"""
+    record_rate_cache('bootstrap', get_cached_rates() is not None)
+    ensure_rate_snapshot()
+    snapshot = dict(exchange_rates_cache)
+    fee_schedule = current_schedule()
+    # Serialized and gzipped once per snapshot; clients revalidate with
+    # If-None-Match and get a 304 until the rates or fee schedule change
+    return cached_json_response('bootstrap', (snapshot['version'], fee_schedule.revision),
+                                lambda: bootstrap_payload(snapshot, fee_schedule))
+
+@api.route('/api/convert', methods=['POST'])
 def convert_currency():
     data = request.json
     
-    rate = MoneyConverter.get_exchange_rate(
-        data['fromCurrency'], 
-        data['toCurrency']
-    )
+    route = MoneyConverter.quote(data['fromCurrency'], data['toCurrency'])
+    if route.rate is None:
+        return jsonify({'error': f"Unsupported currency pair {data['fromCurrency']}-{data['toCurrency']}"}), 400
     
-    converted_amount = data['amount'] * rate
+    converted_amount = data['amount'] * route.rate
     
-    return jsonify({
+    result = {
         'fromCurrency': data['fromCurrency'],
         'toCurrency': data['toCurrency'],
         'originalAmount': data['amount'],
         'convertedAmount': round(converted_amount, 2),
-        'exchangeRate': round(rate, 4),
+        'exchangeRate': round(route.rate, 4),
+        'source': route.source,
+        'path': list(route.path),
         'timestamp': datetime.now().isoformat()
-    })
+    }
+    # "lock": true holds this rate for a transfer that sends the quoteId back.
+    # Only this POST issues quotes, so crawlers and prefetches can't create them.
+    if data.get('lock'):
+        quote_id, quote = issue_quote(data['fromCurrency'], data['toCurrency'], route.rate)
+        result.update(quoteId=quote_id, quoteExpiresAt=quote.expires_at_iso)
+    return jsonify(result)
+
+MAX_ESTIMATE_ITEMS = 1000
 
-@app.route('/api/estimate', methods=['POST'])
+def quote_estimate(schedule, item):
+    amount = float(item['amount'])
+    from_currency = item.get('fromCurrency')
+    to_currency = item.get('toCurrency')
+    fee = schedule.quote(amount,
+                         from_currency.upper() if from_currency else None,
+                         to_currency.upper() if to_currency else None)
+    return {
+        'fee': fee,
+        'totalCost': amount + fee,
+        'deliveryTime': TransferService.get_delivery_time(item.get('countryCode'))
+    }
+
+@api.route('/api/estimate', methods=['POST'])
 def get_estimate():
+    """Quote one transfer, or a batch with {"items": [{amount, countryCode, fromCurrency, toCurrency}]}"""
     data = request.json
+    # One schedule for the whole batch, even if the file reloads mid-request
+    schedule = current_schedule()
     
-    fee = TransferService.calculate_fee(data['amount'])
-    delivery_time = TransferService.get_delivery_time(data['countryCode'])
-    
-    return jsonify({
-        'fee': fee,
-        'totalCost': data['amount'] + fee,
-        'deliveryTime': delivery_time
-    })
+    try:
+        if 'items' not in data:
+            return jsonify(quote_estimate(schedule, data))
+        
+        items = data['items']
+        if not isinstance(items, list) or len(items) > MAX_ESTIMATE_ITEMS:
+            return jsonify({'error': f'items must be a list of at most {MAX_ESTIMATE_ITEMS} quotes'}), 400
+        
+        return jsonify({
+            'quotes': [quote_estimate(schedule, item) for item in items],
+            'feeScheduleVersion': schedule.revision
+        })
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return jsonify({'error': f'Invalid estimate request: {e}'}), 400
+
+def transfer_rate(data):
+    """The rate a transfer is booked at: its locked quote, else the current snapshot
 
-@app.route('/api/transfer', methods=['POST'])
+    Client-supplied exchangeRate/convertedAmount are ignored.
+    """
+    from_currency, to_currency = data['fromCurrency'], data['toCurrency']
+    if data.get('quoteId'):
+        # Claimed in the transfer's transaction: a rollback releases it
+        quote = redeem_quote(data['quoteId'])
+        if (quote.from_currency, quote.to_currency) != (from_currency, to_currency):
+            raise QuoteError(f'quote is for {quote.from_currency}-{quote.to_currency}')
+        return quote.rate
+    rate = MoneyConverter.quote(from_currency, to_currency).rate
+    if rate is None:
+        raise QuoteError(f'Unsupported currency pair {from_currency}-{to_currency}')
+    return rate
+
+@api.route('/api/transfer', methods=['POST'])
 def create_transfer():
     data = request.json
     
     try:
+        fields = Transfer.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        rate = transfer_rate(data)
+        
         sender = UserService.find_or_create_user(
             name=data['sender']['name'],
             country_code=data['sender']['country'],
@@ -585,7 +1077,7 @@ def create_transfer():
             email=data['recipient'].get('email')
         )
         
-        fee = TransferService.calculate_fee(data['amount'])
+        fee = TransferService.calculate_fee(data['amount'], data['fromCurrency'], data['toCurrency'])
         delivery_time = TransferService.get_delivery_time(data['recipient']['country'])
         
         tracking_number = TransferService.generate_tracking_number()
@@ -596,8 +1088,8 @@ def create_transfer():
             amount=data['amount'],
             from_currency=data['fromCurrency'],
             to_currency=data['toCurrency'],
-            converted_amount=data['convertedAmount'],
-            exchange_rate=data['exchangeRate'],
+            converted_amount=round(data['amount'] * rate, 2),
+            exchange_rate=rate,
             fee=fee,
             total_amount=data['amount'] + fee,
             delivery_time=delivery_time,
@@ -606,25 +1098,66 @@ def create_transfer():
         )
         
         db.session.add(transfer)
+        db.session.flush()
+        # Serialize before commit so expire_on_commit doesn't force reloads
+        result = transfer.to_dict(fields)
         db.session.commit()
         
-        return jsonify(transfer.to_dict()), 201
+        return jsonify(result), 201
         
+    except QuoteError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/transfers', methods=['GET'])
+@api.route('/api/transfers', methods=['GET'])
 def get_transfers():
-    transfers = Transfer.query.order_by(Transfer.created_at.desc()).all()
-    return jsonify([transfer.to_dict() for transfer in transfers])
+    # ?fields=id,amount,sender.name limits both the SELECT and the response
+    try:
+        fields = Transfer.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    since = request.args.get('since')
+    if since is not None:
+        # Delta sync: only what changed after the client's version
+        if not since.isdigit():
+            return jsonify({'error': 'since must be a non-negative integer version'}), 400
+        return jsonify(changes_since(db.session.connection(), int(since), fields))
+    
+    # Core rows mapped straight to the to_dict() shape; no ORM objects to build
+    return jsonify(list_transfers(db.session.connection(), fields))
+
+@api.route('/api/transfers/export', methods=['GET'])
+def export_transfers():
+    """All transfers as CSV, streamed a chunk at a time (?fields= as for the listing)"""
+    # Every sender's and recipient's contact details in one file: admins only
+    error = admin_token_error()
+    if error:
+        return error
+    try:
+        fields = Transfer.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    engine = db.engine
 
-# ========== DEBUG INFO ==========
-print("Registered API Routes:")
-for rule in app.url_map.iter_rules():
-    if not rule.rule.startswith('/static/'):  # Skip static files
-        methods = ','.join(rule.methods)
-        print(f"   {rule.rule} -> {methods}")
+    def generate():
+        # Own connection: the request's session is gone by the time the body streams
+        with engine.connect() as connection:
+            yield from export_csv(connection, fields)
+
+    return current_app.response_class(
+        generate(), mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename="transfers.csv"'}
+    )
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    print_database_report(app)
     port = int(os.environ.get("PORT", 5000))
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=True, port=5000)
@@ -0,0 +1,3 @@
+# backend/benchmarks
+# Performance benchmarks for the RemitLite API. Run from the backend directory,
+# e.g. `python -m benchmarks.startup`.
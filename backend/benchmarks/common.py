@@ -0,0 +1,160 @@
+# backend/benchmarks/common.py
+"""Shared helpers: timing, stubbed upstream, seeded database, result files."""
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest import mock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+def time_call(func, repeat=5):
+    """Best-of-N wall time in milliseconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+def ns_per_op(func, number=10000, repeat=5):
+    """Best-of-N cost of one call in nanoseconds"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e9
+
+def percentiles(samples_ms):
+    """p50/p95/p99/max of a list of latencies in milliseconds"""
+    ordered = sorted(samples_ms)
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return {
+        'p50_ms': round(pick(0.50), 3),
+        'p95_ms': round(pick(0.95), 3),
+        'p99_ms': round(pick(0.99), 3),
+        'max_ms': round(ordered[-1], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+    }
+
+class StubResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+def stub_rate_upstream(latency_ms=0.0):
+    """Patch requests.get so exchangerate.host calls return fallback rates"""
+    import app as app_module
+    fallback = app_module.get_fallback_rates()
+
+    def fake_get(url, *args, **kwargs):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        if 'convert?' in url:
+            query = dict(part.split('=') for part in url.split('?', 1)[1].split('&'))
+            rate = fallback.get(query['from'], {}).get(query['to'], 1.0)
+            return StubResponse({'success': True, 'result': rate})
+        base = url.split('base=', 1)[1] if 'base=' in url else 'USD'
+        return StubResponse({'success': True, 'base': base, 'rates': fallback.get(base, {})})
+
+    return mock.patch('requests.get', side_effect=fake_get)
+
+@contextmanager
+def quiet():
+    """Swallow the print() calls made on request paths"""
+    with open(os.devnull, 'w') as devnull:
+        saved = sys.stdout
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = saved
+
+def bench_id(table, i):
+    """Deterministic UUID string (keys are stored as 16-byte UUIDs)"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f'remitlite-bench:{table}:{i}'))
+
+def seed_database(app, users=200, transfers=2000, seed=42):
+    """Bulk-insert deterministic users and transfers for load scenarios"""
+    from models.database import db
+    from models.user import User
+    from models.transfer import Transfer
+
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    with app.app_context():
+        db.create_all()
+        user_rows = [
+            {'id': bench_id('user', i), 'name': f'User {i}', 'email': f'user{i}@bench.example',
+             'country_code': rng.choice(['US', 'GB', 'KE', 'NG', 'GH']), 'created_at': now}
+            for i in range(users)
+        ]
+        db.session.execute(db.insert(User), user_rows)
+        transfer_rows = []
+        for i in range(transfers):
+            amount = round(rng.uniform(10, 3000), 2)
+            transfer_rows.append(Transfer.storage_row({
+                'id': bench_id('transfer', i),
+                'sender_id': bench_id('user', rng.randrange(users)),
+                'recipient_id': bench_id('user', rng.randrange(users)),
+                'amount': amount, 'from_currency': 'USD', 'to_currency': 'KES',
+                'converted_amount': round(amount * 157.8, 2), 'exchange_rate': 157.8,
+                'fee': 4.99, 'total_amount': amount + 4.99, 'delivery_time': '3-5 business days',
+                'status': 'completed', 'tracking_number': f'RMB{i:08d}',
+                'created_at': now - timedelta(minutes=i),
+            }))
+        db.session.execute(db.insert(Transfer), transfer_rows)
+        db.session.commit()
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+    }
+
+def write_results(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def flatten(results, prefix=''):
+    """{'micro': {'fee': {'ns': 1}}} -> {'micro.fee.ns': 1}, numbers only"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+# Metrics where a bigger number is better; everything else is a cost
+HIGHER_IS_BETTER = ('rps',)
+
+def compare(current, baseline, threshold=0.10):
+    """Per-metric change against a baseline; regressions exceed `threshold`"""
+    current_flat, baseline_flat = flatten(current), flatten(baseline)
+    rows = []
+    for name, value in sorted(current_flat.items()):
+        if name.startswith('environment') or name not in baseline_flat:
+            continue
+        old = baseline_flat[name]
+        if not old:
+            # Only error counts are expected to sit at zero
+            rows.append({'metric': name, 'baseline': old, 'current': value,
+                         'change': 0.0, 'regression': name.endswith('errors') and value > 0})
+            continue
+        change = (value - old) / old
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        rows.append({'metric': name, 'baseline': old, 'current': value,
+                     'change': round(change, 4), 'regression': worse > threshold})
+    return rows
@@ -0,0 +1,89 @@
+# backend/benchmarks/json_serialization.py
+"""Serialization cost of large /api/transfers payloads per JSON provider.
+
+    python -m benchmarks.json_serialization --rows 10000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import time_call
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from models.user import User
+from models.transfer import Transfer
+from models.exchange_rate import ExchangeRate  # noqa: F401 - registers the mapper
+from services.json_provider import JSON_PROVIDERS, orjson
+
+def make_transfers(rows, seed=42):
+    """Transient Transfer objects with sender/recipient, no database needed"""
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    users = [
+        User(id=f'user-{i}', name=f'User {i}', email=f'user{i}@example.com',
+             country_code='US', phone='+1-555-0100', created_at=now)
+        for i in range(200)
+    ]
+    transfers = []
+    for i in range(rows):
+        amount = round(rng.uniform(10, 5000), 2)
+        created_at = now - timedelta(minutes=i)
+        transfers.append(Transfer(
+            id=f'transfer-{i}', sender=rng.choice(users), recipient=rng.choice(users),
+            amount=amount, from_currency='USD', to_currency='EUR',
+            converted_amount=round(amount * 0.92, 2), exchange_rate=0.92, fee=4.99,
+            total_amount=amount + 4.99, delivery_time='1-2 hours', status='completed',
+            tracking_number=f'RM{i:08d}', created_at=created_at, completed_at=created_at
+        ))
+    return transfers
+
+def legacy_payload(transfers):
+    """What to_dict() produced before: isoformat() called by hand on each datetime"""
+    payload = []
+    for transfer in transfers:
+        item = transfer.to_dict()
+        item['created_at'] = item['created_at'].isoformat()
+        item['completed_at'] = item['completed_at'].isoformat() if item['completed_at'] else None
+        for key in ('sender', 'recipient'):
+            user = dict(item[key])
+            user['created_at'] = user['created_at'].isoformat() if user['created_at'] else None
+            user['last_login'] = user['last_login'].isoformat() if user['last_login'] else None
+            item[key] = user
+        payload.append(item)
+    return payload
+
+def run(rows=10000, repeat=5):
+    app = Flask(__name__)
+    transfers = make_transfers(rows)
+    results = {}
+
+    flask_default = DefaultJSONProvider(app)
+    results['flask_default'] = time_call(
+        lambda: flask_default.response(legacy_payload(transfers)), repeat)
+
+    for name, provider_class in JSON_PROVIDERS.items():
+        if name == 'orjson' and orjson is None:
+            continue
+        provider = provider_class(app)
+        results[name] = time_call(
+            lambda: provider.response([t.to_dict() for t in transfers]), repeat)
+
+    return {name: round(ms, 2) for name, ms in results.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.repeat)
+    baseline = results['flask_default']
+    print(f"to_dict + serialize {args.rows} transfers (best of {args.repeat}):")
+    for name, ms in results.items():
+        print(f"   {name:<14} {ms:>9.2f} ms   {baseline / ms:5.2f}x")
+    return results
+
+if __name__ == '__main__':
+    main()
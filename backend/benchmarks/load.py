@@ -0,0 +1,111 @@
+# backend/benchmarks/load.py
+"""Load scenarios for the API hot paths against a stubbed rate upstream and a seeded DB.
+
+    python -m benchmarks.load --requests 500 --concurrency 8
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.common import percentiles, quiet, seed_database, stub_rate_upstream
+
+CORRIDORS = [('USD', 'KES'), ('GBP', 'NGN'), ('EUR', 'GHS'), ('USD', 'INR'), ('GBP', 'ZAR')]
+
+def convert_rate_request(i):
+    source, target = CORRIDORS[i % len(CORRIDORS)]
+    return 'GET', f'/api/convert-rate?from={source}&to={target}&amount={100 + i % 900}', None
+
+def exchange_rates_request(i):
+    return 'GET', '/api/exchange-rates', None
+
+def create_transfer_request(i):
+    source, target = CORRIDORS[i % len(CORRIDORS)]
+    return 'POST', '/api/transfer', {
+        'sender': {'name': f'Load Sender {i % 50}', 'country': 'US', 'email': f'sender{i % 50}@load.example'},
+        'recipient': {'name': f'Load Recipient {i % 50}', 'country': 'KE', 'email': f'recipient{i % 50}@load.example'},
+        'amount': 100 + i % 900, 'fromCurrency': source, 'toCurrency': target,
+        'convertedAmount': 15780.0, 'exchangeRate': 157.8,
+    }
+
+def list_transfers_request(i):
+    return 'GET', '/api/transfers', None
+
+SCENARIOS = {
+    'convert_rate': convert_rate_request,
+    'exchange_rates': exchange_rates_request,
+    'create_transfer': create_transfer_request,
+    'list_transfers': list_transfers_request,
+}
+
+def drive(app, make_request, total, concurrency):
+    """Issue `total` requests from `concurrency` threads; latency in ms per request"""
+    counter = itertools.count()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        local_latencies, local_errors = [], 0
+        while True:
+            i = next(counter)
+            if i >= total:
+                break
+            method, path, body = make_request(i)
+            started = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = percentiles(latencies)
+    result['rps'] = round(total / elapsed, 1)
+    result['errors'] = sum(errors)
+    return result
+
+def run(total=500, concurrency=8, users=200, transfers=2000, scenarios=None, upstream_latency_ms=0.0):
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          'RATE_HISTORY_DIR': os.path.join(tmp, 'rate_history')})
+        seed_database(app, users=users, transfers=transfers)
+
+        results = {}
+        with stub_rate_upstream(upstream_latency_ms), quiet():
+            for name in scenarios or SCENARIOS:
+                drive(app, SCENARIOS[name], min(20, total), 1)  # warm caches and pools
+                results[name] = drive(app, SCENARIOS[name], total, concurrency)
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--transfers', type=int, default=2000)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    parser.add_argument('--upstream-latency-ms', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    results = run(args.requests, args.concurrency, args.users, args.transfers,
+                  args.scenario, args.upstream_latency_ms)
+    print(json.dumps(results, indent=2))
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# backend/benchmarks/micro.py
+"""Micro-benchmarks for per-request building blocks.
+
+    python -m benchmarks.micro
+"""
+import argparse
+import json
+
+from benchmarks.common import ns_per_op, time_call
+
+from flask import Flask
+
+def bench_calculate_fee():
+    from app import TransferService
+    amounts = [5.0, 99.99, 250.0, 750.0, 1200.0, 25000.0]
+    calculate_fee = TransferService.calculate_fee
+    return ns_per_op(lambda: [calculate_fee(a) for a in amounts]) / len(amounts)
+
+def bench_quote_batch(items=1000):
+    """Per-item cost of quoting a large /api/estimate batch against one schedule"""
+    from services.fee_schedule import current_schedule
+    schedule = current_schedule()
+    pairs = [('USD', 'KES'), ('GBP', 'NGN'), ('EUR', 'GHS'), ('USD', 'INR')]
+    batch = [(5.0 + i * 7.3, *pairs[i % len(pairs)]) for i in range(items)]
+    return ns_per_op(lambda: [schedule.quote(*item) for item in batch], number=50) / items
+
+def bench_rate_history_year(pairs=5):
+    """Milliseconds for a year of one pair's daily bars, from a compacted year of 15-minute snapshots"""
+    from services.rate_history import DAY, RateHistoryStore
+    store = RateHistoryStore()
+    start = 1_700_006_400
+    quotes = [f'C{i:02d}' for i in range(pairs)]
+    end = start + 365 * DAY
+    for step in range(0, 365 * DAY, 900):
+        store.append({'USD': {quote: 1.0 + (step % 7919) / 7919 for quote in quotes}}, ts=start + step)
+    store.compact(now=end)
+    return ns_per_op(lambda: store.bars('USD', 'C00', start, end, 'day'), number=20) / 1e6
+
+def bench_transfer_to_dict():
+    from benchmarks.json_serialization import make_transfers
+    transfer = make_transfers(1)[0]
+    return ns_per_op(transfer.to_dict)
+
+def bench_rate_cache():
+    import app as app_module
+    saved = dict(app_module.exchange_rates_cache)
+    try:
+        app_module.set_cached_rates(app_module.get_fallback_rates())
+
+        def lookup():
+            rates = app_module.get_cached_rates()
+            return rates['USD']['KES']
+
+        return {
+            'hit_ns': round(ns_per_op(lookup), 1),
+            'version_check_ns': round(ns_per_op(lambda: app_module.exchange_rates_cache['version']), 1),
+        }
+    finally:
+        app_module.exchange_rates_cache.update(saved)
+
+def bench_json(rows=1000):
+    from benchmarks.json_serialization import make_transfers
+    from services.json_provider import JSON_PROVIDERS, orjson
+    app = Flask(__name__)
+    payload = [t.to_dict() for t in make_transfers(rows)]
+    results = {}
+    for name, provider_class in JSON_PROVIDERS.items():
+        if name == 'orjson' and orjson is None:
+            continue
+        provider = provider_class(app)
+        results[f'{name}_{rows}_transfers_ms'] = round(time_call(lambda: provider.dumps_bytes(payload)), 3)
+    return results
+
+def run():
+    return {
+        'calculate_fee_ns': round(bench_calculate_fee(), 1),
+        'quote_batch_per_item_ns': round(bench_quote_batch(), 1),
+        'transfer_to_dict_ns': round(bench_transfer_to_dict(), 1),
+        'rate_cache': bench_rate_cache(),
+        'rate_history_year_ms': round(bench_rate_history_year(), 3),
+        'json': bench_json(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+    results = run()
+    print(json.dumps(results, indent=2))
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# backend/benchmarks/read_path.py
+"""ORM vs Core read path for transfer listing and export, per row.
+
+    python -m benchmarks.read_path --rows 20000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import seed_database
+
+FIELD_SETS = {'full': None, 'narrow': 'id,amount,status,sender.name'}
+
+def orm_listing(fields):
+    from models.transfer import Transfer
+
+    transfers = (Transfer.query
+                 .options(*Transfer.query_options(fields))
+                 .order_by(Transfer.created_at.desc())
+                 .all())
+    return [transfer.to_dict(fields) for transfer in transfers]
+
+def core_listing(fields):
+    from models.database import db
+    from services.transfer_reads import list_transfers
+
+    return list_transfers(db.session.connection(), fields)
+
+def core_export(fields):
+    from models.database import db
+    from services.transfer_reads import export_csv
+
+    size = 0
+    for chunk in export_csv(db.session.connection(), fields):
+        size += len(chunk)
+    return size
+
+def measure(app, func, fields, rows, repeat):
+    """Best-of-N CPU microseconds per row, and the tracemalloc peak of one run"""
+    from models.database import db
+
+    best = None
+    for _ in range(repeat):
+        with app.app_context():
+            gc.collect()
+            start = time.process_time()
+            func(fields)
+            elapsed = time.process_time() - start
+            db.session.remove()
+        best = elapsed if best is None else min(best, elapsed)
+
+    with app.app_context():
+        gc.collect()
+        tracemalloc.start()
+        func(fields)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        db.session.remove()
+    return {'us_per_row': round(best / rows * 1e6, 3), 'peak_mib': round(peak / 2 ** 20, 2)}
+
+def run(rows=20000, users=500, repeat=3):
+    from app import create_app
+    from models.transfer import Transfer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          'RATE_HISTORY_DIR': os.path.join(tmp, 'rate_history')})
+        seed_database(app, users=users, transfers=rows)
+
+        results = {}
+        for name, spec in FIELD_SETS.items():
+            fields = Transfer.parse_fields(spec)
+            results[name] = {
+                'orm_listing': measure(app, orm_listing, fields, rows, repeat),
+                'core_listing': measure(app, core_listing, fields, rows, repeat),
+                'core_export': measure(app, core_export, fields, rows, repeat),
+            }
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = run(args.rows, args.users, args.repeat)
+    print(f"{args.rows} transfers (CPU best of {args.repeat}, peak traced memory):")
+    for name, paths in results.items():
+        baseline = paths['orm_listing']['us_per_row']
+        for path, result in paths.items():
+            print(f"   {name:<7} {path:<13} {result['us_per_row']:>8.2f} us/row "
+                  f"{baseline / result['us_per_row']:5.2f}x {result['peak_mib']:>8.2f} MiB")
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# backend/benchmarks/run.py
+"""Run the benchmark suite and write machine-readable results.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --output bench.json --baseline baseline.json --threshold 0.15
+
+With --baseline, every numeric metric is compared and the exit status is 1
+if any metric regressed by more than the threshold.
+"""
+import argparse
+import sys
+
+from benchmarks import load, micro, read_path, startup
+from benchmarks.common import compare, environment, load_results, write_results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='previous results file to diff against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative change counted as a regression (default 0.10)')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--read-rows', type=int, default=10000,
+                        help='transfers seeded for the ORM vs Core read path comparison (0 skips it)')
+    parser.add_argument('--startup-runs', type=int, default=0,
+                        help='also measure cold start over this many fresh interpreters')
+    args = parser.parse_args(argv)
+
+    results = {'environment': environment(), 'micro': micro.run()}
+    if not args.skip_load:
+        results['load'] = load.run(args.requests, args.concurrency)
+    if args.read_rows:
+        results['read_path'] = read_path.run(args.read_rows)
+    if args.startup_runs:
+        results['startup'] = {
+            key: stats['median'] for key, stats in
+            startup.summarize([startup.run_once() for _ in range(args.startup_runs)]).items()
+        }
+
+    write_results(args.output, results)
+    print(f"📈 Benchmark results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    rows = compare(results, load_results(args.baseline), args.threshold)
+    regressions = [row for row in rows if row['regression']]
+    print(f"\nCompared with {args.baseline} (threshold {args.threshold:.0%}):")
+    for row in rows:
+        marker = '❌' if row['regression'] else '  '
+        print(f" {marker} {row['metric']:<48} {row['baseline']:>12} -> {row['current']:>12} "
+              f"({row['change']:+.1%})")
+    print(f"\n{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# backend/benchmarks/startup.py
+"""Cold-start benchmark: process start -> import -> create_app -> first response.
+
+Each run is a fresh interpreter so module caches don't hide import cost.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a child interpreter; prints one JSON line of timings in ms
+CHILD_SCRIPT = '''
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+flask_app = app_module.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+t2 = time.perf_counter()
+response = flask_app.test_client().get('/api/currencies')
+t3 = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'total_ms': (t3 - t0) * 1000,
+}))
+'''
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarize(samples):
+    summary = {}
+    for key in samples[0]:
+        values = sorted(sample[key] for sample in samples)
+        summary[key] = {
+            'median': round(statistics.median(values), 2),
+            'min': round(values[0], 2),
+            'max': round(values[-1], 2),
+        }
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='write the JSON summary to this file')
+    args = parser.parse_args(argv)
+
+    samples = [run_once() for _ in range(args.runs)]
+    summary = summarize(samples)
+
+    print(f"Cold start over {args.runs} runs (median / min / max, ms):")
+    for key, stats in summary.items():
+        print(f"   {key:<18} {stats['median']:>8} {stats['min']:>8} {stats['max']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'startup': summary}, f, indent=2)
+
+    return summary
+
+if __name__ == '__main__':
+    main()
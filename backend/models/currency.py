@@ -0,0 +1,55 @@
+# backend/models/currency.py
+from .database import db
+from sqlalchemy import case
+
+# ISO 4217 minor-unit exponents; every other currency has 2 (cents)
+DEFAULT_EXPONENT = 2
+CURRENCY_EXPONENTS = {
+    **dict.fromkeys(('BIF', 'CLP', 'DJF', 'GNF', 'ISK', 'JPY', 'KMF', 'KRW', 'PYG',
+                     'RWF', 'UGX', 'UYI', 'VND', 'VUV', 'XAF', 'XOF', 'XPF'), 0),
+    **dict.fromkeys(('BHD', 'IQD', 'JOD', 'KWD', 'LYD', 'OMR', 'TND'), 3),
+    **dict.fromkeys(('CLF', 'UYW'), 4),
+}
+
+class Currency(db.Model):
+    """Minor-unit exponent per currency, for SQL that converts stored amounts itself"""
+    __tablename__ = 'currencies'
+
+    code = db.Column(db.String(3), primary_key=True)
+    exponent = db.Column(db.SmallInteger, nullable=False)
+
+    def __repr__(self):
+        return f'<Currency {self.code}: 10^-{self.exponent}>'
+
+def exponent(currency):
+    return CURRENCY_EXPONENTS.get(currency, DEFAULT_EXPONENT)
+
+def to_minor(amount, currency):
+    """Major units (float) -> integer minor units, rounded to the currency's precision"""
+    if currency is None:
+        raise ValueError('set the currency before the amount')
+    return round(amount * 10 ** exponent(currency))
+
+def from_minor(minor, currency):
+    return minor / 10 ** exponent(currency)
+
+def scale_expression(currency_column):
+    """SQL for 10^exponent of the currency in `currency_column`"""
+    return case({code: 10 ** places for code, places in CURRENCY_EXPONENTS.items()},
+                value=currency_column, else_=10 ** DEFAULT_EXPONENT)
+
+def sync_currencies(connection):
+    """Fill the currencies table from CURRENCY_EXPONENTS (plus any currency already in use)"""
+    from .transfer import Transfer
+
+    table = Currency.__table__
+    used = set()
+    for column in (Transfer.from_currency, Transfer.to_currency):
+        used.update(code for (code,) in connection.execute(db.select(column).distinct()))
+    wanted = {code: exponent(code) for code in used | set(CURRENCY_EXPONENTS)}
+    known = {code for (code,) in connection.execute(db.select(table.c.code))}
+    missing = [{'code': code, 'exponent': places} for code, places in sorted(wanted.items())
+               if code not in known]
+    if missing:
+        connection.execute(table.insert(), missing)
+    return len(missing)
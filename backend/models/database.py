@@ -1,24 +1,189 @@
 # backend/models/database.py
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from datetime import datetime
+import os
 import uuid
 
 # Create database instance
 db = SQLAlchemy()
 
+DEFAULT_DATABASE_URI = 'sqlite:///remitlite.db'
+
+# Engine defaults, each one can be overridden by app.config or the environment
+DATABASE_DEFAULTS = {
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 30,        # seconds to wait for a pooled connection
+    'DB_POOL_RECYCLE': 1800,      # seconds before a connection is replaced
+    'SQLITE_JOURNAL_MODE': 'WAL',  # readers no longer block on the writer
+    'SQLITE_SYNCHRONOUS': 'NORMAL',  # safe with WAL, far fewer fsyncs than FULL
+    'SQLITE_BUSY_TIMEOUT': 5000,  # milliseconds to wait on a locked database
+    'SQLITE_CACHE_SIZE': -20000,  # negative means KiB, so roughly 20 MB per connection
+    'SQLITE_FOREIGN_KEYS': 'ON',  # SQLite leaves FOREIGN KEY clauses unenforced unless asked
+}
+
+INT_SETTINGS = {
+    'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE',
+    'SQLITE_BUSY_TIMEOUT', 'SQLITE_CACHE_SIZE',
+}
+
 def generate_uuid():
     """Generate unique ID for records"""
     return str(uuid.uuid4())
 
-def init_db(app):
-    """Initialize database with app"""
-    # SQLite for development, PostgreSQL for production
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///remitlite.db'
+def normalize_database_uri(uri):
+    """Accept the postgres:// scheme that Heroku/Render hand out"""
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def is_sqlite_uri(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+def is_memory_sqlite_uri(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def get_database_settings(config=None):
+    """Resolve effective database settings: app config, then environment, then defaults"""
+    config = config or {}
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or os.getenv('DATABASE_URL') or DEFAULT_DATABASE_URI
+    settings = {'SQLALCHEMY_DATABASE_URI': normalize_database_uri(uri)}
+
+    for key, default in DATABASE_DEFAULTS.items():
+        value = config.get(key)
+        if value is None:
+            value = os.getenv(key, default)
+        settings[key] = int(value) if key in INT_SETTINGS else str(value).upper()
+
+    return settings
+
+def build_engine_options(settings):
+    """Translate settings into SQLAlchemy create_engine() keyword arguments"""
+    uri = settings['SQLALCHEMY_DATABASE_URI']
+    options = {}
+
+    # In-memory SQLite runs on a StaticPool, which takes no sizing arguments
+    if not is_memory_sqlite_uri(uri):
+        options['pool_size'] = settings['DB_POOL_SIZE']
+        options['max_overflow'] = settings['DB_MAX_OVERFLOW']
+        options['pool_timeout'] = settings['DB_POOL_TIMEOUT']
+        options['pool_recycle'] = settings['DB_POOL_RECYCLE']
+
+    if not is_sqlite_uri(uri):
+        # Drop connections the server closed while they sat idle in the pool
+        options['pool_pre_ping'] = True
+
+    return options
+
+def sqlite_pragma_statements(settings):
+    return [
+        f"PRAGMA journal_mode={settings['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={settings['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={settings['SQLITE_BUSY_TIMEOUT']}",
+        f"PRAGMA cache_size={settings['SQLITE_CACHE_SIZE']}",
+        f"PRAGMA foreign_keys={settings['SQLITE_FOREIGN_KEYS']}",
+    ]
+
+def install_sqlite_pragmas(engine, settings):
+    """Run the tuning pragmas on every new DBAPI connection of a SQLite engine"""
+    statements = sqlite_pragma_statements(settings)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+def resolve_sqlite_path(uri, instance_path):
+    """A relative SQLite file URI made absolute under the instance folder; other URIs unchanged
+
+    Flask-SQLAlchemy would do the same, but it also creates the instance
+    folder while the app is being built.
+    """
+    url = make_url(uri)
+    if is_memory_sqlite_uri(uri) or url.query.get('uri') or os.path.isabs(url.database):
+        return uri
+    return url.set(database=os.path.join(instance_path, url.database)).render_as_string(hide_password=False)
+
+def create_sqlite_directory(engine):
+    """Create the SQLite file's folder on the first connection, not at app build time"""
+    directory = os.path.dirname(engine.url.database)
+
+    @event.listens_for(engine, 'do_connect')
+    def make_directory(dialect, connection_record, cargs, cparams):
+        os.makedirs(directory, exist_ok=True)
+
+def configure_database(app):
+    """Apply database settings to the app and bind the shared db instance to it"""
+    settings = get_database_settings(app.config)
+    if is_sqlite_uri(settings['SQLALCHEMY_DATABASE_URI']):
+        settings['SQLALCHEMY_DATABASE_URI'] = resolve_sqlite_path(settings['SQLALCHEMY_DATABASE_URI'],
+                                                                  app.instance_path)
+    app.config.update(settings)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
+
+    engine_options = build_engine_options(settings)
+    engine_options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
     db.init_app(app)
-    
+
+    if is_sqlite_uri(settings['SQLALCHEMY_DATABASE_URI']):
+        with app.app_context():
+            install_sqlite_pragmas(db.engine, settings)
+            if not is_memory_sqlite_uri(settings['SQLALCHEMY_DATABASE_URI']):
+                create_sqlite_directory(db.engine)
+
+    return settings
+
+def database_report(app):
+    """Effective database settings, read back from a live connection where possible"""
+    with app.app_context():
+        engine = db.engine
+        report = {
+            'url': engine.url.render_as_string(hide_password=True),
+            'dialect': engine.dialect.name,
+            'pool': type(engine.pool).__name__,
+        }
+
+        if hasattr(engine.pool, 'size'):
+            report['pool_size'] = engine.pool.size()
+            report['max_overflow'] = engine.pool._max_overflow
+            report['pool_timeout'] = engine.pool.timeout()
+
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as connection:
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'foreign_keys'):
+                    report[pragma] = connection.exec_driver_sql(f'PRAGMA {pragma}').scalar()
+
+    return report
+
+def foreign_key_violations(connection):
+    """{table: rows} that break a foreign key (SQLite only; other databases enforce them on write)"""
+    if connection.dialect.name != 'sqlite':
+        return {}
+    violations = {}
+    for row in connection.exec_driver_sql('PRAGMA foreign_key_check'):
+        violations[row[0]] = violations.get(row[0], 0) + 1
+    return violations
+
+def print_database_report(app):
+    print("🗄️  Database settings:")
+    for key, value in database_report(app).items():
+        print(f"   {key}: {value}")
+
+def init_db(app):
+    """Initialize database with app"""
+    # SQLite for development, PostgreSQL for production (set DATABASE_URL)
+    configure_database(app)
+
     # Create all tables
     with app.app_context():
         db.create_all()
-        print("✅ Database tables created!")
\ No newline at end of file
+        print("✅ Database tables created!")
@@ -25,7 +25,7 @@ class ExchangeRate(db.Model):
             'from_currency': self.from_currency,
             'to_currency': self.to_currency,
             'rate': self.rate,
-            'last_updated': self.last_updated.isoformat(),
+            'last_updated': self.last_updated,
             'is_fresh': self.is_fresh()
         }
     
@@ -0,0 +1,16 @@
+# backend/models/rate_quote.py
+from .database import db
+
+class RateQuote(db.Model):
+    """A locked rate, redeemable by one transfer until it expires"""
+    __tablename__ = 'rate_quotes'
+    
+    id = db.Column(db.String(24), primary_key=True)  # the unsigned part of the quote ID
+    from_currency = db.Column(db.String(3), nullable=False)
+    to_currency = db.Column(db.String(3), nullable=False)
+    rate = db.Column(db.Float, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    redeemed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<RateQuote {self.id}: {self.from_currency}/{self.to_currency} {self.rate}>'
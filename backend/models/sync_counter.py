@@ -0,0 +1,41 @@
+# backend/models/sync_counter.py
+from .database import db
+from sqlalchemy import event
+
+class SyncCounter(db.Model):
+    """Last change version handed out per table, for ?since= delta sync
+
+    Writers bump the row inside their own transaction, which locks it until
+    they commit. Versions therefore become visible in commit order, so once a
+    reader sees version N, every change up to N has committed.
+    """
+    __tablename__ = 'sync_counters'
+
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SyncCounter {self.name}: {self.value}>'
+
+@event.listens_for(SyncCounter.__table__, 'after_create')
+def _create_transfers_counter(table, connection, **kwargs):
+    connection.execute(table.insert().values(name='transfers', value=0))
+
+def reserve_versions(connection, name, count=1):
+    """Take the next `count` versions for `name`; returns the last one"""
+    table = SyncCounter.__table__
+    bump = db.update(table).where(table.c.name == name).values(value=table.c.value + count)
+    if connection.dialect.update_returning:
+        last = connection.execute(bump.returning(table.c.value)).scalar()
+    else:
+        last = current_version(connection, name) if connection.execute(bump).rowcount else None
+    if last is None:
+        connection.execute(table.insert().values(name=name, value=count))
+        last = count
+    return last
+
+def current_version(connection, name):
+    """Highest committed version for `name` (0 before the first change)"""
+    table = SyncCounter.__table__
+    value = connection.execute(db.select(table.c.value).where(table.c.name == name)).scalar()
+    return value or 0
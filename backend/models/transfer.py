@@ -1,6 +1,27 @@
 # backend/models/transfer.py
-from .database import db, generate_uuid
+from .database import db
+from .currency import to_minor
+from .sync_counter import reserve_versions
+from .types import CompactId, money
+from services.id_generator import new_transfer_id
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, load_only, noload
+
+# Fields a client may request with ?fields=, in response order
+TRANSFER_FIELDS = (
+    'id', 'sender', 'recipient', 'amount', 'from_currency', 'to_currency',
+    'converted_amount', 'exchange_rate', 'fee', 'total_amount', 'delivery_time',
+    'status', 'tracking_number', 'created_at', 'completed_at',
+)
+PARTY_RELATIONSHIPS = ('sender', 'recipient')
+# Amounts are stored as integer minor units of a currency
+MONEY_COLUMNS = {
+    'amount': ('amount_minor', 'from_currency'),
+    'converted_amount': ('converted_amount_minor', 'to_currency'),
+    'fee': ('fee_minor', 'from_currency'),
+    'total_amount': ('total_amount_minor', 'from_currency'),
+}
 
 class Transfer(db.Model):
     """Model for money transfers"""
@@ -12,32 +33,120 @@ class Transfer(db.Model):
     STATUS_FAILED = 'failed'
     STATUS_CANCELLED = 'cancelled'
     
-    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    # Time-ordered, so inserts append to the right edge of the index
+    id = db.Column(CompactId, primary_key=True, default=new_transfer_id)
     
     # Sender and Recipient (linked to User model)
-    sender_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    recipient_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    sender_id = db.Column(CompactId, db.ForeignKey('users.id'), nullable=False)
+    recipient_id = db.Column(CompactId, db.ForeignKey('users.id'), nullable=False)
     
     # Transfer details
-    amount = db.Column(db.Float, nullable=False)
+    amount_minor = db.Column(db.BigInteger, nullable=False)
     from_currency = db.Column(db.String(3), nullable=False)  # USD, EUR, etc.
     to_currency = db.Column(db.String(3), nullable=False)
-    converted_amount = db.Column(db.Float, nullable=False)
+    converted_amount_minor = db.Column(db.BigInteger, nullable=False)
     exchange_rate = db.Column(db.Float, nullable=False)
     
     # Fees and timing
-    fee = db.Column(db.Float, default=0.0)
-    total_amount = db.Column(db.Float, nullable=False)
+    fee_minor = db.Column(db.BigInteger, default=0)
+    total_amount_minor = db.Column(db.BigInteger, nullable=False)
     delivery_time = db.Column(db.String(50), nullable=False)
     
+    # Major-unit floats, as the API has always returned them
+    amount = money(*MONEY_COLUMNS['amount'])
+    converted_amount = money(*MONEY_COLUMNS['converted_amount'])
+    fee = money(*MONEY_COLUMNS['fee'])
+    total_amount = money(*MONEY_COLUMNS['total_amount'])
+    
     # Status and tracking
     status = db.Column(db.String(20), default=STATUS_PENDING)
     tracking_number = db.Column(db.String(20), unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
     
-    def to_dict(self):
-        """Convert transfer to dictionary for JSON response"""
+    # Bumped on every insert/update from the sync counter, for ?since= delta sync.
+    # Rows bulk-inserted with Core (seed.py) keep 0, i.e. part of a full sync.
+    version = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', index=True)
+    
+    def __init__(self, **kwargs):
+        # Amounts are converted with their currency's exponent, so set currencies first
+        for name in ('from_currency', 'to_currency'):
+            if name in kwargs:
+                setattr(self, name, kwargs.pop(name))
+        super().__init__(**kwargs)
+    
+    @staticmethod
+    def storage_row(row):
+        """A row dict with major-unit amounts, as stored (for Core inserts)"""
+        row = dict(row)
+        for name, (column, currency) in MONEY_COLUMNS.items():
+            if name in row:
+                value = row.pop(name)
+                row[column] = None if value is None else to_minor(value, row[currency])
+        return row
+    
+    @staticmethod
+    def parse_fields(value):
+        """Parse a ?fields= value such as 'id,amount,sender.name,recipient'.
+
+        Returns {field: None} for plain fields and {relationship: set_of_user_fields}
+        for sender/recipient (None meaning the whole user). An empty value means
+        all fields. Raises ValueError on unknown fields.
+        """
+        if not value:
+            return None
+
+        from .user import USER_FIELDS
+
+        fields = {}
+        for item in value.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            name, _, sub_field = item.partition('.')
+            if name not in TRANSFER_FIELDS or (sub_field and name not in PARTY_RELATIONSHIPS):
+                raise ValueError(f'Unknown field: {item}')
+            if sub_field:
+                if sub_field not in USER_FIELDS:
+                    raise ValueError(f'Unknown field: {item}')
+                if name not in fields:
+                    fields[name] = set()
+                if fields[name] is not None:
+                    fields[name].add(sub_field)
+            else:
+                fields[name] = None
+        return fields or None
+
+    @classmethod
+    def query_options(cls, fields=None):
+        """Loader options that only SELECT the columns and JOINs the fields need"""
+        from .user import User
+
+        if fields is None:
+            return [joinedload(cls.sender), joinedload(cls.recipient)]
+
+        columns = []
+        for name in fields:
+            if name in MONEY_COLUMNS:
+                columns.extend(getattr(cls, column) for column in MONEY_COLUMNS[name])
+            elif name not in PARTY_RELATIONSHIPS:
+                columns.append(getattr(cls, name))
+        options = [load_only(*columns)] if columns else [load_only(cls.id)]
+        for name in PARTY_RELATIONSHIPS:
+            relationship = getattr(cls, name)
+            if name not in fields:
+                options.append(noload(relationship))
+            elif fields[name] is None:
+                options.append(joinedload(relationship))
+            else:
+                user_columns = [getattr(User, field) for field in fields[name]]
+                options.append(joinedload(relationship).load_only(*user_columns))
+        return options
+
+    def to_dict(self, fields=None):
+        """Convert transfer to dictionary for JSON response (datetimes are left to the JSON provider)"""
+        if fields is not None:
+            return self._project(fields)
         return {
             'id': self.id,
             'sender': self.sender.to_dict() if self.sender else None,
@@ -52,14 +161,38 @@ class Transfer(db.Model):
             'delivery_time': self.delivery_time,
             'status': self.status,
             'tracking_number': self.tracking_number,
-            'created_at': self.created_at.isoformat(),
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+            'created_at': self.created_at,
+            'completed_at': self.completed_at
         }
     
+    def _project(self, fields):
+        data = {}
+        for name in TRANSFER_FIELDS:
+            if name not in fields:
+                continue
+            if name in PARTY_RELATIONSHIPS:
+                user = getattr(self, name)
+                data[name] = user.to_dict(fields[name]) if user else None
+            else:
+                data[name] = getattr(self, name)
+        return data
+    
     def mark_completed(self):
         """Mark transfer as completed"""
         self.status = self.STATUS_COMPLETED
         self.completed_at = datetime.utcnow()
     
     def __repr__(self):
-        return f'<Transfer {self.tracking_number}: {self.amount} {self.from_currency} -> {self.converted_amount} {self.to_currency}>'
\ No newline at end of file
+        return f'<Transfer {self.tracking_number}: {self.amount} {self.from_currency} -> {self.converted_amount} {self.to_currency}>'
+
+@event.listens_for(db.session, 'before_flush')
+def _stamp_versions(session, flush_context, instances):
+    """Give new and changed transfers the next versions from the sync counter"""
+    changed = [obj for obj in session.new if isinstance(obj, Transfer)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, Transfer) and session.is_modified(obj, include_collections=False)]
+    if not changed:
+        return
+    last = reserve_versions(session.connection(), Transfer.__tablename__, len(changed))
+    for version, transfer in enumerate(changed, last - len(changed) + 1):
+        transfer.version = version
@@ -0,0 +1,58 @@
+# backend/models/types.py
+"""Compact storage types that keep the Python (and API) values unchanged."""
+import uuid
+
+from sqlalchemy import Float, LargeBinary, cast
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.types import TypeDecorator
+
+from services.id_generator import ID_LENGTH, decode, encode
+from .currency import from_minor, scale_expression, to_minor
+
+_SNOWFLAKE_PREFIX = bytes(8)
+
+class CompactId(TypeDecorator):
+    """String IDs stored as 16 bytes instead of 36 characters of text
+
+    A UUID is stored as its 16 raw bytes. A time-ordered ID from
+    services.id_generator is stored as 8 zero bytes followed by its 64 bits.
+    The two can't be confused, because a version-4 UUID always has a
+    non-zero version nibble in byte 6. Time-ordered IDs sort together and
+    in creation order, so new rows still append at one edge of the index.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        if len(value) == ID_LENGTH:
+            return _SNOWFLAKE_PREFIX + decode(value).to_bytes(8, 'big')
+        return uuid.UUID(value).bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        value = bytes(value)
+        if value[:8] == _SNOWFLAKE_PREFIX:
+            return encode(int.from_bytes(value[8:], 'big'))
+        return str(uuid.UUID(bytes=value))
+
+def money(minor_column, currency_column):
+    """Float attribute in major units over an integer minor-unit column
+
+    Queries get minor / 10^exponent as SQL. Aggregate the minor column, per
+    currency, when the result must be exact.
+    """
+    def fget(self):
+        minor = getattr(self, minor_column)
+        return None if minor is None else from_minor(minor, getattr(self, currency_column))
+
+    def fset(self, value):
+        setattr(self, minor_column,
+                None if value is None else to_minor(value, getattr(self, currency_column)))
+
+    def expr(cls):
+        return cast(getattr(cls, minor_column), Float) / scale_expression(getattr(cls, currency_column))
+
+    return hybrid_property(fget, fset, expr=expr)
@@ -1,13 +1,17 @@
 # models/user.py
 from models.database import db
+from models.types import CompactId
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 from datetime import datetime
 
+# Fields exposed by to_dict(), selectable as e.g. ?fields=sender.name
+USER_FIELDS = ('id', 'name', 'email', 'country_code', 'phone', 'created_at', 'last_login')
+
 class User(db.Model):
     __tablename__ = 'users'
     
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(CompactId, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=True)  # Make email nullable
     password_hash = db.Column(db.String(255), nullable=True)  # Make password_hash nullable
@@ -31,13 +35,15 @@ class User(db.Model):
             return False
         return check_password_hash(self.password_hash, password)
     
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        if fields is not None:
+            return {name: getattr(self, name) for name in USER_FIELDS if name in fields}
         return {
             'id': self.id,
             'name': self.name,
             'email': self.email,
             'country_code': self.country_code,
             'phone': self.phone,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
+            'created_at': self.created_at,
+            'last_login': self.last_login
         }
\ No newline at end of file
@@ -0,0 +1,13 @@
+# backend/models/worker_lease.py
+from .database import db
+
+class WorkerLease(db.Model):
+    """Which process holds each transfer ID worker ID, for every host on the database"""
+    __tablename__ = 'worker_leases'
+
+    slot = db.Column(db.Integer, primary_key=True, autoincrement=False)  # the worker ID, 0-1023
+    holder = db.Column(db.String(128), nullable=False)  # host:pid:random token
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<WorkerLease {self.slot}: {self.holder} until {self.expires_at}>'
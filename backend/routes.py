@@ -1,9 +1,12 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 import requests
-import uuid
 from datetime import datetime
 import random
+from services.precomputed import cached_json_response, STATIC_CACHE_CONTROL
+from services.fee_schedule import current_schedule
+from services.id_generator import new_transfer_id
+from services.transfer_store import TransferRecord, TransferStore
 
 routes_bp = Blueprint('routes', __name__)
 
@@ -21,17 +24,24 @@ COUNTRIES = [
     {"code": "PH", "name": "Philippines", "currency": "PHP"}
 ]
 
-# In-memory storage for transfers (in production, use a database)
-transfers = []
+# In-memory storage for transfers (in production, use a database): the newest
+# TRANSFER_STORE_CAPACITY transfers, indexed by id and by time
+transfers = TransferStore()
+
+@routes_bp.record_once
+def configure_transfer_store(state):
+    capacity = state.app.config.get('TRANSFER_STORE_CAPACITY')
+    if capacity is not None:
+        transfers.configure(int(capacity))
 
 @routes_bp.route('/api/countries', methods=['GET'])
 @cross_origin()
 def get_countries():
     """Get list of supported countries with their currencies"""
-    return jsonify({
+    return cached_json_response('countries', 'static', lambda: {
         "status": "success",
         "data": COUNTRIES
-    })
+    }, cache_control=STATIC_CACHE_CONTROL)
 
 @routes_bp.route('/api/rates', methods=['GET'])
 @cross_origin()
@@ -159,29 +169,30 @@ def create_transfer():
                 }), 400
         
         # Create transfer record
-        transfer = {
-            "id": str(uuid.uuid4()),
-            "sender_name": data['sender_name'],
-            "sender_country": data['sender_country'],
-            "recipient_name": data['recipient_name'],
-            "recipient_country": data['recipient_country'],
-            "amount": float(data['amount']),
-            "from_currency": data['from_currency'],
-            "to_currency": data['to_currency'],
-            "exchange_rate": data.get('exchange_rate', 1.0),
-            "converted_amount": data.get('converted_amount', float(data['amount'])),
-            "fee": calculate_transfer_fee(float(data['amount']), data['from_currency']),
-            "delivery_time": estimate_delivery_time(data['sender_country'], data['recipient_country']),
-            "status": "pending",
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        now = datetime.now().isoformat()
+        transfer = TransferRecord(
+            id=new_transfer_id(),
+            sender_name=data['sender_name'],
+            sender_country=data['sender_country'],
+            recipient_name=data['recipient_name'],
+            recipient_country=data['recipient_country'],
+            amount=float(data['amount']),
+            from_currency=data['from_currency'],
+            to_currency=data['to_currency'],
+            exchange_rate=data.get('exchange_rate', 1.0),
+            converted_amount=data.get('converted_amount', float(data['amount'])),
+            fee=current_schedule().quote(float(data['amount']), data['from_currency'], data['to_currency']),
+            delivery_time=estimate_delivery_time(data['sender_country'], data['recipient_country']),
+            status="pending",
+            created_at=now,
+            updated_at=now
+        )
         
-        transfers.append(transfer)
+        transfers.add(transfer)
         
         return jsonify({
             "status": "success",
-            "data": transfer
+            "data": transfer.to_dict()
         }), 201
         
     except Exception as e:
@@ -193,15 +204,22 @@ def create_transfer():
 @routes_bp.route('/api/transfers', methods=['GET'])
 @cross_origin()
 def get_transfers():
-    """Get transfer history"""
+    """Get transfer history, newest first (?limit=N for the latest N)"""
     try:
-        # Sort by created_at descending
-        sorted_transfers = sorted(transfers, key=lambda x: x['created_at'], reverse=True)
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit < 0:
+            return jsonify({
+                "status": "error",
+                "message": "limit must be a non-negative integer"
+            }), 400
+        
+        # The store is kept in insertion (= created_at) order, so no sort
+        recent = [transfer.to_dict() for transfer in transfers.recent(limit)]
         
         return jsonify({
             "status": "success",
-            "data": sorted_transfers,
-            "count": len(sorted_transfers)
+            "data": recent,
+            "count": len(recent)
         })
         
     except Exception as e:
@@ -215,7 +233,7 @@ def get_transfers():
 def get_transfer(transfer_id):
     """Get a specific transfer by ID"""
     try:
-        transfer = next((t for t in transfers if t['id'] == transfer_id), None)
+        transfer = transfers.get(transfer_id)
         
         if not transfer:
             return jsonify({
@@ -225,7 +243,7 @@ def get_transfer(transfer_id):
         
         return jsonify({
             "status": "success",
-            "data": transfer
+            "data": transfer.to_dict()
         })
         
     except Exception as e:
@@ -234,22 +252,6 @@ def get_transfer(transfer_id):
             "message": str(e)
         }), 500
 
-def calculate_transfer_fee(amount, currency):
-    """Calculate transfer fee based on amount and currency"""
-    # Simple fee calculation: 2% of amount + fixed fee
-    base_fee = 2.99  # USD equivalent
-    percentage_fee = amount * 0.02
-    
-    # Convert base fee to the sender's currency (mock conversion)
-    if currency != 'USD':
-        currency_multipliers = {
-            'EUR': 0.92, 'GBP': 0.79, 'JPY': 150.25, 'CAD': 1.36,
-            'AUD': 1.53, 'INR': 83.12, 'NGN': 785.50, 'KES': 152.75, 'PHP': 58.95
-        }
-        base_fee = base_fee * currency_multipliers.get(currency, 1.0)
-    
-    return round(percentage_fee + base_fee, 2)
-
 def estimate_delivery_time(sender_country, recipient_country):
     """Estimate delivery time based on countries"""
     # Simple logic: same country = instant, different countries = 1-3 days
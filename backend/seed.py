@@ -1,10 +1,19 @@
 # backend/seed.py
+import argparse
+import bisect
+import functools
+import itertools
+import multiprocessing
 import random
+import time
+import uuid
 from datetime import datetime, timedelta
-from app import app, db
+from app import app, db, TransferService
 from models.user import User
 from models.transfer import Transfer
 from models.exchange_rate import ExchangeRate
+from models.currency import from_minor
+from services.id_generator import lease_worker_id
 from werkzeug.security import generate_password_hash
 
 SEED_PASSWORD = generate_password_hash("Password123!")
@@ -196,15 +205,7 @@ def create_sample_transfers(users):
         # Calculate converted amount
         converted_amount = amount * exchange_rate
         
-        # Calculate fee (same logic as TransferService)
-        if amount <= 100:
-            fee = 2.99
-        elif amount <= 500:
-            fee = 4.99
-        elif amount <= 1000:
-            fee = 7.99
-        else:
-            fee = amount * 0.01
+        fee = TransferService.calculate_fee(amount, from_currency, to_currency)
         
         total_amount = amount + fee
         
@@ -253,6 +254,221 @@ def create_sample_transfers(users):
     print(f"✅ Created {len(transfers)} sample transfers")
     return transfers
 
+# ==================== BULK SYNTHETIC DATA ====================
+#
+# `python seed.py --users 1000000 --transfers 50000000 --workers 4` generates
+# production-sized data in chunks with Core executemany inserts. Every chunk
+# has its own RNG derived from (seed, table, chunk), so output is identical
+# for a given seed no matter how many worker processes share the work.
+
+# (sender country, currency, recipient country, currency, weight, mid rate)
+SEED_CORRIDORS = [
+    ('US', 'USD', 'MX', 'MXN', 14, 17.10), ('US', 'USD', 'IN', 'INR', 12, 83.15),
+    ('US', 'USD', 'PH', 'PHP', 8, 56.20), ('US', 'USD', 'NG', 'NGN', 6, 845.50),
+    ('US', 'USD', 'KE', 'KES', 5, 157.80), ('US', 'USD', 'GH', 'GHS', 4, 11.45),
+    ('GB', 'GBP', 'IN', 'INR', 7, 105.45), ('GB', 'GBP', 'NG', 'NGN', 6, 1075.75),
+    ('GB', 'GBP', 'KE', 'KES', 3, 200.10), ('GB', 'GBP', 'PL', 'PLN', 4, 5.05),
+    ('DE', 'EUR', 'TR', 'TRY', 4, 35.05), ('FR', 'EUR', 'SN', 'XOF', 4, 655.96),
+    ('FR', 'EUR', 'MA', 'MAD', 4, 10.63), ('AE', 'AED', 'IN', 'INR', 8, 22.64),
+    ('CA', 'CAD', 'IN', 'INR', 3, 61.40), ('AU', 'AUD', 'CN', 'CNY', 2, 4.72),
+    ('ZA', 'ZAR', 'ZW', 'USD', 2, 0.053), ('KE', 'KES', 'UG', 'UGX', 3, 23.77),
+]
+
+SEED_STATUSES = [
+    (Transfer.STATUS_COMPLETED, 92), (Transfer.STATUS_PENDING, 5),
+    (Transfer.STATUS_FAILED, 2), (Transfer.STATUS_CANCELLED, 1),
+]
+
+# Users are laid out in repeating blocks of SLOT_COUNT: user i lives in
+# SEED_COUNTRY_SLOTS[i % SLOT_COUNT]. Picking a random user from a country is
+# then O(1) without keeping per-country id lists in memory.
+SLOT_COUNT = 100
+
+def _build_country_slots():
+    """Apportion SLOT_COUNT slots by corridor weight, at least one per country"""
+    weights = {}
+    for sender, _, recipient, _, weight, _ in SEED_CORRIDORS:
+        weights[sender] = weights.get(sender, 0) + weight
+        weights[recipient] = weights.get(recipient, 0) + weight
+    countries = sorted(weights)
+    total = sum(weights.values())
+    spare = SLOT_COUNT - len(countries)
+    shares = {c: weights[c] * spare / total for c in countries}
+    counts = {c: 1 + int(shares[c]) for c in countries}
+    # Largest remainder gets the slots lost to rounding down
+    by_remainder = sorted(countries, key=lambda c: shares[c] - int(shares[c]), reverse=True)
+    for country in by_remainder[:SLOT_COUNT - sum(counts.values())]:
+        counts[country] += 1
+    # Interleave countries so consecutive user ids aren't all from one country
+    slots = []
+    while len(slots) < SLOT_COUNT:
+        for country in countries:
+            if counts[country]:
+                slots.append(country)
+                counts[country] -= 1
+    return slots
+
+SEED_COUNTRY_SLOTS = _build_country_slots()
+SLOTS_BY_COUNTRY = {}
+for _slot, _country in enumerate(SEED_COUNTRY_SLOTS):
+    SLOTS_BY_COUNTRY.setdefault(_country, []).append(_slot)
+
+CORRIDOR_CUMULATIVE = list(itertools.accumulate(c[4] for c in SEED_CORRIDORS))
+STATUS_CUMULATIVE = list(itertools.accumulate(w for _, w in SEED_STATUSES))
+
+@functools.lru_cache(maxsize=None)
+def _seed_id_base(seed, table):
+    return uuid.uuid5(uuid.NAMESPACE_URL, f'remitlite-seed:{seed}:{table}').int
+
+def seed_id(seed, table, index):
+    """Deterministic UUID string for row `index` of `table`"""
+    return str(uuid.UUID(int=(_seed_id_base(seed, table) + index) % (1 << 128)))
+
+def chunk_rng(seed, table, chunk_index):
+    return random.Random(f'{seed}:{table}:{chunk_index}')
+
+def weighted_index(rng, cumulative):
+    return bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+
+def random_user_index(rng, country, total_users):
+    """Random user index in `country` under the slot layout"""
+    slot = rng.choice(SLOTS_BY_COUNTRY[country])
+    blocks = (total_users - slot + SLOT_COUNT - 1) // SLOT_COUNT
+    if blocks <= 0:
+        return rng.randrange(total_users)
+    return rng.randrange(blocks) * SLOT_COUNT + slot
+
+def generate_user_rows(seed, chunk_index, start, stop, now):
+    rng = chunk_rng(seed, 'users', chunk_index)
+    rows = []
+    for i in range(start, stop):
+        country = SEED_COUNTRY_SLOTS[i % SLOT_COUNT]
+        rows.append({
+            'id': seed_id(seed, 'users', i),
+            'name': f'Seed User {i}',
+            'email': f'user{i}.s{seed}@seed.example.com',
+            'password_hash': SEED_PASSWORD,
+            'country_code': country,
+            'phone': f'+{rng.randint(1, 999)}-{rng.randint(100000000, 999999999)}',
+            'created_at': now - timedelta(days=rng.randint(30, 1500)),
+        })
+    return rows
+
+def generate_transfer_rows(seed, chunk_index, start, stop, total_users, now, days):
+    rng = chunk_rng(seed, 'transfers', chunk_index)
+    window = days * 86400
+    rows = []
+    for i in range(start, stop):
+        sender_country, from_currency, recipient_country, to_currency, _, mid_rate = \
+            SEED_CORRIDORS[weighted_index(rng, CORRIDOR_CUMULATIVE)]
+        status = SEED_STATUSES[weighted_index(rng, STATUS_CUMULATIVE)][0]
+
+        # Remittance sizes are heavily right-skewed: median ~$200, long tail
+        amount = round(min(max(rng.lognormvariate(5.3, 0.9), 5.0), 20000.0), 2)
+        exchange_rate = round(mid_rate * rng.uniform(0.98, 1.02), 4)
+        fee = TransferService.calculate_fee(amount, from_currency, to_currency)
+        created_at = now - timedelta(seconds=rng.randrange(window))
+
+        rows.append(Transfer.storage_row({
+            'id': seed_id(seed, 'transfers', i),
+            'sender_id': seed_id(seed, 'users', random_user_index(rng, sender_country, total_users)),
+            'recipient_id': seed_id(seed, 'users', random_user_index(rng, recipient_country, total_users)),
+            'amount': amount,
+            'from_currency': from_currency,
+            'to_currency': to_currency,
+            'converted_amount': round(amount * exchange_rate, 2),
+            'exchange_rate': exchange_rate,
+            'fee': fee,
+            'total_amount': round(amount + fee, 2),
+            'delivery_time': '1-2 hours' if rng.random() < 0.6 else '3-5 business days',
+            'status': status,
+            'tracking_number': f'RS{seed % 100:02d}{i:012d}',
+            'created_at': created_at,
+            'completed_at': created_at + timedelta(minutes=rng.randint(5, 360))
+            if status == Transfer.STATUS_COMPLETED else None,
+        }))
+    return rows
+
+_worker_engine = None
+
+def _init_worker(database_uri, settings):
+    """Per-process engine; connections can't be shared across fork"""
+    global _worker_engine
+    from sqlalchemy import create_engine
+    from models.database import install_sqlite_pragmas, is_sqlite_uri
+
+    _worker_engine = create_engine(database_uri)
+    if is_sqlite_uri(database_uri):
+        install_sqlite_pragmas(_worker_engine, settings)
+
+def _insert_chunk(task):
+    table_name, chunk_index, start, stop, options = task
+    if table_name == 'users':
+        rows = generate_user_rows(options['seed'], chunk_index, start, stop, options['now'])
+        table = User.__table__
+    else:
+        rows = generate_transfer_rows(options['seed'], chunk_index, start, stop,
+                                      options['users'], options['now'], options['days'])
+        table = Transfer.__table__
+
+    with _worker_engine.begin() as connection:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+def _run_phase(table_name, total, chunk_size, workers, database_uri, settings, options):
+    tasks = [
+        (table_name, chunk_index, start, min(start + chunk_size, total), options)
+        for chunk_index, start in enumerate(range(0, total, chunk_size))
+    ]
+    started = time.perf_counter()
+    inserted = 0
+
+    if workers > 1:
+        with multiprocessing.Pool(workers, _init_worker, (database_uri, settings)) as pool:
+            for count in pool.imap_unordered(_insert_chunk, tasks):
+                inserted += count
+                _report_progress(table_name, inserted, total, started)
+    else:
+        _init_worker(database_uri, settings)
+        for task in tasks:
+            inserted += _insert_chunk(task)
+            _report_progress(table_name, inserted, total, started)
+
+    elapsed = time.perf_counter() - started
+    rate = inserted / elapsed if elapsed else 0.0
+    print(f"\n✅ {inserted:,} {table_name} in {elapsed:,.1f}s ({rate:,.0f} rows/s)")
+    return {'rows': inserted, 'seconds': round(elapsed, 3), 'rows_per_second': round(rate, 1)}
+
+def _report_progress(table_name, inserted, total, started):
+    elapsed = time.perf_counter() - started
+    rate = inserted / elapsed if elapsed else 0.0
+    print(f"\r   {table_name}: {inserted:,}/{total:,} ({rate:,.0f} rows/s)", end='', flush=True)
+
+def bulk_seed(database_uri, users, transfers, chunk_size=20000, workers=1, seed=42,
+              days=365, settings=None, now=None):
+    """Generate `users` and `transfers` rows with chunked Core inserts"""
+    from models.database import get_database_settings
+
+    if transfers and users < 2:
+        raise ValueError('Need at least 2 users to generate transfers')
+
+    settings = settings or get_database_settings({'SQLALCHEMY_DATABASE_URI': database_uri})
+    options = {
+        'seed': seed,
+        'users': users,
+        'days': days,
+        # Fixed reference time keeps the output reproducible for a given seed
+        'now': now or datetime(2025, 1, 1),
+    }
+
+    print(f"🚀 Bulk seeding {users:,} users and {transfers:,} transfers "
+          f"(seed={seed}, chunk={chunk_size:,}, workers={workers})")
+    # Users first: transfers reference them and SQLite enforces foreign keys
+    report = {'users': _run_phase('users', users, chunk_size, workers, database_uri, settings, options)}
+    report['transfers'] = _run_phase('transfers', transfers, chunk_size, workers,
+                                     database_uri, settings, options)
+    return report
+
 def calculate_statistics():
     """Calculate and display database statistics"""
     print("\n📊 Database Statistics:")
@@ -260,12 +476,16 @@ def calculate_statistics():
     print(f"   Transfers: {Transfer.query.count()}")
     print(f"   Exchange Rates: {ExchangeRate.query.count()}")
     
-    # Total transfer volume
-    total_volume = db.session.query(db.func.sum(Transfer.amount)).scalar() or 0
-    total_fees = db.session.query(db.func.sum(Transfer.fee)).scalar() or 0
+    # Total transfer volume, summed exactly in minor units per currency
+    totals = db.session.query(
+        Transfer.from_currency,
+        db.func.sum(Transfer.amount_minor),
+        db.func.sum(Transfer.fee_minor)
+    ).group_by(Transfer.from_currency).all()
     
-    print(f"   Total Volume: ${total_volume:,.2f}")
-    print(f"   Total Fees: ${total_fees:,.2f}")
+    print("   Total Volume / Fees:")
+    for currency, volume, fees in totals:
+        print(f"     {currency}: {from_minor(volume or 0, currency):,.2f} / {from_minor(fees or 0, currency):,.2f}")
     
     # Most popular currency pairs
     from sqlalchemy import func
@@ -294,17 +514,43 @@ def clear_existing_data():
     db.session.commit()
     print("✅ Existing data cleared")
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Seed the RemitLite database')
+    parser.add_argument('--users', type=int, help='bulk mode: number of users to generate')
+    parser.add_argument('--transfers', type=int, help='bulk mode: number of transfers to generate')
+    parser.add_argument('--chunk-size', type=int, default=20000, help='rows per INSERT batch')
+    parser.add_argument('--workers', type=int, default=1, help='parallel generator processes')
+    parser.add_argument('--seed', type=int, default=42, help='random seed (same seed, same data)')
+    parser.add_argument('--days', type=int, default=365, help='history window for transfers')
+    parser.add_argument('--append', action='store_true', help='keep existing data')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main seeding function"""
+    args = parse_args(argv)
     print("🚀 Starting database seeding...")
     
     with app.app_context():
-        # Clear existing data (comment this out if you want to keep existing data)
-        clear_existing_data()
+        db.create_all()
+        
+        if not args.append:
+            clear_existing_data()
+        
+        if args.users is not None or args.transfers is not None:
+            from models.database import get_database_settings
+            database_uri = db.engine.url.render_as_string(hide_password=False)
+            db.session.remove()
+            bulk_seed(database_uri, args.users or 0, args.transfers or 0,
+                      chunk_size=args.chunk_size, workers=args.workers, seed=args.seed,
+                      days=args.days, settings=get_database_settings(app.config))
+            calculate_statistics()
+            return
         
         # Create sample data
         users = create_sample_users()
         exchange_rates = create_sample_exchange_rates()
+        # Lease a transfer ID worker ID before the transfers' transaction takes the write lock
+        lease_worker_id()
         transfers = create_sample_transfers(users)
         
         # Show statistics
@@ -0,0 +1,2 @@
+# backend/services
+# Runtime building blocks shared by the API routes (serialization, caching, ...).
@@ -0,0 +1,105 @@
+# backend/services/conversion_graph.py
+"""Best conversion path between any two currencies in the rate snapshot.
+
+The snapshot is a graph. Each quoted rate base->quote is an edge, and its
+inverse quote->base is an edge too. An edge costs -log(rate) plus
+-log(1 - spread), the hop's spread. Summing costs along a path multiplies
+the rates and charges every extra hop its spread, so the cheapest path is
+the one that delivers the most of the target currency. A two-hop route
+(KES->USD->NGN) only beats a direct quote when it is better by more than
+a spread.
+
+Every route of up to MAX_HOPS hops is computed when the snapshot changes,
+with one hop-limited Bellman-Ford pass per source currency. A request then
+costs one dict lookup. The quoted rate is the product of the mid rates
+along the chosen path; spreads only decide which path wins.
+"""
+import math
+import os
+from collections import namedtuple
+
+MAX_HOPS = 3
+HOP_SPREAD = float(os.getenv('CONVERSION_HOP_SPREAD', 0.0025))
+# Wider spreads for thinly traded currencies; a hop pays the larger of its two ends
+CURRENCY_SPREADS = {
+    'NGN': 0.01, 'GHS': 0.01, 'ETB': 0.01, 'AOA': 0.01, 'MZN': 0.01, 'ZMW': 0.01,
+    'UGX': 0.0075, 'RWF': 0.0075, 'TZS': 0.0075, 'XOF': 0.005, 'EGP': 0.0075,
+}
+
+Route = namedtuple('Route', 'rate path source')
+
+def hop_spread(source, target):
+    return max(HOP_SPREAD, CURRENCY_SPREADS.get(source, 0), CURRENCY_SPREADS.get(target, 0))
+
+def build_edges(rates):
+    """{currency: [(neighbour, mid rate, cost)]}; quoted rates win over inverted ones"""
+    mids = {}
+    for base, quotes in rates.items():
+        for quote, rate in quotes.items():
+            if quote != base and rate and rate > 0:
+                mids.setdefault((quote, base), 1 / rate)
+    for base, quotes in rates.items():
+        for quote, rate in quotes.items():
+            if quote != base and rate and rate > 0:
+                mids[(base, quote)] = rate
+    edges = {}
+    for (source, target), rate in mids.items():
+        cost = -math.log(rate) - math.log(1 - hop_spread(source, target))
+        edges.setdefault(source, []).append((target, rate, cost))
+        edges.setdefault(target, [])
+    return edges
+
+def best_routes(edges, source, max_hops=MAX_HOPS):
+    """{target: (cost, path)} for the cheapest path of at most max_hops edges from source"""
+    best = {source: (0.0, (source,))}
+    frontier = [source]
+    for _ in range(max_hops):
+        improved = {}
+        for node in frontier:
+            cost, path = best[node]
+            for target, _, edge_cost in edges[node]:
+                if target in path:
+                    continue
+                total = cost + edge_cost
+                known = improved.get(target) or best.get(target)
+                if known is None or total < known[0] - 1e-12:
+                    improved[target] = (total, path + (target,))
+        if not improved:
+            break
+        best.update(improved)
+        frontier = list(improved)
+    return best
+
+class ConversionPlanner:
+    """Routes for every ordered pair of one snapshot, swapped in atomically"""
+
+    def __init__(self):
+        self._routes = {}
+        self.version = None
+
+    def rebuild(self, rates, version=None):
+        edges = build_edges(rates)
+        mids = {(source, target): rate for source, neighbours in edges.items()
+                for target, rate, _ in neighbours}
+        routes = {}
+        for source in edges:
+            for target, (_, path) in best_routes(edges, source).items():
+                if target == source:
+                    continue
+                rate = 1.0
+                for hop in zip(path, path[1:]):
+                    rate *= mids[hop]
+                quoted = len(path) == 2 and target in rates.get(source, {})
+                routes[(source, target)] = Route(rate, path, 'cache' if quoted else 'derived')
+        # One assignment, so readers see the old table or the new one
+        self._routes = routes
+        self.version = version
+        return self
+
+    def route(self, from_currency, to_currency):
+        return self._routes.get((from_currency, to_currency))
+
+    def __len__(self):
+        return len(self._routes)
+
+RATE_PLANS = ConversionPlanner()
@@ -0,0 +1,180 @@
+# backend/services/fee_schedule.py
+"""Transfer fees computed from a data-driven schedule.
+
+The schedule is a JSON file (fee_schedule.json, or FEE_SCHEDULE_PATH):
+
+    {
+      "version": "2024-01-01",
+      "default": [
+        {"up_to": 100, "flat": 2.99},
+        {"up_to": null, "percent": 1.0, "min": 7.99, "max": 250}
+      ],
+      "corridors": {
+        "USD-NGN": [...],      # exact currency pair
+        "*-KES": [...],        # any currency into KES
+        "GBP-*": [...]         # GBP into anything
+      }
+    }
+
+Each bracket applies to amounts up to and including `up_to` (null means no
+upper limit). fee = flat + amount * percent / 100, clamped to [min, max] and
+rounded to cents. A corridor is matched exact pair first, then `FROM-*`,
+then `*-TO`, then the default brackets.
+
+Brackets are compiled into sorted bounds and found with bisect, and corridor
+lookups are memoized, so quoting a large batch costs a dict hit and a bisect
+per item. The file is re-read when its mtime changes (checked at most every
+FEE_SCHEDULE_CHECK_SECONDS), so a schedule change needs no deploy. A file
+that fails to parse is logged and the previous schedule stays in force.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('remitlite.fees')
+
+DEFAULT_SCHEDULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'fee_schedule.json')
+DEFAULT_CHECK_SECONDS = 5
+WILDCARD = '*'
+MAX_RESOLVED_CORRIDORS = 4096  # memoized (from, to) lookups; currencies come from requests
+
+class FeeScheduleError(ValueError):
+    pass
+
+class Brackets:
+    """One compiled bracket list: sorted upper bounds and their (flat, rate, min, max)"""
+    __slots__ = ('bounds', 'rules')
+
+    def __init__(self, brackets):
+        if not brackets:
+            raise FeeScheduleError('a bracket list needs at least one bracket')
+        parsed = []
+        for bracket in brackets:
+            up_to = bracket.get('up_to')
+            parsed.append((
+                float('inf') if up_to is None else float(up_to),
+                float(bracket.get('flat', 0)),
+                float(bracket.get('percent', 0)) / 100,
+                float(bracket.get('min', 0)),
+                float(bracket['max']) if bracket.get('max') is not None else float('inf'),
+            ))
+        parsed.sort(key=lambda rule: rule[0])
+        if parsed[-1][0] != float('inf'):
+            raise FeeScheduleError('the last bracket must have "up_to": null')
+        self.bounds = [rule[0] for rule in parsed]
+        self.rules = [rule[1:] for rule in parsed]
+
+    def fee(self, amount):
+        flat, rate, minimum, maximum = self.rules[bisect.bisect_left(self.bounds, amount)]
+        return round(min(max(flat + amount * rate, minimum), maximum), 2)
+
+class FeeSchedule:
+    """A parsed schedule; quote() resolves the corridor and applies its brackets"""
+
+    def __init__(self, data):
+        if not isinstance(data, dict) or 'default' not in data:
+            raise FeeScheduleError('fee schedule needs a "default" bracket list')
+        self.data = data
+        self.version = str(data.get('version', ''))  # free text, for people
+        # What the rules actually are: changes with any edit, the same on every host
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.revision = hashlib.blake2b(canonical, digest_size=8).hexdigest()
+        self.default = Brackets(data['default'])
+        self.corridors = {}
+        for key, brackets in data.get('corridors', {}).items():
+            source, sep, target = key.upper().partition('-')
+            if not sep or not source or not target:
+                raise FeeScheduleError(f'corridor {key!r} should look like "USD-NGN", "USD-*" or "*-NGN"')
+            self.corridors[(source, target)] = Brackets(brackets)
+        self._resolved = {}
+
+    def brackets_for(self, from_currency=None, to_currency=None):
+        key = (from_currency, to_currency)
+        brackets = self._resolved.get(key)
+        if brackets is None:
+            corridors = self.corridors
+            brackets = (corridors.get(key)
+                        or corridors.get((from_currency, WILDCARD))
+                        or corridors.get((WILDCARD, to_currency))
+                        or self.default)
+            if len(self._resolved) < MAX_RESOLVED_CORRIDORS:
+                self._resolved[key] = brackets
+        return brackets
+
+    def quote(self, amount, from_currency=None, to_currency=None):
+        return self.brackets_for(from_currency, to_currency).fee(amount)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise FeeScheduleError(f'cannot load fee schedule {path}: {e}') from e
+        try:
+            return cls(data)
+        except FeeScheduleError:
+            raise
+        except (KeyError, TypeError, ValueError) as e:
+            raise FeeScheduleError(f'invalid fee schedule {path}: {e}') from e
+
+class FeeScheduleStore:
+    """The current FeeSchedule, re-read when the file changes"""
+
+    def __init__(self, path=DEFAULT_SCHEDULE_PATH, check_seconds=DEFAULT_CHECK_SECONDS):
+        self._lock = threading.Lock()
+        self.configure(path, check_seconds)
+
+    def configure(self, path, check_seconds=DEFAULT_CHECK_SECONDS):
+        with self._lock:
+            self.path = path
+            self.check_seconds = check_seconds
+            self._schedule = None
+            self._mtime = None
+            self._checked_at = 0.0
+
+    def current(self):
+        now = time.monotonic()
+        if self._schedule is not None and now - self._checked_at < self.check_seconds:
+            return self._schedule
+        with self._lock:
+            if self._schedule is None or now - self._checked_at >= self.check_seconds:
+                self._checked_at = now
+                self._reload_if_changed()
+        return self._schedule
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            schedule = FeeSchedule.load(self.path)
+        except (OSError, FeeScheduleError):
+            if self._schedule is None:
+                raise
+            logger.exception("Keeping fee schedule %s (%s)", self._schedule.version, self._schedule.revision)
+            return
+        if self._schedule is not None:
+            logger.info("Loaded fee schedule %s (%s)", schedule.version, schedule.revision)
+        self._schedule = schedule
+        self._mtime = mtime
+
+FEE_SCHEDULES = FeeScheduleStore(os.getenv('FEE_SCHEDULE_PATH', DEFAULT_SCHEDULE_PATH),
+                                 float(os.getenv('FEE_SCHEDULE_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)))
+
+def current_schedule():
+    return FEE_SCHEDULES.current()
+
+def init_fee_schedule(app):
+    """Point the shared store at FEE_SCHEDULE_PATH from the app config, if set"""
+    path = app.config.get('FEE_SCHEDULE_PATH')
+    if path:
+        check_seconds = float(app.config.get('FEE_SCHEDULE_CHECK_SECONDS', DEFAULT_CHECK_SECONDS))
+        FEE_SCHEDULES.configure(path, check_seconds)
+    # Fail at startup rather than on the first quote
+    return FEE_SCHEDULES.current()
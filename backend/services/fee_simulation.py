@@ -0,0 +1,288 @@
+# backend/services/fee_simulation.py
+"""What-if revenue for candidate fee schedules over historical transfers.
+
+Transfers are streamed from the database in chunks of `chunk_size` rows.
+Each row is (amount, fee, corridor id); a CASE in the query assigns the
+corridor id. Each chunk becomes one NumPy array, and every candidate
+schedule (in the fee_schedule.json format) is priced over the whole chunk
+at once: np.searchsorted picks the bracket, as bisect does in
+FeeSchedule.quote. The results are summed per
+(corridor, amount band) with np.bincount. Memory use is one chunk plus
+the per-group totals, however many transfers there are.
+
+The report compares each candidate with the fee actually charged:
+revenue, delta, mean fee change, and how many transfers would pay more or
+less. It breaks these down by corridor, by amount band and by the two
+combined.
+
+NumPy is an optional dependency: simulate() raises FeeSimulationError
+when it isn't installed.
+"""
+import time
+from itertools import chain
+
+from sqlalchemy import and_, case, func, literal, select
+
+from services.fee_schedule import FeeSchedule
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+SIMULATION_AVAILABLE = np is not None
+DEFAULT_CHUNK_SIZE = 250_000
+DEFAULT_AMOUNT_BANDS = (100, 500, 1000, 5000)  # upper edges; the last band is open-ended
+
+class FeeSimulationError(ValueError):
+    pass
+
+def band_labels(bands):
+    edges = (0,) + tuple(bands)
+    labels = [f'{lower:g}-{upper:g}' for lower, upper in zip(edges, edges[1:])]
+    return labels + [f'{edges[-1]:g}+']
+
+def vector_fees(brackets, amounts):
+    """FeeSchedule Brackets.fee() over an array of amounts"""
+    rules = np.asarray(brackets.rules, dtype=np.float64)[
+        np.searchsorted(np.asarray(brackets.bounds), amounts, side='left')]
+    fees = np.minimum(np.maximum(rules[:, 0] + amounts * rules[:, 1], rules[:, 2]), rules[:, 3])
+    return round_cents(fees)
+
+def round_cents(values):
+    """np.round(values, 2), except near-ties go through round() so results match FeeSchedule exactly"""
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(value, 2) for value in values[near_tie].tolist()]
+    return rounded
+
+class CandidatePricer:
+    """Prices chunks for one schedule, resolving each corridor's brackets once"""
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.group_of_pair = []  # pair id -> index into self.groups
+        self.groups = [schedule.default]
+
+    def register_pair(self, from_currency, to_currency):
+        brackets = self.schedule.brackets_for(from_currency, to_currency)
+        for index, known in enumerate(self.groups):
+            if known is brackets:
+                break
+        else:
+            index = len(self.groups)
+            self.groups.append(brackets)
+        self.group_of_pair.append(index)
+
+    def fees(self, amounts, pair_ids):
+        fees = vector_fees(self.groups[0], amounts)
+        if len(self.groups) > 1:
+            groups = np.asarray(self.group_of_pair, dtype=np.int64)[pair_ids]
+            for index in range(1, len(self.groups)):
+                mask = groups == index
+                if mask.any():
+                    fees[mask] = vector_fees(self.groups[index], amounts[mask])
+        return fees
+
+class _Totals:
+    """Per-(corridor, band) sums that grow as new corridors show up"""
+
+    FIELDS = ('transfers', 'volume', 'current_revenue')
+    CANDIDATE_FIELDS = ('revenue', 'paying_more', 'paying_less')
+
+    def __init__(self, candidates, band_count):
+        self.band_count = band_count
+        self.size = 0
+        self.sums = {name: np.zeros(0) for name in self.FIELDS}
+        self.candidate_sums = {
+            name: {field: np.zeros(0) for field in self.CANDIDATE_FIELDS} for name in candidates
+        }
+
+    def _add(self, array, cells, weights=None):
+        counts = np.bincount(cells, weights=weights, minlength=self.size)
+        if len(array) < self.size:
+            array = np.concatenate([array, np.zeros(self.size - len(array))])
+        return array + counts
+
+    def add_chunk(self, cells, amounts, current_fees, candidate_fees):
+        sums = self.sums
+        sums['transfers'] = self._add(sums['transfers'], cells)
+        sums['volume'] = self._add(sums['volume'], cells, amounts)
+        sums['current_revenue'] = self._add(sums['current_revenue'], cells, current_fees)
+        for name, fees in candidate_fees.items():
+            target = self.candidate_sums[name]
+            target['revenue'] = self._add(target['revenue'], cells, fees)
+            target['paying_more'] = self._add(target['paying_more'], cells[fees > current_fees + 0.005])
+            target['paying_less'] = self._add(target['paying_less'], cells[fees < current_fees - 0.005])
+
+    def grow(self, pair_count):
+        self.size = pair_count * self.band_count
+
+def _summary(transfers, volume, current_revenue, candidates):
+    transfers, current_revenue = int(transfers), float(current_revenue)
+    row = {
+        'transfers': transfers,
+        'volume': round(float(volume), 2),
+        'current_revenue': round(float(current_revenue), 2),
+        'candidates': {},
+    }
+    for name, (revenue, paying_more, paying_less) in candidates.items():
+        delta = float(revenue) - current_revenue
+        row['candidates'][name] = {
+            'revenue': round(float(revenue), 2),
+            'revenue_delta': round(delta, 2),
+            'revenue_delta_pct': round(delta / current_revenue * 100, 2) if current_revenue else None,
+            # Fees are added to what the sender pays, so this is the change in customer cost
+            'avg_fee_change': round(delta / transfers, 4) if transfers else 0.0,
+            'paying_more': int(paying_more),
+            'paying_less': int(paying_less),
+        }
+    return row
+
+def _build_report(totals, pair_keys, bands, names):
+    shape = (len(pair_keys), totals.band_count)
+
+    def grid(array):
+        padded = np.zeros(shape[0] * shape[1])
+        padded[:len(array)] = array
+        return padded.reshape(shape)
+
+    base = {field: grid(totals.sums[field]) for field in _Totals.FIELDS}
+    candidates = {name: {field: grid(totals.candidate_sums[name][field]) for field in _Totals.CANDIDATE_FIELDS}
+                  for name in names}
+
+    def rows(reduce, labels, key):
+        reduced = [reduce(base[field]) for field in _Totals.FIELDS]
+        reduced_candidates = {name: [reduce(candidates[name][field]) for field in _Totals.CANDIDATE_FIELDS]
+                              for name in names}
+        out = []
+        for index, label in enumerate(labels):
+            if not reduced[0][index]:
+                continue
+            values = [array[index] for array in reduced]
+            cand = {name: tuple(array[index] for array in arrays) for name, arrays in reduced_candidates.items()}
+            out.append(dict({key: label}, **_summary(*values, cand)))
+        return out
+
+    corridor_labels = [f'{source}-{target}' for source, target in pair_keys]
+    labels = band_labels(bands)
+    cross_labels = [(corridor, band) for corridor in corridor_labels for band in labels]
+
+    by_corridor_band = []
+    for row in rows(lambda grid_: grid_.ravel(), cross_labels, 'cell'):
+        corridor, band = row.pop('cell')
+        by_corridor_band.append(dict({'corridor': corridor, 'band': band}, **row))
+
+    return {
+        'totals': _summary(*(base[field].sum() for field in _Totals.FIELDS),
+                           {name: tuple(candidates[name][field].sum() for field in _Totals.CANDIDATE_FIELDS)
+                            for name in names}),
+        'by_corridor': sorted(rows(lambda grid_: grid_.sum(axis=1), corridor_labels, 'corridor'),
+                              key=lambda row: -row['current_revenue']),
+        'by_band': rows(lambda grid_: grid_.sum(axis=0), labels, 'band'),
+        'by_corridor_band': by_corridor_band,
+    }
+
+def _parse_candidates(candidates):
+    if not candidates:
+        raise FeeSimulationError('at least one candidate schedule is required')
+    parsed = {}
+    for name, schedule in candidates.items():
+        parsed[name] = schedule if isinstance(schedule, FeeSchedule) else FeeSchedule(schedule)
+    return parsed
+
+def simulate_chunks(chunks, pair_keys, candidates, bands=DEFAULT_AMOUNT_BANDS):
+    """Report for chunks of [amount, fee, pair id] rows, pair ids indexing pair_keys"""
+    if not SIMULATION_AVAILABLE:
+        raise FeeSimulationError('fee simulation needs NumPy (pip install numpy)')
+    pricers = {name: CandidatePricer(schedule) for name, schedule in _parse_candidates(candidates).items()}
+    for pair in pair_keys:
+        for pricer in pricers.values():
+            pricer.register_pair(*pair)
+
+    band_edges = np.asarray(sorted(bands), dtype=np.float64)
+    totals = _Totals(pricers, len(band_edges) + 1)
+    totals.grow(len(pair_keys))
+    skipped = 0
+    started = time.perf_counter()
+
+    for chunk in chunks:
+        chunk = np.asarray(chunk, dtype=np.float64).reshape(-1, 3)
+        known = chunk[:, 2] >= 0
+        if not known.all():
+            # A corridor that appeared after the pair list was read
+            skipped += int((~known).sum())
+            chunk = chunk[known]
+        if not len(chunk):
+            continue
+        amounts, current_fees = chunk[:, 0], chunk[:, 1]
+        pair_ids = chunk[:, 2].astype(np.int64)
+
+        cells = pair_ids * totals.band_count + np.searchsorted(band_edges, amounts, side='left')
+        totals.add_chunk(cells, amounts, current_fees,
+                         {name: pricer.fees(amounts, pair_ids) for name, pricer in pricers.items()})
+
+    report = _build_report(totals, pair_keys, sorted(bands), list(pricers))
+    elapsed = time.perf_counter() - started
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['totals']['transfers'] / elapsed) if elapsed else None
+    report['skipped'] = skipped
+    report['bands'] = band_labels(sorted(bands))
+    return report
+
+def _filtered(query, table, since, until, statuses):
+    if since is not None:
+        query = query.where(table.c.created_at >= since)
+    if until is not None:
+        query = query.where(table.c.created_at < until)
+    if statuses:
+        query = query.where(table.c.status.in_(statuses))
+    return query
+
+def corridor_pairs(connection, since=None, until=None, statuses=None):
+    """Distinct (from_currency, to_currency) pairs among the selected transfers"""
+    from models.transfer import Transfer
+
+    table = Transfer.__table__
+    query = _filtered(select(table.c.from_currency, table.c.to_currency).distinct(),
+                      table, since, until, statuses)
+    return [tuple(row) for row in connection.execute(query)]
+
+def transfer_chunks(connection, pair_keys, since=None, until=None, statuses=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream [amount, fee, pair id] float arrays of up to chunk_size rows"""
+    from models.currency import exponent
+    from models.transfer import Transfer
+
+    table = Transfer.__table__
+    # The database maps each corridor to its index, so rows arrive as three
+    # numbers and convert to an array without per-row Python work
+    pair_id = case(
+        *[(and_(table.c.from_currency == source, table.c.to_currency == target), index)
+          for index, (source, target) in enumerate(pair_keys)],
+        else_=-1
+    ) if pair_keys else literal(-1)
+    query = _filtered(select(table.c.amount_minor, func.coalesce(table.c.fee_minor, 0), pair_id),
+                      table, since, until, statuses)
+    # Amounts are stored in minor units; a corridor fixes the currency, so
+    # its pair id picks the divisor (the trailing 1 serves unknown pairs, id -1)
+    scales = np.array([10 ** exponent(source) for source, _ in pair_keys] + [1], dtype=np.float64)
+
+    result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+    for partition in result.partitions(chunk_size):
+        chunk = np.fromiter(chain.from_iterable(partition), dtype=np.float64,
+                            count=len(partition) * 3).reshape(-1, 3)
+        chunk[:, :2] /= scales[chunk[:, 2].astype(np.int64)][:, None]
+        yield chunk.ravel()
+
+def simulate(engine, candidates, since=None, until=None, statuses=None,
+             bands=DEFAULT_AMOUNT_BANDS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Revenue impact of each candidate schedule over the stored transfers"""
+    if not SIMULATION_AVAILABLE:
+        raise FeeSimulationError('fee simulation needs NumPy (pip install numpy)')
+    with engine.connect() as connection:
+        pair_keys = corridor_pairs(connection, since, until, statuses)
+        chunks = transfer_chunks(connection, pair_keys, since, until, statuses, chunk_size)
+        return simulate_chunks(chunks, pair_keys, candidates, bands)
@@ -0,0 +1,289 @@
+# backend/services/id_generator.py
+"""Time-ordered, collision-free IDs for transfers (Snowflake layout).
+
+An ID is 64 bits: 41 bits of milliseconds since EPOCH_MS, a 10-bit worker
+ID and a 12-bit sequence within the millisecond. It is written as 13
+Crockford base32 characters, so string order is creation order. Tracking
+numbers are the same ID prefixed with 'RM'. New rows land at the right edge
+of the primary key and tracking_number indexes, and sorting by either
+sorts by time.
+
+Uniqueness needs no retries, only a distinct worker ID per live process
+across every host that writes to the database. Each process leases one in
+the `worker_leases` table: it claims the lowest free or expired slot with a
+compare-and-swap on that row, renews the lease once half of LEASE_SECONDS
+has passed and deletes it on exit, so a crashed process's slot frees up when
+its lease runs out. IDs are only issued while the lease has more than
+LEASE_MARGIN_SECONDS left, which absorbs clock skew between hosts. A forked
+child notices the PID change and leases its own slot.
+
+ID_WORKER_ID (0-1023) asks for one particular slot instead. It is leased the
+same way, so a second process asking for it (a forked gunicorn worker,
+another dyno) gets WorkerIdUnavailable instead of issuing duplicates.
+
+Lease writes use their own connection. A before_request hook takes or renews
+the lease before the request opens its transaction, so it never waits on a
+write lock the same request holds (SQLite). An in-memory SQLite database has
+no other processes to coordinate with and skips leasing, as does an
+IdGenerator built without a WorkerLeases: it uses ID_WORKER_ID, else a
+PID-derived worker ID.
+
+The clock never moves an ID backwards. If the wall clock steps back, or
+4096 IDs are issued in one millisecond, the generator carries on from its
+last timestamp (borrowing the next millisecond) instead of sleeping.
+"""
+import atexit
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger('remitlite.ids')
+
+EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKERS = 1 << WORKER_BITS
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_LENGTH = 13  # ceil(64 / 5)
+TRACKING_PREFIX = 'RM'
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+LEASE_SECONDS = 600
+LEASE_MARGIN_SECONDS = 60  # stop issuing on a lease this close to running out
+
+DEFAULTS = {
+    'ID_WORKER_ID': '',  # empty: lease the lowest free slot
+}
+
+class WorkerIdUnavailable(RuntimeError):
+    pass
+
+def encode(value):
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD[digit])
+    return ''.join(reversed(chars))
+
+def decode(text):
+    value = 0
+    for char in text.upper():
+        value = value * 32 + CROCKFORD.index(char)
+    return value
+
+def id_timestamp(value):
+    """Creation time (epoch seconds) of an encoded ID or tracking number"""
+    if value.startswith(TRACKING_PREFIX):
+        value = value[len(TRACKING_PREFIX):]
+    return ((decode(value) >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000
+
+class WorkerLeases:
+    """Worker ID leases in the worker_leases table, shared by every host on the database"""
+
+    def __init__(self, engine, ttl=LEASE_SECONDS):
+        self.engine = engine
+        self.ttl = ttl
+
+    def acquire(self, holder, slot=None, now=None):
+        """Lease `slot`, or the lowest free one, to `holder`; returns (slot, expires_at)"""
+        from sqlalchemy import select, update
+        from sqlalchemy.exc import IntegrityError
+        from models.worker_lease import WorkerLease
+
+        table = WorkerLease.__table__
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        with self.engine.connect() as connection:
+            leases = {row.slot: row for row in connection.execute(select(table))}
+        for candidate in ([slot] if slot is not None else range(MAX_WORKERS)):
+            lease = leases.get(candidate)
+            if lease is not None and lease.holder != holder and lease.expires_at > now:
+                continue
+            try:
+                with self.engine.begin() as connection:
+                    if lease is None:
+                        connection.execute(table.insert().values(slot=candidate, holder=holder,
+                                                                 expires_at=expires_at))
+                        return candidate, expires_at
+                    # Only if nobody renewed or took it since we looked
+                    claimed = connection.execute(
+                        update(table)
+                        .where(table.c.slot == candidate, table.c.holder == lease.holder,
+                               table.c.expires_at == lease.expires_at)
+                        .values(holder=holder, expires_at=expires_at)
+                    ).rowcount
+            except IntegrityError:
+                continue  # another process inserted it first
+            if claimed:
+                return candidate, expires_at
+        if slot is not None:
+            owner = leases[slot].holder if slot in leases else 'another process'
+            raise WorkerIdUnavailable(f'worker ID {slot} is leased by {owner}; '
+                                      'leave ID_WORKER_ID unset so each process leases its own')
+        raise WorkerIdUnavailable(f'all {MAX_WORKERS} worker IDs are leased')
+
+    def renew(self, slot, holder, now=None):
+        """New expiry for holder's lease on slot, None if it no longer holds it"""
+        from sqlalchemy import update
+        from models.worker_lease import WorkerLease
+
+        table = WorkerLease.__table__
+        expires_at = (now or datetime.utcnow()) + timedelta(seconds=self.ttl)
+        with self.engine.begin() as connection:
+            renewed = connection.execute(
+                update(table).where(table.c.slot == slot, table.c.holder == holder)
+                .values(expires_at=expires_at)
+            ).rowcount
+        return expires_at if renewed else None
+
+    def release(self, slot, holder):
+        from sqlalchemy import delete
+        from models.worker_lease import WorkerLease
+
+        table = WorkerLease.__table__
+        with self.engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.slot == slot, table.c.holder == holder))
+
+class IdGenerator:
+    """Monotonic 64-bit IDs for one worker"""
+
+    def __init__(self, worker_id=None, leases=None, clock=time.time):
+        self._lock = threading.Lock()
+        self.clock = clock
+        self._holder_pid = None
+        self._exit_hook = False
+        self.configure(worker_id, leases)
+
+    def configure(self, worker_id=None, leases=None):
+        """Lease `worker_id` (or any free slot) from `leases`; without leases, use it or the PID"""
+        if worker_id is not None and not 0 <= worker_id < MAX_WORKERS:
+            raise ValueError(f'worker ID must be between 0 and {MAX_WORKERS - 1}')
+        with self._lock:
+            # A lease held under the old settings runs out on its own
+            self._fixed_worker_id = worker_id
+            self._leases = leases
+            self._lease_expires = None
+            self._pid = None
+            self._last_ms = -1
+            self._sequence = 0
+
+    @property
+    def worker_id(self):
+        with self._lock:
+            self._check_process()
+            self._check_lease()
+            return self._worker_id
+
+    def maintain(self):
+        """Take or renew the lease ahead of time: renews once half of it has passed"""
+        with self._lock:
+            self._check_process()
+            if self._leases is not None:
+                self._check_lease(self._leases.ttl / 2)
+
+    def _check_process(self):
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+        # First use in this process (or a fork inherited our lease): pick a
+        # worker ID and restart the sequence
+        self._pid = pid
+        if self._holder_pid != pid:
+            self._holder_pid = pid
+            self._holder = f'{socket.gethostname()}:{pid}:{secrets.token_hex(4)}'
+        self._lease_expires = None  # a forked child must lease its own slot
+        self._last_ms, self._sequence = -1, 0
+        if self._leases is None:
+            self._worker_id = self._fixed_worker_id if self._fixed_worker_id is not None else pid % MAX_WORKERS
+
+    def _check_lease(self, renew_within=LEASE_MARGIN_SECONDS):
+        """Make sure the lease has more than renew_within seconds left"""
+        if self._leases is None:
+            return
+        now = datetime.utcnow()
+        if self._lease_expires is not None:
+            if self._lease_expires - now > timedelta(seconds=renew_within):
+                return
+            self._lease_expires = self._leases.renew(self._worker_id, self._holder, now)
+        if self._lease_expires is None:
+            # Never leased, or it ran out and another process has the slot now
+            self._worker_id, self._lease_expires = self._leases.acquire(self._holder, self._fixed_worker_id, now)
+            if not self._exit_hook:
+                self._exit_hook = True
+                atexit.register(self.release)
+
+    def release(self):
+        """Give this process's slot back (at exit); other processes' leases are left alone"""
+        with self._lock:
+            if self._leases is None or self._lease_expires is None or self._pid != os.getpid():
+                return
+            try:
+                self._leases.release(self._worker_id, self._holder)
+            except Exception:
+                logger.warning("Could not release worker ID lease", exc_info=True)
+            self._lease_expires = None
+
+    def next_int(self):
+        with self._lock:
+            self._check_process()
+            self._check_lease()
+            now_ms = int(self.clock() * 1000) - EPOCH_MS
+            if now_ms > self._last_ms:
+                self._last_ms, self._sequence = now_ms, 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms, self._sequence = self._last_ms + 1, 0
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)
+                    | self._worker_id << SEQUENCE_BITS
+                    | self._sequence)
+
+    def next_id(self):
+        return encode(self.next_int())
+
+    def next_tracking_number(self):
+        return TRACKING_PREFIX + self.next_id()
+
+TRANSFER_IDS = IdGenerator()
+
+def new_transfer_id():
+    return TRANSFER_IDS.next_id()
+
+def new_tracking_number():
+    return TRANSFER_IDS.next_tracking_number()
+
+def lease_worker_id():
+    """Take or renew this process's worker ID now, outside any transaction"""
+    TRANSFER_IDS.maintain()
+
+def _setting(app, key):
+    value = app.config.get(key)
+    if value is None:
+        value = os.getenv(key, DEFAULTS[key])
+    return str(value)
+
+def init_id_generator(app):
+    """Apply ID_WORKER_ID and lease worker IDs in the app's database"""
+    from models.database import db, is_memory_sqlite_uri
+
+    worker_id = _setting(app, 'ID_WORKER_ID')
+    leases = None
+    if not is_memory_sqlite_uri(app.config['SQLALCHEMY_DATABASE_URI']):
+        with app.app_context():
+            leases = WorkerLeases(db.engine)
+    TRANSFER_IDS.configure(int(worker_id) if worker_id != '' else None, leases)
+
+    @app.before_request
+    def renew_worker_id():
+        # Before the request's own transaction, which may hold SQLite's write lock
+        try:
+            lease_worker_id()
+        except Exception:
+            # Issuing an ID retries, and fails the request that needs one
+            logger.warning("Could not lease a transfer ID worker ID", exc_info=True)
+
+    return TRANSFER_IDS
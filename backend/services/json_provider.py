@@ -0,0 +1,95 @@
+# backend/services/json_provider.py
+"""JSON providers for Flask responses.
+
+Models hand datetimes and Decimals to jsonify() as-is; the provider turns
+them into ISO-8601 strings and numbers. orjson is used when it's installed,
+otherwise the stdlib provider keeps the same output format.
+"""
+import json
+import os
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+def default(obj):
+    """Serialize the types the stdlib (and orjson, for Decimal) can't handle"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class StdlibJSONProvider(JSONProvider):
+    """stdlib json with ISO-8601 datetimes (Flask's default uses HTTP dates)"""
+    mimetype = 'application/json'
+    compact = None
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', default)
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+    def _pretty(self):
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def dumps_bytes(self, obj):
+        if self._pretty():
+            return self.dumps(obj, indent=2).encode('utf-8')
+        return self.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+class OrjsonProvider(StdlibJSONProvider):
+    """orjson-backed provider; serializes straight to bytes for the response body"""
+    OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def dumps_bytes(self, obj):
+        options = self.OPTIONS
+        if self._pretty():
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=options)
+
+JSON_PROVIDERS = {
+    'stdlib': StdlibJSONProvider,
+    'orjson': OrjsonProvider,
+}
+
+def get_json_provider_class(name=None):
+    """Provider class for the JSON_PROVIDER setting, preferring orjson when available"""
+    if name is None:
+        name = 'orjson' if orjson else 'stdlib'
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER {name!r}, expected one of {sorted(JSON_PROVIDERS)}")
+    return JSON_PROVIDERS[name]
+
+def init_json(app):
+    """Install the configured JSON provider on the app"""
+    provider_class = get_json_provider_class(
+        app.config.get('JSON_PROVIDER') or os.getenv('JSON_PROVIDER')
+    )
+    app.json = provider_class(app)
+    return app.json
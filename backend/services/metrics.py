@@ -0,0 +1,236 @@
+# backend/services/metrics.py
+"""In-process metrics with Prometheus text exposition at /api/metrics.
+
+Counters, gauges and histograms are plain Python objects guarded by a lock;
+recording a sample is a dict lookup, a bisect and an increment. Each worker
+process keeps its own numbers, so scrape every worker (or aggregate in
+Prometheus) when running gunicorn with several workers.
+"""
+import bisect
+import threading
+import time
+
+from flask import g, request
+
+# Seconds; covers in-memory cache hits through slow upstream calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+                for key, value in items]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        super().__init__(name, documentation, labels)
+        # callback() -> value, evaluated at scrape time for unlabelled gauges
+        self._callback = callback
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def value(self, *label_values):
+        if self._callback is not None:
+            return self._callback()
+        return self._values.get(label_values, 0)
+
+    def _samples(self):
+        if self._callback is not None:
+            value = self._callback()
+            return [] if value is None else [f'{self.name} {_format_value(value)}']
+        return super()._samples()
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                # per-bucket counts (last slot is +Inf), sum, count
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *label_values):
+        state = self._values.get(label_values)
+        return state[2] if state else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._metrics.get(name) or self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=(), callback=None):
+        return self._metrics.get(name) or self.register(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._metrics.get(name) or self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'remitlite_http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route'))
+REQUESTS_TOTAL = REGISTRY.counter(
+    'remitlite_http_requests_total', 'HTTP responses by route and status', ('method', 'route', 'status'))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'remitlite_http_requests_in_flight', 'Requests currently being handled', ('route',))
+RATE_CACHE_LOOKUPS = REGISTRY.counter(
+    'remitlite_rate_cache_lookups_total', 'Exchange rate cache lookups', ('endpoint', 'result'))
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    'remitlite_upstream_request_duration_seconds', 'Rate provider call latency', ('endpoint', 'outcome'))
+DB_QUERIES = REGISTRY.counter(
+    'remitlite_db_queries_total', 'SQL statements executed', ('statement',))
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def record_rate_cache(endpoint, hit):
+    RATE_CACHE_LOOKUPS.inc(endpoint, 'hit' if hit else 'miss')
+
+def timed_upstream_get(endpoint, url, **kwargs):
+    """requests.get() for the rate provider, recording its latency and outcome"""
+    import requests
+
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        response = requests.get(url, **kwargs)
+        outcome = str(response.status_code)
+        return response
+    except requests.exceptions.Timeout:
+        outcome = 'timeout'
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started, endpoint, outcome)
+
+def _route_label():
+    rule = request.url_rule
+    # The rule template keeps label cardinality bounded (no raw ids or query strings)
+    return rule.rule if rule is not None else '<unmatched>'
+
+def _before_request():
+    g._metrics_route = _route_label()
+    g._metrics_started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc(g._metrics_route)
+
+def _after_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is not None:
+        route = g._metrics_route
+        REQUEST_LATENCY.observe(time.perf_counter() - started, request.method, route)
+        REQUESTS_TOTAL.inc(request.method, route, str(response.status_code))
+    return response
+
+def _teardown_request(exc):
+    route = g.pop('_metrics_route', None)
+    if route is not None:
+        REQUESTS_IN_FLIGHT.dec(route)
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERIES.inc(statement.lstrip()[:6].upper())
+
+def metrics_view():
+    from flask import current_app
+    return current_app.response_class(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+def init_metrics(app, engine=None):
+    """Install request middleware, the SQL statement counter and /api/metrics"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/api/metrics', 'metrics', metrics_view, methods=['GET'])
+
+    if engine is not None:
+        from sqlalchemy import event
+        event.listen(engine, 'before_cursor_execute', _count_statement)
@@ -0,0 +1,101 @@
+# backend/services/precomputed.py
+"""Responses serialized once per data version and served as stored bytes.
+
+Rate snapshots, currencies and countries change rarely but are requested
+constantly. Each payload is turned into JSON bytes (plus a gzip variant for
+large bodies) the first time a version is requested; later requests reuse
+the bytes, and clients that send a matching If-None-Match get a 304.
+"""
+import gzip
+import hashlib
+import threading
+
+from flask import current_app, request
+
+GZIP_MIN_SIZE = 1024  # bytes; smaller bodies aren't worth compressing
+GZIP_LEVEL = 6
+
+STATIC_CACHE_CONTROL = 'public, max-age=3600'
+# Clients may keep the body but must revalidate, which costs a 304 when unchanged
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+def serialize(payload):
+    """JSON bytes using the app's provider"""
+    provider = current_app.json
+    if hasattr(provider, 'dumps_bytes'):
+        return provider.dumps_bytes(payload)
+    return provider.dumps(payload).encode('utf-8')
+
+class PrecomputedResponse:
+    """A JSON body serialized once, with its strong ETag and optional gzip variant"""
+    __slots__ = ('body', 'gzipped', 'etag', 'cache_control')
+
+    def __init__(self, body, cache_control=REVALIDATE_CACHE_CONTROL):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.cache_control = cache_control
+        self.gzipped = None
+        if len(body) >= GZIP_MIN_SIZE:
+            self.gzipped = gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+    @classmethod
+    def from_payload(cls, payload, cache_control=REVALIDATE_CACHE_CONTROL):
+        return cls(serialize(payload), cache_control)
+
+    @property
+    def gzip_etag(self):
+        """A strong ETag is per representation, so the gzip body gets its own"""
+        return self.etag + '-gz'
+
+    def to_response(self):
+        """Response for the current request: 304, gzip or plain body"""
+        response_class = current_app.response_class
+        use_gzip = self.gzipped is not None and request.accept_encodings['gzip']
+        etag = self.gzip_etag if use_gzip else self.etag
+
+        # Either tag means the client holds this content, whichever coding it came in
+        if request.if_none_match.contains(self.etag) or request.if_none_match.contains(self.gzip_etag):
+            response = response_class(status=304)
+        elif use_gzip:
+            response = response_class(self.gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = response_class(self.body, mimetype='application/json')
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = self.cache_control
+        if self.gzipped is not None:
+            response.vary.add('Accept-Encoding')
+        return response
+
+class ResponseCache:
+    """Latest PrecomputedResponse per key, rebuilt when the key's version changes"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                entry = (version, build())
+                self._entries[key] = entry
+        return entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+def get_response_cache():
+    return current_app.extensions.setdefault('response_cache', ResponseCache())
+
+def cached_json_response(key, version, build_payload, cache_control=REVALIDATE_CACHE_CONTROL):
+    """Serve build_payload() serialized once per (key, version), with ETag/304 and gzip"""
+    precomputed = get_response_cache().get(
+        key, version, lambda: PrecomputedResponse.from_payload(build_payload(), cache_control)
+    )
+    return precomputed.to_response()
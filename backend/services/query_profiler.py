@@ -0,0 +1,154 @@
+# backend/services/query_profiler.py
+"""Per-request SQL profiling with N+1 detection.
+
+Enable with SQL_PROFILER=1 (env or app config). Each request then counts and
+times its statements, reports them in X-Query-* response headers and logs a
+summary to the `remitlite.sql` logger. A statement shape (the SQL text with
+whitespace and IN-lists collapsed) that runs SQL_PROFILER_REPEAT_THRESHOLD
+or more times in one request is flagged as a likely N+1.
+
+`capture_queries()` uses the same machinery for tests and query budgets.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g
+from sqlalchemy import event
+
+logger = logging.getLogger('remitlite.sql')
+
+DEFAULT_REPEAT_THRESHOLD = 3
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'IN \((?:\?|%\(\w+\)s|:\w+)(?:, (?:\?|%\(\w+\)s|:\w+))*\)', re.IGNORECASE)
+_active = threading.local()
+
+def statement_shape(statement):
+    """Normalize SQL so the same query with different parameters compares equal"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    return _IN_LIST.sub('IN (?)', shape)
+
+class QueryProfile:
+    """Statements executed while this profile was active"""
+
+    def __init__(self, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+        self.repeat_threshold = repeat_threshold
+        self.statements = []  # (shape, seconds)
+
+    def record(self, statement, seconds):
+        self.statements.append((statement_shape(statement), seconds))
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return sum(seconds for _, seconds in self.statements) * 1000
+
+    def repeated(self):
+        """{shape: times} for shapes at or over the repeat threshold"""
+        counts = Counter(shape for shape, _ in self.statements)
+        return {shape: n for shape, n in counts.items() if n >= self.repeat_threshold}
+
+    def summary(self):
+        lines = [f'{self.count} queries in {self.total_ms:.2f} ms']
+        lines.extend(f'  {seconds * 1000:8.2f} ms  {shape}' for shape, seconds in self.statements)
+        return '\n'.join(lines)
+
+def _profiles():
+    stack = getattr(_active, 'profiles', None)
+    if stack is None:
+        stack = _active.profiles = []
+    return stack
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the statement's execution context, so a statement
+    # that raises leaves nothing behind on the pooled connection. Special-case
+    # executions (sequences, column defaults) have no context and use one slot.
+    if context is not None:
+        context._query_profiler_started = time.perf_counter()
+    else:
+        conn.info['query_profiler_started'] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        started = context._query_profiler_started
+    else:
+        started = conn.info.pop('query_profiler_started')
+    profiles = _profiles()
+    if profiles:
+        elapsed = time.perf_counter() - started
+        for profile in profiles:
+            profile.record(statement, elapsed)
+
+def install_engine_hooks(engine):
+    """Attach the timing listeners to an engine (idempotent)"""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+@contextmanager
+def capture_queries(engine, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+    """Record every statement run on this thread inside the block"""
+    install_engine_hooks(engine)
+    profile = QueryProfile(repeat_threshold)
+    _profiles().append(profile)
+    try:
+        yield profile
+    finally:
+        _profiles().remove(profile)
+
+@contextmanager
+def query_budget(engine, max_queries, allow_repeats=False, repeat_threshold=DEFAULT_REPEAT_THRESHOLD):
+    """Fail with AssertionError if the block exceeds max_queries or repeats a shape"""
+    with capture_queries(engine, repeat_threshold) as profile:
+        yield profile
+    assert profile.count <= max_queries, (
+        f'Query budget exceeded: {profile.count} > {max_queries}\n{profile.summary()}')
+    if not allow_repeats:
+        repeated = profile.repeated()
+        assert not repeated, f'Repeated statement shapes (N+1?): {repeated}\n{profile.summary()}'
+
+def _finish_request_profile(response):
+    profile = g.get('_query_profile')
+    if profile is None:
+        return response
+
+    repeated = profile.repeated()
+    response.headers['X-Query-Count'] = str(profile.count)
+    response.headers['X-Query-Time-Ms'] = f'{profile.total_ms:.2f}'
+    if repeated:
+        response.headers['X-Query-Repeated'] = str(sum(repeated.values()))
+        logger.warning('Possible N+1: %s', '; '.join(f'{n}x {shape}' for shape, n in repeated.items()))
+    logger.debug(profile.summary())
+    return response
+
+def _stop_request_profile(exc):
+    profile = g.pop('_query_profile', None)
+    if profile is not None and profile in _profiles():
+        _profiles().remove(profile)
+
+def init_query_profiler(app, engine):
+    """Profile every request's SQL when SQL_PROFILER is enabled"""
+    enabled = app.config.get('SQL_PROFILER', os.getenv('SQL_PROFILER', ''))
+    if str(enabled).lower() not in ('1', 'true', 'yes', 'on'):
+        return False
+
+    threshold = int(app.config.get('SQL_PROFILER_REPEAT_THRESHOLD',
+                                   os.getenv('SQL_PROFILER_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)))
+    install_engine_hooks(engine)
+
+    @app.before_request
+    def start_query_profile():
+        g._query_profile = QueryProfile(threshold)
+        _profiles().append(g._query_profile)
+
+    app.after_request(_finish_request_profile)
+    app.teardown_request(_stop_request_profile)
+    return True
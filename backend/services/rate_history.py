@@ -0,0 +1,521 @@
+# backend/services/rate_history.py
+"""Append-only history of every rate snapshot, queried as OHLC bars.
+
+Each refreshed snapshot is appended to a log as one binary record: a
+timestamp, then (pair id, rate) for every pair. In memory, each pair keeps
+three columnar tiers in array('d') columns:
+
+    raw     every snapshot point, for RATE_HISTORY_RAW_DAYS (7)
+    hours   hourly OHLC bars, for RATE_HISTORY_HOUR_DAYS (90)
+    days    daily OHLC bars, for RATE_HISTORY_DAY_DAYS (1825; 0 keeps them forever)
+
+Compaction runs at most hourly, triggered by an append, or on demand with
+`flask compact-rate-history`. It folds raw points older than the raw
+retention into hourly bars, and hourly bars older than the hour retention
+into daily bars. Then it rewrites the tier files (columnar, one contiguous
+run per pair) and starts a fresh log. Range queries bisect each tier and
+bucket what falls inside into minute, hour or day bars. A year of daily
+bars touches a few thousand values.
+
+Files live in RATE_HISTORY_DIR (instance/rate_history). An empty setting
+keeps the history in memory only. gunicorn workers share the files:
+
+- appends and compaction hold an exclusive flock
+- each worker tails the log to pick up the others' snapshots
+- each worker reloads the tiers when the manifest's generation changes
+
+Each app keeps its store in app.extensions['rate_history']. Request threads
+never append themselves: record_snapshot() hands the snapshot to a bounded
+queue, and a background SnapshotWriter thread takes the flock, writes the
+log and runs the hourly compaction. If the queue is full the snapshot is
+dropped and counted (remitlite_rate_history_dropped_total).
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+
+from services.metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger('remitlite.history')
+
+DAY = 86400
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': DAY}
+MAX_AUTO_POINTS = 1500  # 'auto' picks the finest resolution that stays under this
+COMPACT_EVERY_SECONDS = 3600
+
+DEFAULTS = {
+    'RATE_HISTORY_DIR': 'rate_history',
+    'RATE_HISTORY_RAW_DAYS': 7.0,
+    'RATE_HISTORY_HOUR_DAYS': 90.0,
+    'RATE_HISTORY_DAY_DAYS': 1825.0,
+    'RATE_HISTORY_QUEUE_SIZE': 1000,
+}
+
+SNAPSHOTS_DROPPED = REGISTRY.counter(
+    'remitlite_rate_history_dropped_total', 'Rate snapshots not recorded because the history queue was full')
+
+_SNAPSHOT = struct.Struct('<dI')  # timestamp, number of points
+_POINT = struct.Struct('<Hd')  # pair id, rate
+_TIER_HEADER = struct.Struct('<I')  # number of pairs
+_TIER_RUN = struct.Struct('<HI')  # pair id, number of bars
+_SWAP = sys.byteorder == 'big'  # files are little-endian
+
+class Points:
+    """Raw (timestamp, rate) columns for one pair, oldest first"""
+    __slots__ = ('ts', 'rate')
+
+    def __init__(self):
+        self.ts = array('d')
+        self.rate = array('d')
+
+    def __len__(self):
+        return len(self.ts)
+
+    def add(self, ts, rate):
+        if not self.ts or ts >= self.ts[-1]:
+            self.ts.append(ts)
+            self.rate.append(rate)
+        else:
+            # Another worker's snapshot that landed out of order
+            index = bisect.bisect_right(self.ts, ts)
+            self.ts.insert(index, ts)
+            self.rate.insert(index, rate)
+
+    def split(self, before):
+        """Remove and return the points older than `before`"""
+        index = bisect.bisect_left(self.ts, before)
+        old = Points()
+        old.ts, old.rate = self.ts[:index], self.rate[:index]
+        del self.ts[:index], self.rate[:index]
+        return old
+
+    def columns(self):
+        return self.ts, self.rate, self.rate, self.rate, self.rate
+
+class Bars:
+    """OHLC bar columns for one pair, oldest first"""
+    __slots__ = ('ts', 'open', 'high', 'low', 'close')
+
+    def __init__(self, columns=None):
+        for name, column in zip(self.__slots__, columns or [array('d') for _ in self.__slots__]):
+            setattr(self, name, column)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def add(self, ts, open_, high, low, close):
+        """Append a bar, merging it with an existing bar that has the same start"""
+        index = bisect.bisect_left(self.ts, ts)
+        if index < len(self.ts) and self.ts[index] == ts:
+            self.high[index] = max(self.high[index], high)
+            self.low[index] = min(self.low[index], low)
+            if index == len(self.ts) - 1:
+                self.close[index] = close
+            return
+        for column, value in zip(self.columns(), (ts, open_, high, low, close)):
+            column.insert(index, value)
+
+    def split(self, before):
+        """Remove and return the bars that start before `before`"""
+        index = bisect.bisect_left(self.ts, before)
+        old = Bars([column[:index] for column in self.columns()])
+        for column in self.columns():
+            del column[:index]
+        return old
+
+    def fold(self, columns, size):
+        """Add (ts, open, high, low, close) columns as bars of `size` seconds"""
+        bars = downsample([columns], float('-inf'), float('inf'), size)
+        for bar in zip(bars['t'], bars['o'], bars['h'], bars['l'], bars['c']):
+            self.add(*bar)
+
+    def columns(self):
+        return self.ts, self.open, self.high, self.low, self.close
+
+class PairHistory:
+    __slots__ = ('raw', 'hours', 'days')
+
+    def __init__(self):
+        self.raw = Points()
+        self.hours = Bars()
+        self.days = Bars()
+
+    def sources(self):
+        # Oldest tier first; compaction keeps their time ranges apart
+        return [self.days.columns(), self.hours.columns(), self.raw.columns()]
+
+def downsample(sources, start, end, size):
+    """{'t', 'o', 'h', 'l', 'c'} lists of `size`-second bars in [start, end)"""
+    t, o, h, l, c = [], [], [], [], []
+    for ts, opens, highs, lows, closes in sources:
+        for i in range(bisect.bisect_left(ts, start), bisect.bisect_left(ts, end)):
+            bucket = ts[i] // size * size
+            if t and t[-1] == bucket:
+                if highs[i] > h[-1]:
+                    h[-1] = highs[i]
+                if lows[i] < l[-1]:
+                    l[-1] = lows[i]
+                c[-1] = closes[i]
+            else:
+                t.append(bucket)
+                o.append(opens[i])
+                h.append(highs[i])
+                l.append(lows[i])
+                c.append(closes[i])
+    return {'t': [int(bucket) for bucket in t], 'o': o, 'h': h, 'l': l, 'c': c}
+
+def pick_resolution(start, end):
+    for name, size in RESOLUTIONS.items():
+        if (end - start) / size <= MAX_AUTO_POINTS:
+            return name
+    return 'day'
+
+def _floor(ts, size):
+    return ts // size * size
+
+def _column(data, offset, count):
+    column = array('d')
+    column.frombytes(data[offset:offset + count * 8])
+    if _SWAP:
+        column.byteswap()
+    return column
+
+def _column_bytes(column):
+    if _SWAP:
+        column = array('d', column)
+        column.byteswap()
+    return column.tobytes()
+
+class RateHistoryStore:
+    """Pair histories in memory, backed by files in `directory` when one is set"""
+
+    def __init__(self, directory=None, raw_days=DEFAULTS['RATE_HISTORY_RAW_DAYS'],
+                 hour_days=DEFAULTS['RATE_HISTORY_HOUR_DAYS'], day_days=DEFAULTS['RATE_HISTORY_DAY_DAYS']):
+        self._lock = threading.RLock()
+        self.configure(directory, raw_days, hour_days, day_days)
+
+    def configure(self, directory, raw_days=DEFAULTS['RATE_HISTORY_RAW_DAYS'],
+                  hour_days=DEFAULTS['RATE_HISTORY_HOUR_DAYS'], day_days=DEFAULTS['RATE_HISTORY_DAY_DAYS']):
+        with self._lock:
+            self.directory = directory
+            self.raw_days = raw_days
+            self.hour_days = hour_days
+            self.day_days = day_days
+            self._pairs = {}  # (base, quote) -> PairHistory
+            self._pair_names = []  # pair id -> (base, quote)
+            self._pair_ids = {}
+            self._generation = None
+            self._manifest_stamp = None
+            self._log_offset = 0
+            self._compacted_at = time.monotonic()
+
+    # ---- public API ----
+
+    def append(self, rates, ts=None):
+        """Record a {base: {quote: rate}} snapshot"""
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            ts = time.time() if ts is None else ts
+            self._register_pairs([(base, quote) for base, quotes in rates.items() for quote in quotes])
+            ids = self._pair_ids
+            points = [(ids[(base, quote)], float(rate))
+                      for base, quotes in rates.items() for quote, rate in quotes.items()]
+            if self.directory:
+                record = _SNAPSHOT.pack(ts, len(points)) + b''.join(_POINT.pack(*point) for point in points)
+                with open(self._path('raw.log'), 'ab') as f:
+                    # Drop a torn record left by a writer that died mid-append
+                    f.truncate(self._log_offset)
+                    f.write(record)
+                self._log_offset += len(record)
+            for pair_id, rate in points:
+                self._history(self._pair_names[pair_id]).raw.add(ts, rate)
+            if time.monotonic() - self._compacted_at >= COMPACT_EVERY_SECONDS:
+                self._compact(ts)
+
+    def compact(self, now=None):
+        """Fold and expire data past each tier's retention"""
+        with self._lock, self._file_lock(exclusive=True):
+            self._sync()
+            return self._compact(time.time() if now is None else now)
+
+    def bars(self, base, quote, start, end, resolution='auto'):
+        """OHLC columns for base->quote in [start, end), None if the pair has no history"""
+        if resolution == 'auto':
+            resolution = pick_resolution(start, end)
+        size = RESOLUTIONS[resolution]
+        with self._lock:
+            if self.directory:
+                with self._file_lock(exclusive=False):
+                    self._sync()
+            history, inverted = self._pairs.get((base, quote)), False
+            if history is None:
+                history, inverted = self._pairs.get((quote, base)), True
+            if history is None:
+                return None
+            bars = downsample(history.sources(), start, end, size)
+        if inverted:
+            bars['o'], bars['c'] = [1 / v for v in bars['o']], [1 / v for v in bars['c']]
+            bars['h'], bars['l'] = [1 / v for v in bars['l']], [1 / v for v in bars['h']]
+        bars['resolution'] = resolution
+        return bars
+
+    def pairs(self):
+        with self._lock:
+            return sorted(self._pairs)
+
+    # ---- in-memory tiers ----
+
+    def _history(self, pair):
+        history = self._pairs.get(pair)
+        if history is None:
+            history = self._pairs[pair] = PairHistory()
+        return history
+
+    def _set_pair_names(self, names):
+        self._pair_names = names
+        self._pair_ids = {pair: index for index, pair in enumerate(names)}
+
+    def _register_pairs(self, pairs):
+        new = [pair for pair in dict.fromkeys(pairs) if pair not in self._pair_ids]
+        if new:
+            self._set_pair_names(self._pair_names + new)
+            if self.directory:
+                self._write_manifest()
+
+    def _compact(self, now):
+        hour_cutoff = _floor(now - self.raw_days * DAY, 3600)
+        day_cutoff = _floor(now - self.hour_days * DAY, DAY)
+        drop_cutoff = _floor(now - self.day_days * DAY, DAY) if self.day_days else None
+        changed = 0
+        for history in self._pairs.values():
+            old_points = history.raw.split(hour_cutoff)
+            if len(old_points):
+                history.hours.fold(old_points.columns(), 3600)
+            old_hours = history.hours.split(day_cutoff)
+            if len(old_hours):
+                history.days.fold(old_hours.columns(), DAY)
+            expired = len(history.days.split(drop_cutoff)) if drop_cutoff is not None else 0
+            changed += len(old_points) + len(old_hours) + expired
+        self._compacted_at = time.monotonic()
+        if changed and self.directory:
+            self._rewrite()
+        return changed
+
+    # ---- files ----
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        if not self.directory:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path('lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _sync(self):
+        """Catch up with what other processes wrote (caller holds both locks)"""
+        if not self.directory:
+            return
+        try:
+            stat = os.stat(self._path('manifest.json'))
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._manifest_stamp:
+            manifest = {'generation': 0, 'pairs': []}
+            if stamp is not None:
+                with open(self._path('manifest.json')) as f:
+                    manifest = json.load(f)
+            self._manifest_stamp = stamp
+            self._set_pair_names([tuple(name.split('-')) for name in manifest['pairs']])
+            if manifest['generation'] != self._generation:
+                self._generation = manifest['generation']
+                self._load_tiers()
+        self._read_log()
+
+    def _load_tiers(self):
+        self._pairs = {pair: PairHistory() for pair in self._pair_names}
+        self._log_offset = 0
+        for tier, name in (('hours', 'hours.bin'), ('days', 'days.bin')):
+            try:
+                with open(self._path(name), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            (pair_count,) = _TIER_HEADER.unpack_from(data)
+            runs = list(_TIER_RUN.iter_unpack(data[_TIER_HEADER.size:_TIER_HEADER.size + pair_count * _TIER_RUN.size]))
+            total = sum(count for _, count in runs)
+            offset = _TIER_HEADER.size + pair_count * _TIER_RUN.size
+            columns = []
+            for _ in Bars.__slots__:
+                columns.append(_column(data, offset, total))
+                offset += total * 8
+            start = 0
+            for pair_id, count in runs:
+                setattr(self._history(self._pair_names[pair_id]), tier,
+                        Bars([column[start:start + count] for column in columns]))
+                start += count
+
+    def _read_log(self):
+        try:
+            with open(self._path('raw.log'), 'rb') as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        position = 0
+        while position + _SNAPSHOT.size <= len(data):
+            ts, count = _SNAPSHOT.unpack_from(data, position)
+            end = position + _SNAPSHOT.size + count * _POINT.size
+            if end > len(data):
+                break  # being written, or torn; the next append truncates it
+            for pair_id, rate in _POINT.iter_unpack(data[position + _SNAPSHOT.size:end]):
+                self._history(self._pair_names[pair_id]).raw.add(ts, rate)
+            position = end
+        self._log_offset += position
+
+    def _write_manifest(self):
+        self._generation = self._generation or 0
+        self._replace('manifest.json', json.dumps({
+            'generation': self._generation,
+            'pairs': [f'{base}-{quote}' for base, quote in self._pair_names],
+        }).encode('utf-8'))
+        stat = os.stat(self._path('manifest.json'))
+        self._manifest_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _replace(self, name, data):
+        temporary = self._path(f'{name}.tmp')
+        with open(temporary, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._path(name))
+
+    def _rewrite(self):
+        """Write the tiers and the remaining raw points as a new generation"""
+        ids = self._pair_ids
+        for tier, name in (('hours', 'hours.bin'), ('days', 'days.bin')):
+            runs, columns = [], [array('d') for _ in Bars.__slots__]
+            for pair, history in self._pairs.items():
+                bars = getattr(history, tier)
+                if len(bars):
+                    runs.append(_TIER_RUN.pack(ids[pair], len(bars)))
+                    for target, column in zip(columns, bars.columns()):
+                        target.extend(column)
+            self._replace(name, _TIER_HEADER.pack(len(runs)) + b''.join(runs)
+                          + b''.join(_column_bytes(column) for column in columns))
+
+        snapshots = {}
+        for pair, history in self._pairs.items():
+            for ts, rate in zip(history.raw.ts, history.raw.rate):
+                snapshots.setdefault(ts, []).append(_POINT.pack(ids[pair], rate))
+        log = b''.join(_SNAPSHOT.pack(ts, len(points)) + b''.join(points)
+                       for ts, points in sorted(snapshots.items()))
+        self._replace('raw.log', log)
+        self._log_offset = len(log)
+
+        # Other workers see the new generation and reload from the files
+        self._generation += 1
+        self._write_manifest()
+        logger.info("Compacted rate history", extra={'generation': self._generation})
+
+class SnapshotWriter:
+    """Appends queued snapshots to a store from one background thread"""
+
+    def __init__(self, store, queue_size=DEFAULTS['RATE_HISTORY_QUEUE_SIZE']):
+        self.store = store
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, rates, ts=None):
+        """Queue a snapshot stamped now; drops it instead of blocking when the queue is full"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((rates, time.time() if ts is None else ts))
+        except queue.Full:
+            self.dropped += 1
+            SNAPSHOTS_DROPPED.inc()
+
+    def flush(self):
+        """Wait until every queued snapshot has been written"""
+        self.queue.join()
+
+    def close(self, timeout=5):
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout)
+
+    def _ensure_started(self):
+        # Started on the first snapshot, so building an app starts no thread
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='rate-history-writer', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self.store.append(*item)
+            except Exception:
+                logger.exception("Could not record rate snapshot")
+            finally:
+                self.queue.task_done()
+
+def _setting(app, key):
+    value = app.config.get(key)
+    if value is None:
+        value = os.getenv(key, DEFAULTS[key])
+    return type(DEFAULTS[key])(value)
+
+def init_rate_history(app):
+    """Give the app its own store in RATE_HISTORY_DIR (relative to the instance folder)"""
+    directory = _setting(app, 'RATE_HISTORY_DIR')
+    if directory and not os.path.isabs(directory):
+        directory = os.path.join(app.instance_path, directory)
+    store = RateHistoryStore(directory or None,
+                             raw_days=_setting(app, 'RATE_HISTORY_RAW_DAYS'),
+                             hour_days=_setting(app, 'RATE_HISTORY_HOUR_DAYS'),
+                             day_days=_setting(app, 'RATE_HISTORY_DAY_DAYS'))
+    app.extensions['rate_history'] = store
+    app.extensions['rate_history_writer'] = SnapshotWriter(store, _setting(app, 'RATE_HISTORY_QUEUE_SIZE'))
+    return store
+
+def rate_history(app=None):
+    """The history store of `app` (default: the current app)"""
+    return (app or current_app).extensions['rate_history']
+
+def record_snapshot(rates):
+    """Queue a snapshot for the current app's history; never blocks on the files
+
+    Outside an app context there is no history to record it in.
+    """
+    if has_app_context():
+        current_app.extensions['rate_history_writer'].submit(rates)
@@ -0,0 +1,60 @@
+# backend/services/rate_lookup.py
+"""Rates for pairs the snapshot can't price.
+
+Every currency in the snapshot is routed by services.conversion_graph.
+A currency outside it (asked for by a client, or dropped by the provider)
+is fetched from the provider once and kept in a bounded LRU keyed by
+(from, to). Misses are kept as well, so an unknown code doesn't cost an
+upstream call per request. The LRU is dropped whenever the snapshot version
+changes, so every endpoint quotes the same numbers for a given snapshot.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MAX_PAIRS = 1024  # LRU entries; currency codes come from requests
+PAIR_TTL_SECONDS = 300  # provider answers are re-checked at most this often
+
+class PairRateCache:
+    """LRU of (from, to) -> quote for one snapshot version"""
+
+    def __init__(self, max_pairs=MAX_PAIRS, ttl=PAIR_TTL_SECONDS):
+        self.max_pairs = max_pairs
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pairs = OrderedDict()
+        self._version = None
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self._version:
+                self._pairs.clear()
+                self._version = version
+                return None
+            entry = self._pairs.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._pairs[key]
+                return None
+            self._pairs.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, version, quote):
+        with self._lock:
+            if version != self._version:
+                return
+            self._pairs[key] = (quote, time.monotonic() + self.ttl)
+            self._pairs.move_to_end(key)
+            while len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def clear(self):
+        with self._lock:
+            self._pairs.clear()
+            self._version = None
+
+PAIR_RATES = PairRateCache()
@@ -0,0 +1,170 @@
+# backend/services/rate_quotes.py
+"""Locked rate quotes: signed, time-limited, redeemable once.
+
+A quote ID is `<body>.<signature>`. The body is base64url of the expiry
+(4 bytes, epoch seconds) followed by 8 random bytes. The signature is the
+first 12 bytes of HMAC-SHA256(secret, body). Forged, mangled and expired
+IDs are therefore rejected before any lookup.
+
+Issued quotes go into an in-memory dict for the worker that issued them.
+Quotes all share one TTL, so expiry order is issue order and a deque sweeps
+them in O(1) amortized time. Each quote is also inserted into
+`rate_quotes`, so a quote issued by one gunicorn worker can be redeemed by
+another. Redemption is a single
+`UPDATE ... SET redeemed_at WHERE id = ? AND redeemed_at IS NULL` by
+primary key, in the transfer's transaction. A quote is therefore used at
+most once, and only if the transfer commits.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+DEFAULT_TTL_SECONDS = 120
+MAX_QUOTES = 100_000  # per worker; the oldest are evicted from memory first (the DB still has them)
+_SIGNATURE_BYTES = 12
+
+class QuoteError(ValueError):
+    status = 400
+
+class QuoteUnavailable(QuoteError):
+    """Expired, already used, or unknown"""
+    status = 409
+
+class Quote:
+    __slots__ = ('id', 'from_currency', 'to_currency', 'rate', 'expires_at')
+
+    def __init__(self, id, from_currency, to_currency, rate, expires_at):
+        self.id = id
+        self.from_currency = from_currency
+        self.to_currency = to_currency
+        self.rate = rate
+        self.expires_at = expires_at  # epoch seconds
+
+    @property
+    def expires_at_iso(self):
+        return datetime.utcfromtimestamp(self.expires_at).isoformat() + 'Z'
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+class QuoteBook:
+    """Issues quote IDs and holds this worker's unredeemed quotes"""
+
+    def __init__(self, secret='', ttl=DEFAULT_TTL_SECONDS, max_quotes=MAX_QUOTES):
+        self._lock = threading.Lock()
+        self.configure(secret, ttl, max_quotes)
+
+    def configure(self, secret, ttl=DEFAULT_TTL_SECONDS, max_quotes=MAX_QUOTES):
+        with self._lock:
+            self._secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+            self.ttl = ttl
+            self.max_quotes = max_quotes
+            self._quotes = {}
+            self._expiry = deque()  # (expires_at, body), oldest first
+
+    def _sign(self, body):
+        digest = hmac.new(self._secret, body.encode('ascii'), hashlib.sha256).digest()
+        return _b64(digest[:_SIGNATURE_BYTES])
+
+    def issue(self, from_currency, to_currency, rate, now=None):
+        """(quote ID, Quote) for a rate locked for `ttl` seconds"""
+        now = time.time() if now is None else now
+        expires_at = int(now + self.ttl)
+        body = _b64(struct.pack('>I', expires_at) + secrets.token_bytes(8))
+        quote = Quote(body, from_currency, to_currency, rate, expires_at)
+        with self._lock:
+            self._sweep(now)
+            self._quotes[body] = quote
+            self._expiry.append((expires_at, body))
+        return f'{body}.{self._sign(body)}', quote
+
+    def verify(self, quote_id, now=None):
+        """The body of a genuine, unexpired quote ID"""
+        body, _, signature = str(quote_id).partition('.')
+        if not signature or not hmac.compare_digest(signature, self._sign(body)):
+            raise QuoteError('invalid quote ID')
+        try:
+            (expires_at,) = struct.unpack_from('>I', _unb64(body))
+        except (ValueError, struct.error):
+            raise QuoteError('invalid quote ID')
+        if expires_at <= (time.time() if now is None else now):
+            raise QuoteUnavailable('quote expired')
+        return body
+
+    def take(self, body):
+        """Remove and return this worker's copy of a quote, None if it doesn't have one"""
+        with self._lock:
+            return self._quotes.pop(body, None)
+
+    def _sweep(self, now):
+        expiry, quotes = self._expiry, self._quotes
+        while expiry and (expiry[0][0] <= now or len(expiry) >= self.max_quotes):
+            quotes.pop(expiry.popleft()[1], None)
+
+    def __len__(self):
+        return len(self._quotes)
+
+QUOTES = QuoteBook(os.getenv('SECRET_KEY', ''))
+
+def init_rate_quotes(app, secret):
+    """Sign with the app's SECRET_KEY (else `secret`); RATE_QUOTE_TTL sets the lifetime in seconds"""
+    ttl = app.config.get('RATE_QUOTE_TTL')
+    if ttl is None:
+        ttl = os.getenv('RATE_QUOTE_TTL', DEFAULT_TTL_SECONDS)
+    QUOTES.configure(app.config.get('SECRET_KEY') or secret, int(ttl))
+    return QUOTES
+
+def issue_quote(from_currency, to_currency, rate):
+    """Lock a rate: keep it in memory and in rate_quotes; returns (quote ID, Quote)"""
+    from models.database import db
+    from models.rate_quote import RateQuote
+
+    quote_id, quote = QUOTES.issue(from_currency, to_currency, rate)
+    db.session.add(RateQuote(id=quote.id, from_currency=from_currency, to_currency=to_currency,
+                             rate=rate, expires_at=datetime.utcfromtimestamp(quote.expires_at)))
+    db.session.commit()
+    return quote_id, quote
+
+def redeem_quote(quote_id):
+    """Claim a quote for the current transaction; raises QuoteError/QuoteUnavailable"""
+    from models.database import db
+    from models.rate_quote import RateQuote
+
+    body = QUOTES.verify(quote_id)
+    quote = QUOTES.take(body)
+    if quote is None:
+        # Issued by another worker, or evicted from memory
+        row = db.session.get(RateQuote, body)
+        if row is None:
+            raise QuoteUnavailable('unknown quote')
+        expires_at = struct.unpack_from('>I', _unb64(body))[0]
+        quote = Quote(row.id, row.from_currency, row.to_currency, row.rate, expires_at)
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        db.update(RateQuote)
+        .where(RateQuote.id == body, RateQuote.redeemed_at.is_(None), RateQuote.expires_at > now)
+        .values(redeemed_at=now)
+    ).rowcount
+    if claimed != 1:
+        raise QuoteUnavailable('quote already used or expired')
+    return quote
+
+def purge_expired_quotes(before=None):
+    """Delete quotes that expired before `before` (default: now); returns the count"""
+    from models.database import db
+    from models.rate_quote import RateQuote
+
+    before = before or datetime.utcnow()
+    deleted = db.session.execute(db.delete(RateQuote).where(RateQuote.expires_at < before)).rowcount
+    db.session.commit()
+    return deleted
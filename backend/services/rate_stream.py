@@ -0,0 +1,194 @@
+# backend/services/rate_stream.py
+"""Server-sent events stream of rate snapshot changes.
+
+Every new snapshot is diffed against the previous one and turned into a
+single SSE frame holding only the pairs that changed. The frame is
+serialized once and shared by every subscriber: subscribers are generators
+parked on one Condition, each holding nothing but a cursor, and a publish
+wakes them all to write the same bytes.
+
+Event IDs are a hash of the snapshot's rate table, not a per-process
+counter. Every worker and host that holds the same rates gives them the
+same ID, so a client can reconnect anywhere. Clients resume with
+Last-Event-ID (sent automatically by EventSource on reconnect) or
+?since=<id>. If this process has the ID in its history, it replays the
+deltas that lead from that snapshot to the current one. Any other ID,
+including one from a process that saw different rates, gets a full
+snapshot frame. Idle connections get a comment heartbeat so proxies don't
+time them out.
+
+Each subscriber holds its greenlet (or thread) for as long as it is
+connected, so the stream is served by its own gevent process (`stream` in
+the Procfile). There, an idle subscriber costs a parked greenlet, not a
+worker thread. Elsewhere, RATE_STREAM_MAX_SUBSCRIBERS caps listeners so
+they can't take every API thread.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger('remitlite.stream')
+
+HEARTBEAT_SECONDS = 15
+HISTORY_SIZE = 64  # deltas kept for resume
+REFRESH_SECONDS = 30  # how often the refresher checks whether the snapshot is stale
+RETRY_MS = 5000
+MAX_EVENT_ID_LENGTH = 64
+
+HEARTBEAT_FRAME = b': ping\n\n'
+
+def _encode(payload):
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+
+def snapshot_id(rates):
+    """Event ID for a rate table: the same in every process that holds the same rates"""
+    canonical = json.dumps(rates, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(canonical, digest_size=8).hexdigest()
+
+def sse_frame(event, event_id, payload):
+    return f'id: {event_id}\nevent: {event}\ndata: {_encode(payload)}\n\n'.encode('utf-8')
+
+def diff_rates(previous, current):
+    """(changed, removed): {base: {quote: rate}} for new/changed pairs, [[base, quote]] for dropped ones"""
+    changed = {}
+    for base, quotes in current.items():
+        old_quotes = previous.get(base, {})
+        delta = {quote: rate for quote, rate in quotes.items() if old_quotes.get(quote) != rate}
+        if delta:
+            changed[base] = delta
+    removed = [[base, quote]
+               for base, quotes in previous.items()
+               for quote in quotes if quote not in current.get(base, {})]
+    return changed, removed
+
+class RateBroadcaster:
+    """Fans one serialized frame per snapshot out to every subscriber"""
+
+    def __init__(self, heartbeat=HEARTBEAT_SECONDS, history_size=HISTORY_SIZE, max_subscribers=0):
+        self.heartbeat = heartbeat
+        self.history_size = history_size
+        self.max_subscribers = max_subscribers  # 0 = no cap
+        self._cond = threading.Condition()
+        self._history = []  # [(base id, id, frame)], oldest first
+        self._rates = {}
+        self._version = None
+        self._snapshot_frame = None
+        self._refresher = None
+        self.subscribers = 0
+
+    @property
+    def version(self):
+        """Event ID of the current snapshot, None before the first publish"""
+        return self._version
+
+    @property
+    def full(self):
+        return bool(self.max_subscribers) and self.subscribers >= self.max_subscribers
+
+    def publish(self, rates):
+        """Record a new snapshot and wake every subscriber with its delta"""
+        version = snapshot_id(rates)
+        with self._cond:
+            if version == self._version:
+                return
+            changed, removed = diff_rates(self._rates, rates)
+            frame = sse_frame('rates', version, {
+                'version': version,
+                'base_version': self._version,
+                'changed': changed,
+                'removed': removed,
+            })
+            if self._version is not None:
+                self._history.append((self._version, version, frame))
+                del self._history[:-self.history_size]
+            self._rates = {base: dict(quotes) for base, quotes in rates.items()}
+            self._version = version
+            self._snapshot_frame = None
+            self._cond.notify_all()
+
+    def snapshot_frame(self):
+        # Built at most once per version, however many clients (re)connect
+        if self._snapshot_frame is None:
+            self._snapshot_frame = sse_frame('snapshot', self._version,
+                                             {'version': self._version, 'rates': self._rates})
+        return self._snapshot_frame
+
+    def frames_after(self, version):
+        """Frames that bring a client at snapshot `version` up to date (caller holds the lock)"""
+        if self._version is None or version == self._version:
+            return []
+        # The latest delta that starts from the client's snapshot; rates can
+        # return to an earlier table, so the same ID may be a base more than once
+        for index in range(len(self._history) - 1, -1, -1):
+            if self._history[index][0] == version:
+                return [frame for _, _, frame in self._history[index:]]
+        return [self.snapshot_frame()]
+
+    def subscribe(self, last_version=None):
+        """Generator of SSE frames for one client, starting after snapshot last_version"""
+        with self._cond:
+            self.subscribers += 1
+            backlog = self.frames_after(last_version)
+            cursor = self._version
+        try:
+            yield f'retry: {RETRY_MS}\n\n'.encode('utf-8')
+            for frame in backlog:
+                yield frame
+            while True:
+                with self._cond:
+                    if self._version == cursor:
+                        self._cond.wait(self.heartbeat)
+                    frames = self.frames_after(cursor)
+                    cursor = self._version
+                if not frames:
+                    yield HEARTBEAT_FRAME
+                for frame in frames:
+                    yield frame
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def ensure_refresher(self, refresh, interval=REFRESH_SECONDS):
+        """Run refresh() every interval while anyone is subscribed"""
+        with self._cond:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, args=(refresh, interval), name='rate-refresher', daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self, refresh, interval):
+        stop = threading.Event()
+        while not stop.wait(interval):
+            if self.subscribers == 0:
+                return
+            try:
+                refresh()
+            except Exception:
+                logger.exception("Rate refresh failed")
+
+    def reset(self):
+        with self._cond:
+            self._history.clear()
+            self._rates = {}
+            self._version = None
+            self._snapshot_frame = None
+
+RATE_STREAM = RateBroadcaster()
+
+def init_rate_stream(app):
+    """Apply RATE_STREAM_MAX_SUBSCRIBERS (0 = no cap) from the app config or environment"""
+    value = app.config.get('RATE_STREAM_MAX_SUBSCRIBERS')
+    if value is None:
+        value = os.getenv('RATE_STREAM_MAX_SUBSCRIBERS', 0)
+    RATE_STREAM.max_subscribers = int(value)
+    return RATE_STREAM
+
+def parse_last_version(request):
+    """Snapshot ID to resume from (Last-Event-ID or ?since=), None if absent or malformed"""
+    value = (request.headers.get('Last-Event-ID') or request.args.get('since') or '').strip()
+    if not value or len(value) > MAX_EVENT_ID_LENGTH:
+        return None
+    return value
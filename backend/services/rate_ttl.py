@@ -0,0 +1,105 @@
+# backend/services/rate_ttl.py
+"""Per-currency cache lifetimes from observed rate movement.
+
+Every refreshed rate is compared with the previous one for that currency
+(quoted against USD, or EUR for USD itself). The squared log return per
+second goes into an exponentially weighted average: an estimate of the
+currency's variance rate. A currency is refreshed after the time over which
+its expected move, sigma * sqrt(t), reaches RATE_TTL_TOLERANCE (0.1%):
+
+    ttl = tolerance^2 / variance, clamped to [RATE_TTL_MIN, RATE_TTL_MAX]
+
+Pegged or quiet currencies (XOF, AED) drift up to the maximum, and volatile
+ones (NGN, GHS) come down to the minimum. A currency with fewer than two
+observations gets RATE_TTL_DEFAULT. A pair lives as long as the shorter
+TTL of its two currencies.
+"""
+import math
+import os
+import threading
+
+DEFAULTS = {
+    'RATE_TTL_MIN': 60.0,
+    'RATE_TTL_MAX': 3600.0,
+    'RATE_TTL_DEFAULT': 300.0,
+    'RATE_TTL_TOLERANCE': 0.001,
+}
+SMOOTHING = 0.2  # weight of the newest observation
+REFERENCE_CURRENCIES = ('USD', 'EUR')
+
+def reference_rate(rates, currency):
+    """(reference, rate) quoting `currency` in a {base: {quote: rate}} snapshot, None if absent"""
+    for reference in REFERENCE_CURRENCIES:
+        if reference != currency:
+            rate = rates.get(reference, {}).get(currency)
+            if rate:
+                return reference, rate
+    return None
+
+def snapshot_currencies(rates):
+    return set(rates) | {quote for quotes in rates.values() for quote in quotes}
+
+class VolatilityTracker:
+    """EWMA variance rate per currency, and the TTL it implies"""
+
+    def __init__(self, min_ttl=DEFAULTS['RATE_TTL_MIN'], max_ttl=DEFAULTS['RATE_TTL_MAX'],
+                 default_ttl=DEFAULTS['RATE_TTL_DEFAULT'], tolerance=DEFAULTS['RATE_TTL_TOLERANCE']):
+        self._lock = threading.Lock()
+        self.configure(min_ttl, max_ttl, default_ttl, tolerance)
+
+    def configure(self, min_ttl=DEFAULTS['RATE_TTL_MIN'], max_ttl=DEFAULTS['RATE_TTL_MAX'],
+                  default_ttl=DEFAULTS['RATE_TTL_DEFAULT'], tolerance=DEFAULTS['RATE_TTL_TOLERANCE']):
+        with self._lock:
+            self.min_ttl = min_ttl
+            self.max_ttl = max_ttl
+            self.default_ttl = default_ttl
+            self.tolerance = tolerance
+            self._last = {}  # currency -> (reference, rate, timestamp)
+            self._variance = {}  # currency -> EWMA of squared log return per second
+
+    def observe(self, rates, timestamp, currencies=None):
+        """Update the estimates from a snapshot; `currencies` limits it to freshly fetched ones"""
+        with self._lock:
+            for currency in currencies if currencies is not None else snapshot_currencies(rates):
+                found = reference_rate(rates, currency)
+                if found is None:
+                    continue
+                reference, rate = found
+                last = self._last.get(currency)
+                self._last[currency] = (reference, rate, timestamp)
+                if last is None or last[0] != reference or timestamp <= last[2]:
+                    continue
+                sample = math.log(rate / last[1]) ** 2 / (timestamp - last[2])
+                previous = self._variance.get(currency)
+                self._variance[currency] = sample if previous is None else (
+                    SMOOTHING * sample + (1 - SMOOTHING) * previous)
+
+    def ttl(self, currency):
+        variance = self._variance.get(currency)
+        if variance is None:
+            return self.default_ttl
+        if variance <= 0:
+            return self.max_ttl
+        return min(max(self.tolerance ** 2 / variance, self.min_ttl), self.max_ttl)
+
+    def ttls(self, currencies):
+        return {currency: self.ttl(currency) for currency in currencies}
+
+    def reset(self):
+        self.configure(self.min_ttl, self.max_ttl, self.default_ttl, self.tolerance)
+
+def _setting(app, key):
+    value = app.config.get(key)
+    if value is None:
+        value = os.getenv(key, DEFAULTS[key])
+    return type(DEFAULTS[key])(value)
+
+RATE_VOLATILITY = VolatilityTracker()
+
+def init_rate_ttl(app):
+    """Apply RATE_TTL_* from the app config or environment"""
+    RATE_VOLATILITY.configure(min_ttl=_setting(app, 'RATE_TTL_MIN'),
+                              max_ttl=_setting(app, 'RATE_TTL_MAX'),
+                              default_ttl=_setting(app, 'RATE_TTL_DEFAULT'),
+                              tolerance=_setting(app, 'RATE_TTL_TOLERANCE'))
+    return RATE_VOLATILITY
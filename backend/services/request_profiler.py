@@ -0,0 +1,171 @@
+# backend/services/request_profiler.py
+"""On-demand sampling profiler for live requests.
+
+A request is profiled when it carries `X-Profile: <PROFILER_ADMIN_TOKEN>`, or
+at random for 1 in PROFILER_SAMPLE_RATE requests. While it runs, a helper
+thread samples the request thread's stack every PROFILER_INTERVAL_MS and the
+samples are written in collapsed-stack format (one `frame;frame;frame count`
+line per unique stack), which flamegraph.pl, speedscope and inferno read
+directly. Files go to PROFILER_DIR/<route>/, keeping the newest
+PROFILER_MAX_FILES_PER_ROUTE per route.
+
+Nothing is installed unless a token or sample rate is configured; after
+that, unprofiled requests only pay for a header lookup and a random draw.
+
+Samples come from sys._current_frames(), which only knows OS threads, so this
+covers the threaded `web` process. Under gevent's monkey-patching (the
+`stream` process) requests run in greenlets it can't see, and the hooks are
+not installed there.
+"""
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+PROFILE_HEADER = 'X-Profile'
+
+DEFAULTS = {
+    'PROFILER_DIR': 'profiles',
+    'PROFILER_SAMPLE_RATE': 0,         # 1-in-N requests; 0 disables sampling
+    'PROFILER_ADMIN_TOKEN': '',        # empty disables the header trigger
+    'PROFILER_INTERVAL_MS': 2,
+    'PROFILER_MAX_FILES_PER_ROUTE': 20,
+}
+
+_UNSAFE_PATH_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+logger = logging.getLogger('remitlite.profiler')
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[';'.join(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+def _setting(app, key):
+    value = app.config.get(key)
+    if value is None:
+        value = os.getenv(key, DEFAULTS[key])
+    return type(DEFAULTS[key])(value)
+
+def route_slug(rule):
+    """Filesystem-safe name for a URL rule, e.g. /api/convert-rate -> api_convert-rate"""
+    return _UNSAFE_PATH_CHARS.sub('_', rule.strip('/')) or 'root'
+
+def enforce_retention(directory, max_files):
+    """Delete the oldest profiles beyond max_files"""
+    files = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.folded')),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in files[:max(0, len(files) - max_files)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+def write_profile(base_dir, rule, sampler, max_files):
+    directory = os.path.join(base_dir, route_slug(rule))
+    os.makedirs(directory, exist_ok=True)
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{sampler.samples}s.folded"
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(sampler.collapsed())
+    enforce_retention(directory, max_files)
+    return path
+
+def threads_are_greenlets():
+    """True when gevent has patched threading, so get_ident() names a greenlet"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+def init_request_profiler(app):
+    """Install the profiling hooks if a token or sample rate is configured"""
+    token = _setting(app, 'PROFILER_ADMIN_TOKEN')
+    sample_rate = _setting(app, 'PROFILER_SAMPLE_RATE')
+    if not token and sample_rate <= 0:
+        return False
+    if threads_are_greenlets():
+        # Every profile would be empty: the request's greenlet has no entry in sys._current_frames()
+        logger.warning("Request profiler disabled under gevent; profile the threaded web process instead")
+        return False
+
+    interval = _setting(app, 'PROFILER_INTERVAL_MS') / 1000
+    max_files = _setting(app, 'PROFILER_MAX_FILES_PER_ROUTE')
+    base_dir = _setting(app, 'PROFILER_DIR')
+    if not os.path.isabs(base_dir):
+        base_dir = os.path.join(app.instance_path, base_dir)
+
+    def should_profile():
+        supplied = request.headers.get(PROFILE_HEADER)
+        if token and supplied and hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+        return sample_rate > 0 and random.random() * sample_rate < 1
+
+    @app.before_request
+    def start_request_profile():
+        if should_profile():
+            g._request_sampler = StackSampler(threading.get_ident(), interval).start()
+
+    @app.after_request
+    def finish_request_profile(response):
+        sampler = g.pop('_request_sampler', None)
+        if sampler is not None:
+            sampler.stop()
+            rule = request.url_rule.rule if request.url_rule else 'unmatched'
+            path = write_profile(base_dir, rule, sampler, max_files)
+            response.headers['X-Profile-File'] = os.path.relpath(path, base_dir)
+        return response
+
+    @app.teardown_request
+    def stop_request_profile(exc):
+        sampler = g.pop('_request_sampler', None)
+        if sampler is not None:
+            sampler.stop()
+
+    return True
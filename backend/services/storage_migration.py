@@ -0,0 +1,318 @@
+# backend/services/storage_migration.py
+"""Chunked, resumable move of users/transfers to the compact storage format.
+
+Legacy tables key rows by 36-character text UUIDs and store amounts as
+Float. The compact format (models.types) stores keys as 16 bytes and
+amounts as integer minor units. The move is copy-and-swap, so the legacy
+tables keep serving the running app until the swap:
+
+1. `users__compact` and `transfers__compact` are created with the new
+   schema.
+2. Rows are copied in legacy-key order, chunk_size rows per transaction.
+   The cursor is saved in `storage_migration` in the same transaction, so
+   an interrupted run resumes where it stopped, and re-running picks up
+   rows added since. Users that a transfer chunk refers to are copied
+   first if they are missing.
+3. `swap` takes the write lock and copies what is left. It then catches
+   up, reading only rows from after the migration started:
+   - transfers inserted behind the cursor (by created_at)
+   - users created or logged in since then (by created_at / last_login)
+   Transfers are insert-only in this app, so copied transfers never change.
+   last_login is the only user column the app updates, since passwords are
+   set at sign-up. `prepare` indexes those columns on the legacy tables,
+   so the catch-up reads in chunks from the index and the lock stays short.
+   Finally it renames users -> users__legacy and users__compact -> users,
+   and the same for transfers, and renames their indexes and constraints to
+   match (ix_transfers__compact_version -> ix_transfers_version, with the
+   legacy table's moving to ix_transfers__legacy_version). The release step
+   (see Procfile) runs this before the new code starts.
+4. `drop_legacy` drops the __legacy tables once the result is verified.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import (Column, DateTime, ForeignKey, Index, MetaData, String, Table, inspect, or_,
+                        select, text, update)
+from sqlalchemy.exc import StatementError
+
+logger = logging.getLogger('remitlite.storage')
+
+DEFAULT_CHUNK_SIZE = 5000
+CATCH_UP_MARGIN = timedelta(minutes=5)  # clock skew between app hosts and the migration
+COMPACT_SUFFIX = '__compact'
+LEGACY_SUFFIX = '__legacy'
+TABLES = ('users', 'transfers')  # parents first
+# Legacy columns the swap's catch-up filters on, indexed before it runs
+CATCH_UP_COLUMNS = {'users': ('created_at', 'last_login'), 'transfers': ('created_at',)}
+
+class StorageMigrationError(ValueError):
+    pass
+
+def _index_names(connection, table_name):
+    """{name: (columns, unique)} for the table's named indexes, unique constraints and primary key"""
+    inspector = inspect(connection)
+    names = {}
+    for index in inspector.get_indexes(table_name):
+        names[index['name']] = (index['column_names'], index['unique'])
+    for constraint in inspector.get_unique_constraints(table_name):
+        names.setdefault(constraint['name'], (constraint['column_names'], True))
+    primary_key = inspector.get_pk_constraint(table_name)
+    names.setdefault(primary_key.get('name'), (primary_key['constrained_columns'], True))
+    names.pop(None, None)  # SQLite's inline constraints have no name to fix
+    return names
+
+def _rename_index(connection, table_name, old, new, columns, unique):
+    if connection.dialect.name == 'postgresql':
+        # Renames a unique or primary key constraint along with its index
+        connection.execute(text(f'ALTER INDEX {old} RENAME TO {new}'))
+        return
+    # SQLite can't rename an index; rebuild it under the new name
+    connection.execute(text(f'DROP INDEX {old}'))
+    connection.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {new} "
+                            f"ON {table_name} ({', '.join(columns)})"))
+
+def _rename_indexes(connection, name):
+    """After the table swap, give `name`'s indexes the names the model creates
+
+    Names are global, so the legacy table's copies move aside first.
+    """
+    compact = _index_names(connection, name)
+    targets = {index: index.replace(name + COMPACT_SUFFIX, name, 1)
+               for index in compact if name + COMPACT_SUFFIX in index}
+    legacy_name = name + LEGACY_SUFFIX
+    for index, (columns, unique) in _index_names(connection, legacy_name).items():
+        if index in targets.values():
+            _rename_index(connection, legacy_name, index, index.replace(name, legacy_name, 1), columns, unique)
+    for index, target in targets.items():
+        _rename_index(connection, name, index, target, *compact[index])
+    return targets
+
+def storage_format(connection):
+    """'compact', 'legacy', or None when there is no transfers table yet"""
+    inspector = inspect(connection)
+    if not inspector.has_table('transfers'):
+        return None
+    columns = {column['name'] for column in inspector.get_columns('transfers')}
+    return 'compact' if 'amount_minor' in columns else 'legacy'
+
+def add_version_column(connection):
+    """Add transfers.version (and its index) to a table created before delta sync; True if added"""
+    from models.transfer import Transfer
+
+    inspector = inspect(connection)
+    if not inspector.has_table('transfers'):
+        return False
+    if 'version' in {column['name'] for column in inspector.get_columns('transfers')}:
+        return False
+    connection.execute(text('ALTER TABLE transfers ADD COLUMN version BIGINT NOT NULL DEFAULT 0'))
+    for index in Transfer.__table__.indexes:
+        if [column.name for column in index.columns] == ['version']:
+            index.create(connection)
+    return True
+
+def _model_tables():
+    from models.transfer import Transfer
+    from models.user import User
+
+    return {'users': User.__table__, 'transfers': Transfer.__table__}
+
+def _compact_tables(metadata):
+    """The model tables under their __compact names, with foreign keys between them"""
+    tables = {}
+    for name, model_table in _model_tables().items():
+        columns = []
+        for column in model_table.columns:
+            foreign_keys = [ForeignKey(f'{fk.column.table.name}{COMPACT_SUFFIX}.{fk.column.name}')
+                            for fk in column.foreign_keys]
+            server_default = column.server_default.arg if column.server_default is not None else None
+            columns.append(Column(column.name, column.type, *foreign_keys,
+                                  primary_key=column.primary_key, nullable=column.nullable,
+                                  unique=column.unique, index=column.index,
+                                  server_default=server_default))
+        tables[name] = Table(name + COMPACT_SUFFIX, metadata, *columns)
+    return tables
+
+def _progress_table(metadata):
+    return Table('storage_migration', metadata,
+                 Column('table_name', String(32), primary_key=True),
+                 Column('last_key', String(64), nullable=True),
+                 Column('started_at', DateTime, nullable=False))
+
+class StorageMigration:
+    def __init__(self, engine, chunk_size=DEFAULT_CHUNK_SIZE, log=None):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.log = log or logger.info
+        self.metadata = MetaData()
+        self.compact = _compact_tables(self.metadata)
+        self.progress = _progress_table(self.metadata)
+        self.legacy = None
+
+    def _reflect_legacy(self, connection):
+        if self.legacy is None:
+            metadata = MetaData()
+            self.legacy = {name: Table(name, metadata, autoload_with=connection) for name in TABLES}
+        return self.legacy
+
+    def prepare(self):
+        with self.engine.begin() as connection:
+            found = storage_format(connection)
+            if found != 'legacy':
+                raise StorageMigrationError(
+                    'nothing to migrate: ' + ('no transfers table' if found is None else 'already compact'))
+            legacy = self._reflect_legacy(connection)
+            self.metadata.create_all(connection, checkfirst=True)
+            known = {row.table_name for row in connection.execute(select(self.progress))}
+            now = datetime.utcnow()
+            for name in TABLES:
+                if name not in known:
+                    connection.execute(self.progress.insert().values(
+                        table_name=name, last_key=None, started_at=now))
+        self._index_catch_up_columns(legacy)
+
+    def _index_catch_up_columns(self, legacy):
+        # Outside a transaction, so PostgreSQL can build them without blocking writers
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for name, columns in CATCH_UP_COLUMNS.items():
+                table = legacy[name]
+                for column in columns:
+                    if column in table.c:
+                        Index(f'ix_{name}__catch_up_{column}', table.c[column],
+                              postgresql_concurrently=True).create(connection, checkfirst=True)
+
+    def copy(self):
+        """Copy every row past the saved cursors; returns {table: rows copied}"""
+        self.prepare()
+        copied = {}
+        for name in TABLES:
+            copied[name] = 0
+            while True:
+                with self.engine.begin() as connection:
+                    count = self._copy_chunk(connection, name)
+                if not count:
+                    break
+                copied[name] += count
+                self.log(f'{name}: {copied[name]:,} rows copied')
+        return copied
+
+    def _cursor(self, connection, name):
+        return connection.execute(select(self.progress).where(self.progress.c.table_name == name)).one()
+
+    def _copy_chunk(self, connection, name):
+        legacy = self.legacy[name]
+        cursor = self._cursor(connection, name)
+        query = select(legacy).order_by(legacy.c.id).limit(self.chunk_size)
+        if cursor.last_key is not None:
+            query = query.where(legacy.c.id > cursor.last_key)
+        rows = connection.execute(query).mappings().all()
+        if not rows:
+            return 0
+        self._insert_missing(connection, name, rows)
+        connection.execute(update(self.progress).where(self.progress.c.table_name == name)
+                           .values(last_key=rows[-1]['id']))
+        return len(rows)
+
+    def _convert(self, name, row):
+        from models.transfer import Transfer
+
+        row = Transfer.storage_row(row) if name == 'transfers' else dict(row)
+        columns = self.compact[name].c
+        return {key: value for key, value in row.items() if key in columns}
+
+    def _existing_ids(self, connection, name, ids):
+        table = self.compact[name]
+        try:
+            return {row_id for (row_id,) in connection.execute(select(table.c.id).where(table.c.id.in_(ids)))}
+        except StatementError as e:
+            raise StorageMigrationError(f'{name} has an ID that is neither a UUID nor a time-ordered ID: {e.orig}')
+
+    def _insert_missing(self, connection, name, rows):
+        """Insert the legacy rows the compact table doesn't have yet"""
+        if name == 'transfers':
+            party_ids = {row[key] for row in rows for key in ('sender_id', 'recipient_id')}
+            missing_users = party_ids - self._existing_ids(connection, 'users', list(party_ids))
+            if missing_users:
+                users = self.legacy['users']
+                self._insert_missing(connection, 'users', connection.execute(
+                    select(users).where(users.c.id.in_(missing_users))).mappings().all())
+        existing = self._existing_ids(connection, name, [row['id'] for row in rows])
+        missing = [self._convert(name, row) for row in rows if row['id'] not in existing]
+        if missing:
+            connection.execute(self.compact[name].insert(), missing)
+        return len(missing)
+
+    def _chunks(self, connection, table, condition):
+        """Rows matching condition, chunk_size at a time in key order"""
+        last_key = None
+        while True:
+            query = select(table).where(condition).order_by(table.c.id).limit(self.chunk_size)
+            if last_key is not None:
+                query = query.where(table.c.id > last_key)
+            rows = connection.execute(query).mappings().all()
+            if not rows:
+                return
+            last_key = rows[-1]['id']
+            yield rows
+
+    def _sync_users(self, connection, since):
+        """Copy users created or logged in since `since` (under the write lock)"""
+        legacy, compact = self.legacy['users'], self.compact['users']
+        columns = [column.name for column in compact.columns if column.name != 'id']
+        recent = [legacy.c[column] >= since for column in CATCH_UP_COLUMNS['users'] if column in legacy.c]
+        changed = 0
+        for rows in self._chunks(connection, legacy, or_(*recent)):
+            changed += self._insert_missing(connection, 'users', rows)
+            current = {row.id: row for row in connection.execute(
+                select(compact).where(compact.c.id.in_([row['id'] for row in rows])))}
+            for row in rows:
+                values = {column: row[column] for column in columns
+                          if column in row and row[column] != getattr(current[row['id']], column)}
+                if values:
+                    connection.execute(update(compact).where(compact.c.id == row['id']).values(**values))
+                    changed += 1
+        return changed
+
+    def swap(self):
+        """Finish the copy under the write lock and rename the tables into place"""
+        self.copy()
+        with self.engine.begin() as connection:
+            # The first write takes SQLite's lock; PostgreSQL also locks both tables
+            connection.execute(update(self.progress).values(last_key=self.progress.c.last_key))
+            if connection.dialect.name == 'postgresql':
+                connection.execute(text('LOCK TABLE users, transfers IN EXCLUSIVE MODE'))
+            while self._copy_chunk(connection, 'users') or self._copy_chunk(connection, 'transfers'):
+                pass
+
+            since = self._cursor(connection, 'transfers').started_at - CATCH_UP_MARGIN
+            transfers = self.legacy['transfers']
+            late = 0
+            for rows in self._chunks(connection, transfers, transfers.c.created_at >= since):
+                late += len(rows)
+                self._insert_missing(connection, 'transfers', rows)
+            synced = self._sync_users(connection, since)
+
+            for name in TABLES:
+                connection.execute(text(f'ALTER TABLE {name} RENAME TO {name}{LEGACY_SUFFIX}'))
+            for name in TABLES:
+                connection.execute(text(f'ALTER TABLE {name}{COMPACT_SUFFIX} RENAME TO {name}'))
+            for name in TABLES:
+                _rename_indexes(connection, name)
+            self.progress.drop(connection)
+
+            from models.currency import Currency, sync_currencies
+            from models.sync_counter import SyncCounter
+            Currency.__table__.create(connection, checkfirst=True)
+            sync_currencies(connection)
+            SyncCounter.__table__.create(connection, checkfirst=True)
+        self.log(f'swapped in compact tables ({late:,} late transfers checked, {synced:,} users synced)')
+        return {'late_transfers': late, 'users_synced': synced}
+
+def drop_legacy(engine):
+    """Drop the tables a swap renamed to __legacy; returns their names"""
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        dropped = [name + LEGACY_SUFFIX for name in reversed(TABLES)
+                   if inspector.has_table(name + LEGACY_SUFFIX)]
+        for name in dropped:
+            connection.execute(text(f'DROP TABLE {name}'))
+    return dropped
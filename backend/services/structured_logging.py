@@ -0,0 +1,164 @@
+# backend/services/structured_logging.py
+"""Non-blocking JSON-lines logging for request paths.
+
+Loggers under `remitlite` hand records to a bounded in-memory queue; a
+background QueueListener thread formats them as JSON lines and writes them
+to stdout. The request thread never waits on I/O. If the queue is full the
+record is dropped and counted (remitlite_log_records_dropped_total), so a
+slow stdout can't stall a request either.
+
+Each request gets an ID (taken from X-Request-ID or generated) that is
+attached to every record logged during the request and echoed back in the
+response header. Noisy levels can be sampled, e.g. LOG_SAMPLE_DEBUG=0.01
+keeps 1% of DEBUG records; WARNING and above are always kept.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+from services.metrics import REGISTRY
+
+ROOT_LOGGER = 'remitlite'
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+DEFAULTS = {
+    'LOG_LEVEL': 'INFO',
+    'LOG_QUEUE_SIZE': 10000,
+    'LOG_SAMPLE_DEBUG': 1.0,
+    'LOG_SAMPLE_INFO': 1.0,
+}
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    'remitlite_log_records_dropped_total', 'Log records dropped because the log queue was full')
+
+# Attributes every LogRecord has; anything else came in via `extra=` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_id'}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, extra fields"""
+    converter = time.gmtime
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records per level; WARNING and above always pass"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates  # {levelno: fraction kept}
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Runs on the request thread: capture the request id and render the
+        # traceback (frames won't survive the hop), leave JSON to the writer
+        if has_request_context():
+            record.request_id = g.get('request_id')
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+_listener = None
+_handler = None
+
+def _setting(app, key):
+    value = app.config.get(key)
+    if value is None:
+        value = os.getenv(key, DEFAULTS[key])
+    return type(DEFAULTS[key])(value)
+
+def configure_logging(level='INFO', queue_size=10000, sample_rates=None, stream=None):
+    """Route the `remitlite` logger through the queue and start the writer thread"""
+    global _listener, _handler
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    if _handler is not None:
+        _handler.filters[0].rates = sample_rates or {}
+        return _handler
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter())
+
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(SamplingFilter(sample_rates or {}))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+    _listener = QueueListener(_handler.queue, writer, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _handler
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _listener = _handler = None
+
+def init_logging(app):
+    """Configure structured logging from LOG_* settings and tag requests with an ID"""
+    configure_logging(
+        level=_setting(app, 'LOG_LEVEL').upper(),
+        queue_size=_setting(app, 'LOG_QUEUE_SIZE'),
+        sample_rates={
+            logging.DEBUG: _setting(app, 'LOG_SAMPLE_DEBUG'),
+            logging.INFO: _setting(app, 'LOG_SAMPLE_INFO'),
+        },
+    )
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,170 @@
+# backend/services/transfer_reads.py
+"""Read-only transfer queries that skip the ORM.
+
+Listing and export don't need identity-mapped Transfer and User objects
+that are thrown away right after to_dict(). Here a Core SELECT returns
+plain tuples, and each tuple maps straight to the to_dict() shape, with the
+same keys in the same order. A row's first columns line up with the output
+keys, so dict(zip(keys, row)) builds most of it in C. The rest is fixed
+up in place:
+- money fields hold minor units and are divided by their currency's scale
+- party fields hold the user's id and are replaced by the nested user dict,
+  built from trailing columns
+
+Only the columns and joins that `fields` asks for are selected, like
+Transfer.query_options().
+
+changes_since() is the delta-sync read. It returns transfers whose version
+is above the client's, up to the sync counter's high-water mark.
+"""
+import csv
+import io
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from models.currency import CURRENCY_EXPONENTS, DEFAULT_EXPONENT
+from models.sync_counter import current_version
+from models.transfer import MONEY_COLUMNS, PARTY_RELATIONSHIPS, TRANSFER_FIELDS, Transfer
+from models.user import USER_FIELDS, User
+
+DEFAULT_SCALE = 10 ** DEFAULT_EXPONENT
+SCALES = {code: 10 ** places for code, places in CURRENCY_EXPONENTS.items()}
+EXPORT_CHUNK_SIZE = 2000
+
+class TransferReader:
+    """SELECT and row mapper for one ?fields= selection"""
+
+    def __init__(self, fields=None):
+        table = Transfer.__table__
+        names = [name for name in TRANSFER_FIELDS if fields is None or name in fields]
+        leading, trailing = [], []
+        extra = {}
+
+        def column_index(column):
+            # A column needed only to map the row goes after the output keys
+            if column.key not in extra:
+                extra[column.key] = len(trailing)
+                trailing.append(column)
+            return extra[column.key]
+
+        self.money = []
+        self.parties = []
+        joins = []
+        for name in names:
+            if name in PARTY_RELATIONSHIPS:
+                user = aliased(User.__table__, name=name)
+                joins.append((user, getattr(table.c, f'{name}_id') == user.c.id))
+                user_fields = _party_fields(fields, name)
+                leading.append(user.c.id)
+                start = len(trailing)
+                trailing.extend(getattr(user.c, field) for field in user_fields)
+                self.parties.append((name, start, tuple(user_fields)))
+            elif name in MONEY_COLUMNS:
+                minor, currency = MONEY_COLUMNS[name]
+                leading.append(getattr(table.c, minor))
+                self.money.append((name, column_index(getattr(table.c, currency))))
+            else:
+                leading.append(getattr(table.c, name))
+
+        self.keys = tuple(names)
+        offset = len(leading)
+        self.money = [(name, offset + index) for name, index in self.money]
+        self.parties = [(name, offset + start, keys) for name, start, keys in self.parties]
+
+        query = select(*leading, *trailing).select_from(table)
+        for user, condition in joins:
+            query = query.outerjoin(user, condition)
+        self.query = query.order_by(table.c.created_at.desc())
+
+    def map_row(self, row):
+        item = dict(zip(self.keys, row))
+        for name, currency_index in self.money:
+            minor = item[name]
+            if minor is not None:
+                item[name] = minor / SCALES.get(row[currency_index], DEFAULT_SCALE)
+        for name, start, keys in self.parties:
+            if item[name] is not None:
+                item[name] = dict(zip(keys, row[start:start + len(keys)]))
+        return item
+
+    def all(self, connection, query=None):
+        map_row = self.map_row
+        return [map_row(row) for row in connection.execute(self.query if query is None else query)]
+
+    def changed(self, connection, since, until):
+        """Transfers with since < version <= until, oldest change first"""
+        version = Transfer.__table__.c.version
+        query = self.query.where(version > since, version <= until).order_by(None).order_by(version)
+        return self.all(connection, query)
+
+    def stream(self, connection, chunk_size=EXPORT_CHUNK_SIZE):
+        """Mapped rows, fetched chunk_size at a time with a server-side cursor where supported"""
+        map_row = self.map_row
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(self.query)
+        for partition in result.partitions(chunk_size):
+            for row in partition:
+                yield map_row(row)
+
+def list_transfers(connection, fields=None):
+    """What [t.to_dict(fields) for t in the ORM listing] returns, newest first"""
+    return TransferReader(fields).all(connection)
+
+def changes_since(connection, since, fields=None):
+    """Delta-sync payload: transfers changed after version `since`, and the new high-water mark
+
+    The counter is read first, so rows committed during the read are left
+    for the next poll instead of being skipped. When nothing changed, that
+    one primary-key lookup is the only query. `since` of 0, or one ahead of
+    the counter (a restored database), gets a full sync with `full` set, and
+    the client replaces its list instead of merging by id.
+    """
+    version = current_version(connection, Transfer.__tablename__)
+    full = since == 0 or since > version
+    if since == version and not full:
+        transfers = []
+    else:
+        reader = TransferReader(fields)
+        transfers = reader.changed(connection, -1 if full else since, version)
+    return {'transfers': transfers, 'version': version, 'full': full}
+
+def _party_fields(fields, name):
+    return [field for field in USER_FIELDS if fields is None or fields[name] is None or field in fields[name]]
+
+def export_columns(fields=None):
+    """Flat CSV headers: transfer fields, with parties spread out as sender.name etc."""
+    columns = []
+    for name in TRANSFER_FIELDS:
+        if fields is not None and name not in fields:
+            continue
+        if name in PARTY_RELATIONSHIPS:
+            columns.extend(f'{name}.{field}' for field in _party_fields(fields, name))
+        else:
+            columns.append(name)
+    return columns
+
+def _cell(value):
+    if value is None:
+        return ''
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def export_csv(connection, fields=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """CSV text: the header, then one piece per chunk_size transfers"""
+    reader = TransferReader(fields)
+    blanks = {name: [''] * len(keys) for name, _, keys in reader.parties}
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export_columns(fields))
+    for count, item in enumerate(reader.stream(connection, chunk_size), 1):
+        row = []
+        for name, value in item.items():
+            if name in blanks:
+                row.extend(blanks[name] if value is None else map(_cell, value.values()))
+            else:
+                row.append(_cell(value))
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,71 @@
+# backend/services/transfer_store.py
+"""Bounded in-memory transfer store for the routes blueprint.
+
+Records sit in a fixed-size ring in insertion order, which is also
+created_at order, so the ring doubles as the time index. A dict maps IDs
+to records. Lookup is O(1), the newest k records come back in O(k), and
+once the ring is full each insert overwrites the oldest record and drops it
+from the dict. Memory is bounded by `capacity`.
+"""
+import os
+import threading
+
+DEFAULT_CAPACITY = int(os.getenv('TRANSFER_STORE_CAPACITY', 10_000))
+
+TRANSFER_FIELDS = (
+    'id', 'sender_name', 'sender_country', 'recipient_name', 'recipient_country',
+    'amount', 'from_currency', 'to_currency', 'exchange_rate', 'converted_amount',
+    'fee', 'delivery_time', 'status', 'created_at', 'updated_at',
+)
+
+class TransferRecord:
+    __slots__ = TRANSFER_FIELDS
+
+    def __init__(self, **fields):
+        for name in TRANSFER_FIELDS:
+            setattr(self, name, fields[name])
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in TRANSFER_FIELDS}
+
+class TransferStore:
+    """Ring buffer of the newest `capacity` transfers plus an ID index"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._lock = threading.Lock()
+        self.configure(capacity)
+
+    def configure(self, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        with self._lock:
+            self.capacity = capacity
+            self._ring = [None] * capacity
+            self._next = 0  # slot the next record goes into
+            self._by_id = {}
+
+    def add(self, record):
+        with self._lock:
+            evicted = self._ring[self._next]
+            if evicted is not None:
+                del self._by_id[evicted.id]
+            self._ring[self._next] = record
+            self._by_id[record.id] = record
+            self._next = (self._next + 1) % self.capacity
+        return record
+
+    def get(self, transfer_id):
+        return self._by_id.get(transfer_id)
+
+    def recent(self, limit=None):
+        """Newest first, at most `limit` records"""
+        with self._lock:
+            count = len(self._by_id) if limit is None else min(limit, len(self._by_id))
+            ring, start, capacity = self._ring, self._next, self.capacity
+            return [ring[(start - i) % capacity] for i in range(1, count + 1)]
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def clear(self):
+        self.configure(self.capacity)
@@ -5,15 +5,48 @@ import os
 # Add the backend directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import your actual app
-from app import app as flask_app
+# Import your actual app factory
+from app import create_app
+from models.database import db
 
 @pytest.fixture
-def client():
-    flask_app.config['TESTING'] = True
-    with flask_app.test_client() as client:
+def app():
+    flask_app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'RATE_HISTORY_DIR': '',
+        'ID_WORKER_ID': 1,
+    })
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
         yield client
 
+@pytest.fixture
+def fallback_rates():
+    """Prime the shared rate cache with the built-in table, so nothing calls the provider"""
+    import app as app_module
+    app_module.set_cached_rates(app_module.get_fallback_rates())
+    yield app_module
+    app_module.exchange_rates_cache['data'] = None
+    app_module.exchange_rates_cache['expires_at'] = None
+
+@pytest.fixture
+def query_budget(app):
+    """query_budget(n) -> context manager failing if the block runs > n statements or an N+1"""
+    from services.query_profiler import query_budget as budget
+
+    with app.app_context():
+        engine = db.engine
+
+    def make(max_queries, **kwargs):
+        return budget(engine, max_queries, **kwargs)
+    return make
+
 @pytest.fixture
 def sample_transfer_data():
     return {
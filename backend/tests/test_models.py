@@ -130,4 +130,70 @@ class TestBusinessLogic:
         assert test_country in valid_countries
         assert len(test_country) == 2
         assert test_country.isalpha()
-        assert test_country.isupper()
\ No newline at end of file
+        assert test_country.isupper()
+
+class TestDatabaseConfig:
+    """Engine settings resolved from config/env and applied to SQLite connections"""
+
+    def test_defaults_enable_wal_tuning(self, monkeypatch):
+        from models.database import get_database_settings
+        monkeypatch.delenv('DATABASE_URL', raising=False)
+
+        settings = get_database_settings({})
+
+        assert settings['SQLALCHEMY_DATABASE_URI'] == 'sqlite:///remitlite.db'
+        assert settings['SQLITE_JOURNAL_MODE'] == 'WAL'
+        assert settings['SQLITE_SYNCHRONOUS'] == 'NORMAL'
+        assert settings['SQLITE_BUSY_TIMEOUT'] == 5000
+
+    def test_env_and_config_precedence(self, monkeypatch):
+        from models.database import get_database_settings
+        monkeypatch.setenv('DATABASE_URL', 'postgres://user:pw@db.example.com/remit')
+        monkeypatch.setenv('DB_POOL_SIZE', '20')
+
+        settings = get_database_settings({'DB_MAX_OVERFLOW': 3})
+
+        assert settings['SQLALCHEMY_DATABASE_URI'] == 'postgresql://user:pw@db.example.com/remit'
+        assert settings['DB_POOL_SIZE'] == 20
+        assert settings['DB_MAX_OVERFLOW'] == 3
+
+    def test_engine_options(self):
+        from models.database import build_engine_options, get_database_settings
+
+        memory = build_engine_options(get_database_settings({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}))
+        assert 'pool_size' not in memory
+
+        postgres = build_engine_options(get_database_settings({
+            'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/remit',
+            'DB_POOL_SIZE': 15,
+        }))
+        assert postgres['pool_size'] == 15
+        assert postgres['pool_pre_ping'] is True
+
+    def test_sqlite_pragmas_applied(self, tmp_path):
+        from flask import Flask
+        from models.database import configure_database, database_report
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'pragmas.db'}"
+        app.config['SQLITE_BUSY_TIMEOUT'] = 1234
+        configure_database(app)
+
+        report = database_report(app)
+
+        assert report['journal_mode'] == 'wal'
+        assert report['busy_timeout'] == 1234
+        assert report['cache_size'] == -20000
+        assert report['foreign_keys'] == 1
+
+    def test_foreign_key_violations_reported(self, tmp_path):
+        from sqlalchemy import create_engine
+        from models.database import foreign_key_violations
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'orphans.db'}")
+        with engine.begin() as connection:
+            connection.exec_driver_sql('CREATE TABLE users (id TEXT PRIMARY KEY)')
+            connection.exec_driver_sql('CREATE TABLE transfers (id TEXT, sender_id TEXT REFERENCES users(id))')
+            connection.exec_driver_sql("INSERT INTO transfers VALUES ('t1', 'missing'), ('t2', 'missing')")
+
+            assert foreign_key_violations(connection) == {'transfers': 2}
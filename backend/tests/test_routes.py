@@ -2,6 +2,7 @@ import pytest
 import json
 import sys
 import os
+import subprocess
 
 # Add the backend directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -95,4 +96,1021 @@ class TestAppRoutes:
     def test_nonexistent_endpoint(self, client):
         """Test that nonexistent endpoints return 404"""
         response = client.get('/api/nonexistent-endpoint')
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+
+class TestEstimate:
+    def test_single_estimate_unchanged(self, client):
+        response = client.post('/api/estimate', json={'amount': 250, 'countryCode': 'GB'})
+        assert response.get_json() == {'fee': 4.99, 'totalCost': 254.99, 'deliveryTime': '1-2 hours'}
+
+    def test_batch_quotes_many_items(self, client):
+        items = [{'amount': amount, 'countryCode': 'KE', 'fromCurrency': 'usd', 'toCurrency': 'KES'}
+                 for amount in (50, 750, 2000)]
+        payload = client.post('/api/estimate', json={'items': items}).get_json()
+
+        assert [q['fee'] for q in payload['quotes']] == [2.99, 7.99, 20.0]
+        assert payload['quotes'][0]['deliveryTime'] == '3-5 business days'
+        assert payload['feeScheduleVersion']
+
+    def test_batch_rejects_bad_items(self, client):
+        assert client.post('/api/estimate', json={'items': [{'countryCode': 'GB'}]}).status_code == 400
+        too_many = [{'amount': 1}] * 1001
+        assert client.post('/api/estimate', json={'items': too_many}).status_code == 400
+
+class TestFeeSimulationEndpoint:
+    CANDIDATE = {'version': 'flat-3', 'default': [{'up_to': None, 'flat': 3.0}]}
+
+    def test_disabled_without_admin_token(self, client):
+        response = client.post('/api/admin/fee-simulation', json={'candidates': {'flat': self.CANDIDATE}})
+        assert response.status_code == 404
+
+    def test_simulates_stored_transfers(self, app, client, sample_transfer_data, fallback_rates):
+        pytest.importorskip('numpy')
+        app.config['ADMIN_TOKEN'] = 'secret'
+        for amount in (50, 250):
+            client.post('/api/transfer', json={
+                'sender': {'name': 'A', 'country': 'US'},
+                'recipient': {'name': 'B', 'country': 'KE'},
+                'amount': amount, 'fromCurrency': 'USD', 'toCurrency': 'KES',
+                'convertedAmount': amount * 157.8, 'exchangeRate': 157.8
+            })
+
+        body = {'candidates': {'flat': self.CANDIDATE}}
+        assert client.post('/api/admin/fee-simulation', json=body,
+                           headers={'X-Admin-Token': 'wrong'}).status_code == 403
+        report = client.post('/api/admin/fee-simulation', json=body,
+                             headers={'X-Admin-Token': 'secret'}).get_json()
+
+        assert report['totals']['transfers'] == 2
+        assert report['totals']['current_revenue'] == 7.98
+        assert report['totals']['candidates']['flat']['revenue'] == 6.0
+        assert report['totals']['candidates']['current_schedule']['revenue_delta'] == 0.0
+
+        bad = client.post('/api/admin/fee-simulation', json={'candidates': {'x': {'default': []}}},
+                          headers={'X-Admin-Token': 'secret'})
+        assert bad.status_code == 400
+
+class TestAppFactory:
+    def test_import_has_no_side_effects(self):
+        """Importing app must not build the app or pull in requests/jwt"""
+        code = (
+            "import sys, app; "
+            "print('requests' in sys.modules, 'jwt' in sys.modules, 'app' in vars(app))"
+        )
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', code], cwd=backend_dir,
+                                capture_output=True, text=True, check=True)
+
+        assert result.stdout.split() == ['False', 'False', 'False']
+
+    def test_create_app_does_not_create_tables(self):
+        from app import create_app
+        from models.database import db
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RATE_HISTORY_DIR': ''})
+        with app.app_context():
+            assert db.inspect(db.engine).get_table_names() == []
+
+    def test_create_app_makes_no_directories(self, tmp_path, monkeypatch):
+        from flask import Flask
+        from app import create_app
+
+        instance = tmp_path / 'instance'
+        monkeypatch.setattr(Flask, 'auto_find_instance_path', lambda self: str(instance))
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///remitlite.db', 'ID_WORKER_ID': 1})
+
+        assert not instance.exists()
+        assert app.test_cli_runner().invoke(args=['init-db']).exit_code == 0
+        assert (instance / 'remitlite.db').exists()
+        assert app.test_client().get('/api/rates/history?from=USD&to=EUR').status_code == 404
+        assert (instance / 'rate_history').is_dir()  # the history's first read
+
+    def test_init_db_command(self):
+        from app import create_app
+        from models.database import db
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RATE_HISTORY_DIR': ''})
+        result = app.test_cli_runner().invoke(args=['init-db'])
+
+        assert result.exit_code == 0
+        with app.app_context():
+            assert 'transfers' in db.inspect(db.engine).get_table_names()
+
+
+class TestTransferFieldSelection:
+    @pytest.fixture
+    def seeded_client(self, app, client):
+        from models.database import db
+        from models.user import User
+        from models.transfer import Transfer
+
+        with app.app_context():
+            sender = User(name='Ada', email='ada@example.com', country_code='GB')
+            recipient = User(name='Kofi', country_code='GH')
+            db.session.add_all([sender, recipient])
+            db.session.flush()
+            for i in range(3):
+                db.session.add(Transfer(
+                    sender_id=sender.id, recipient_id=recipient.id, amount=100.0 + i,
+                    from_currency='GBP', to_currency='GHS', converted_amount=1452.0,
+                    exchange_rate=14.52, fee=2.99, total_amount=102.99 + i,
+                    delivery_time='3-5 business days', tracking_number=f'RMTEST{i}'
+                ))
+            db.session.commit()
+        return client
+
+    def capture_sql(self, app):
+        from sqlalchemy import event
+        from models.database import db
+
+        statements = []
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args: statements.append(statement))
+        return statements
+
+    def test_fields_limit_response(self, seeded_client):
+        response = seeded_client.get('/api/transfers?fields=id,amount,sender.name')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data) == 3
+        assert set(data[0]) == {'id', 'amount', 'sender'}
+        assert data[0]['sender'] == {'name': 'Ada'}
+
+    def test_projection_reaches_sql(self, app, seeded_client):
+        statements = self.capture_sql(app)
+
+        seeded_client.get('/api/transfers?fields=id,amount,status')
+
+        assert len(statements) == 1
+        assert 'users' not in statements[0]
+        assert 'delivery_time' not in statements[0]
+
+    def test_full_listing_loads_users_in_one_query(self, app, seeded_client):
+        statements = self.capture_sql(app)
+
+        data = seeded_client.get('/api/transfers').get_json()
+
+        assert len(statements) == 1
+        assert data[0]['recipient']['name'] == 'Kofi'
+
+    def test_unknown_field_rejected(self, seeded_client):
+        response = seeded_client.get('/api/transfers?fields=id,password_hash')
+
+        assert response.status_code == 400
+        assert 'password_hash' in response.get_json()['error']
+
+    @pytest.mark.parametrize('spec', [None, 'id,amount,fee,sender.name', 'recipient,status,created_at'])
+    def test_core_listing_matches_orm(self, app, seeded_client, spec):
+        from models.database import db
+        from models.transfer import Transfer
+        from services.transfer_reads import list_transfers
+
+        with app.app_context():
+            fields = Transfer.parse_fields(spec)
+            expected = [t.to_dict(fields) for t in Transfer.query.options(*Transfer.query_options(fields))
+                        .order_by(Transfer.created_at.desc())]
+            listed = list_transfers(db.session.connection(), fields)
+
+        assert listed == expected
+        assert [list(item) for item in listed] == [list(item) for item in expected]
+        for key in ('sender', 'recipient'):
+            if key in expected[0]:
+                assert list(listed[0][key]) == list(expected[0][key])
+
+    def test_export_needs_admin_token(self, app, seeded_client):
+        assert seeded_client.get('/api/transfers/export').status_code == 404
+
+        app.config['ADMIN_TOKEN'] = 'secret'
+        assert seeded_client.get('/api/transfers/export').status_code == 403
+        wrong = seeded_client.get('/api/transfers/export', headers={'X-Admin-Token': 'wrong'})
+        assert wrong.status_code == 403
+        assert 'Ada' not in wrong.get_data(as_text=True)
+
+    def test_export_streams_csv(self, app, seeded_client):
+        import csv
+        import io
+
+        app.config['ADMIN_TOKEN'] = 'secret'
+        response = seeded_client.get('/api/transfers/export?fields=amount,sender.name,recipient,status',
+                                     headers={'X-Admin-Token': 'secret'})
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert rows[0][0] == 'sender.name'
+        assert rows[0][-2:] == ['amount', 'status']
+        assert 'recipient.last_login' in rows[0]
+        assert len(rows) == 4
+        first = dict(zip(rows[0], rows[1]))
+        assert first['sender.name'] == 'Ada'
+        assert first['recipient.name'] == 'Kofi'
+        assert first['recipient.email'] == ''
+        assert float(first['amount']) in (100.0, 101.0, 102.0)
+
+    def test_export_chunks_rows(self, app, seeded_client):
+        from models.database import db
+        from services.transfer_reads import export_csv
+
+        with app.app_context():
+            chunks = list(export_csv(db.session.connection(), None, chunk_size=2))
+
+        assert len(chunks) == 2
+        assert chunks[0].count('\r\n') == 3  # header + 2 transfers
+        assert chunks[1].count('\r\n') == 1
+
+
+class TestDeltaSync:
+    @pytest.fixture
+    def add_transfers(self, app):
+        from models.database import db
+        from models.user import User
+        from models.transfer import Transfer
+
+        with app.app_context():
+            sender = User(name='Ada', country_code='GB')
+            recipient = User(name='Kofi', country_code='GH')
+            db.session.add_all([sender, recipient])
+            db.session.commit()
+            party_ids = (sender.id, recipient.id)
+
+        def add(count, start=0):
+            with app.app_context():
+                for i in range(start, start + count):
+                    db.session.add(Transfer(
+                        sender_id=party_ids[0], recipient_id=party_ids[1], amount=100.0 + i,
+                        from_currency='GBP', to_currency='GHS', converted_amount=1452.0,
+                        exchange_rate=14.52, fee=2.99, total_amount=102.99 + i,
+                        delivery_time='3-5 business days', tracking_number=f'RMSYNC{i}'
+                    ))
+                db.session.commit()
+        return add
+
+    def test_first_sync_is_full(self, client, add_transfers):
+        add_transfers(3)
+
+        data = client.get('/api/transfers?since=0').get_json()
+
+        assert data['full'] is True
+        assert data['version'] == 3
+        assert [t['tracking_number'] for t in data['transfers']] == ['RMSYNC0', 'RMSYNC1', 'RMSYNC2']
+        assert data['transfers'][0]['sender']['name'] == 'Ada'
+
+    def test_unchanged_poll_costs_one_query(self, client, add_transfers, query_budget):
+        add_transfers(2)
+        version = client.get('/api/transfers?since=0').get_json()['version']
+
+        with query_budget(1):
+            data = client.get(f'/api/transfers?since={version}').get_json()
+
+        assert data == {'transfers': [], 'version': version, 'full': False}
+
+    def test_returns_inserts_and_updates_since_version(self, app, client, add_transfers):
+        from models.database import db
+        from models.transfer import Transfer
+
+        add_transfers(3)
+        version = client.get('/api/transfers?since=0').get_json()['version']
+        with app.app_context():
+            Transfer.query.filter_by(tracking_number='RMSYNC1').one().mark_completed()
+            db.session.commit()
+        add_transfers(1, start=3)
+
+        data = client.get(f'/api/transfers?since={version}&fields=tracking_number,status').get_json()
+
+        assert data['full'] is False
+        assert data['version'] == version + 2
+        assert data['transfers'] == [{'status': 'completed', 'tracking_number': 'RMSYNC1'},
+                                     {'status': 'pending', 'tracking_number': 'RMSYNC3'}]
+
+    def test_version_ahead_of_server_resyncs(self, client, add_transfers):
+        add_transfers(2)
+
+        data = client.get('/api/transfers?since=999').get_json()
+
+        assert data['full'] is True
+        assert len(data['transfers']) == 2
+
+    def test_invalid_since_rejected(self, client):
+        response = client.get('/api/transfers?since=-1')
+
+        assert response.status_code == 400
+        assert 'since' in response.get_json()['error']
+
+
+class TestPrecomputedResponses:
+    @pytest.fixture
+    def rates_snapshot(self):
+        import app as app_module
+        app_module.set_cached_rates(app_module.get_fallback_rates())
+        yield app_module
+        app_module.exchange_rates_cache['data'] = None
+        app_module.exchange_rates_cache['expires_at'] = None
+
+    def test_currencies_etag_and_304(self, client):
+        first = client.get('/api/currencies')
+        etag = first.headers['ETag']
+
+        assert first.status_code == 200
+        assert first.headers['Cache-Control'].startswith('public')
+        assert {c['code'] for c in first.get_json()} >= {'USD', 'KES', 'NGN'}
+
+        second = client.get('/api/currencies', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.data == b''
+        assert second.headers['ETag'] == etag
+
+    def test_large_body_precompressed(self, client, rates_snapshot):
+        import gzip
+
+        response = client.get('/api/exchange-rates', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        payload = json.loads(gzip.decompress(response.data))
+        assert payload['source'] == 'cache'
+        assert payload['rates']['USD']['EUR'] == 0.92
+
+    def test_gzip_variant_has_its_own_etag(self, client, rates_snapshot):
+        gzipped = client.get('/api/exchange-rates', headers={'Accept-Encoding': 'gzip'})
+        plain = client.get('/api/exchange-rates')
+
+        assert gzipped.headers['ETag'] != plain.headers['ETag']
+        assert gzipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gz"'
+        # Either validator revalidates either representation
+        for etag in (gzipped.headers['ETag'], plain.headers['ETag']):
+            assert client.get('/api/exchange-rates', headers={'If-None-Match': etag}).status_code == 304
+            revalidated = client.get('/api/exchange-rates',
+                                     headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+            assert revalidated.status_code == 304
+            assert revalidated.headers['ETag'] == gzipped.headers['ETag']
+
+    def test_rates_etag_follows_snapshot_version(self, client, rates_snapshot):
+        etag = client.get('/api/exchange-rates').headers['ETag']
+        assert client.get('/api/exchange-rates', headers={'If-None-Match': etag}).status_code == 304
+
+        rates = rates_snapshot.get_fallback_rates()
+        rates['USD']['EUR'] = 0.93
+        rates_snapshot.set_cached_rates(rates)
+
+        response = client.get('/api/exchange-rates', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.get_json()['rates']['USD']['EUR'] == 0.93
+
+    def test_countries_precomputed(self):
+        from flask import Flask
+        from routes import routes_bp
+
+        flask_app = Flask(__name__)
+        flask_app.register_blueprint(routes_bp)
+        client = flask_app.test_client()
+
+        first = client.get('/api/countries')
+        second = client.get('/api/countries', headers={'If-None-Match': first.headers['ETag']})
+
+        assert first.get_json()['status'] == 'success'
+        assert second.status_code == 304
+
+
+
+class TestRoutesBlueprintTransfers:
+    @pytest.fixture
+    def routes_client(self):
+        from flask import Flask
+        import routes
+
+        flask_app = Flask(__name__)
+        flask_app.config['TRANSFER_STORE_CAPACITY'] = 3
+        flask_app.register_blueprint(routes.routes_bp)
+        yield flask_app.test_client()
+        routes.transfers.configure(routes.transfers.capacity)
+
+    def create(self, client, name):
+        return client.post('/api/transfers', json={
+            'sender_name': name, 'sender_country': 'US', 'recipient_name': 'B',
+            'recipient_country': 'KE', 'amount': 100, 'from_currency': 'USD', 'to_currency': 'KES'
+        }).get_json()['data']
+
+    def test_newest_first_bounded_and_indexed(self, routes_client):
+        ids = [self.create(routes_client, f'sender{i}')['id'] for i in range(5)]
+
+        listing = routes_client.get('/api/transfers').get_json()
+        assert [t['id'] for t in listing['data']] == ids[:1:-1] and listing['count'] == 3
+        assert [t['id'] for t in routes_client.get('/api/transfers?limit=2').get_json()['data']] == ids[:2:-1]
+        assert routes_client.get('/api/transfers?limit=-1').status_code == 400
+
+        found = routes_client.get(f'/api/transfers/{ids[4]}').get_json()['data']
+        assert found['sender_name'] == 'sender4' and found['status'] == 'pending'
+        # Evicted once the ring wrapped
+        assert routes_client.get(f'/api/transfers/{ids[0]}').status_code == 404
+
+
+class TestBootstrap:
+    @pytest.fixture
+    def rates_snapshot(self):
+        import app as app_module
+        app_module.set_cached_rates(app_module.get_fallback_rates())
+        yield app_module
+        app_module.exchange_rates_cache['data'] = None
+        app_module.exchange_rates_cache['expires_at'] = None
+
+    def test_one_response_has_everything(self, client, rates_snapshot):
+        from app import TransferService
+
+        response = client.get('/api/bootstrap')
+        payload = response.get_json()
+
+        assert response.status_code == 200
+        assert payload['version'] == rates_snapshot.exchange_rates_cache['version']
+        assert payload['rates']['USD']['KES'] == 157.80
+        assert {c['code'] for c in payload['currencies']} >= {'USD', 'NGN'}
+        assert payload['delivery_times']['GB'] == TransferService.get_delivery_time('GB')
+
+        # The schedule is enough to reproduce the server's fee for any amount
+        from services.fee_schedule import FeeSchedule
+        schedule = FeeSchedule(payload['fee_schedule'])
+        for amount in (50, 100, 250, 1000, 5000):
+            assert schedule.quote(amount) == TransferService.calculate_fee(amount)
+
+    def test_snapshot_times_are_utc_with_offset(self, client, rates_snapshot):
+        from datetime import datetime, timezone
+
+        payload = client.get('/api/bootstrap').get_json()
+        expires_at = datetime.fromisoformat(payload['rates_expire_at'])
+
+        assert expires_at.utcoffset().total_seconds() == 0
+        assert payload['rates_timestamp'].endswith('+00:00')
+        assert expires_at == rates_snapshot.exchange_rates_cache['expires_at'].astimezone(timezone.utc)
+
+    def test_compressed_and_revalidated_by_version(self, client, rates_snapshot):
+        first = client.get('/api/bootstrap', headers={'Accept-Encoding': 'gzip'})
+        etag = first.headers['ETag']
+        assert first.headers['Content-Encoding'] == 'gzip'
+        assert client.get('/api/bootstrap', headers={'If-None-Match': etag}).status_code == 304
+
+        rates_snapshot.set_cached_rates(rates_snapshot.get_fallback_rates())
+        assert client.get('/api/bootstrap', headers={'If-None-Match': etag}).status_code == 200
+
+    def test_fee_edit_without_version_bump_refreshes(self, client, rates_snapshot, tmp_path):
+        import os
+        from services.fee_schedule import FEE_SCHEDULES
+
+        path = tmp_path / 'fees.json'
+        schedule = {'version': 'same', 'default': [{'up_to': None, 'flat': 2.99}]}
+        path.write_text(json.dumps(schedule))
+        saved = (FEE_SCHEDULES.path, FEE_SCHEDULES.check_seconds)
+        FEE_SCHEDULES.configure(str(path), check_seconds=0)
+        try:
+            first = client.get('/api/bootstrap')
+
+            path.write_text(json.dumps(dict(schedule, default=[{'up_to': None, 'flat': 5.99}])))
+            os.utime(path, ns=(1, 1))
+            second = client.get('/api/bootstrap', headers={'If-None-Match': first.headers['ETag']})
+            estimate = client.post('/api/estimate', json={'items': [{'amount': 10}]}).get_json()
+        finally:
+            FEE_SCHEDULES.configure(*saved)
+
+        assert second.status_code == 200
+        payload = second.get_json()
+        assert payload['fee_schedule']['default'][0]['flat'] == 5.99
+        assert payload['fee_schedule_version'] != first.get_json()['fee_schedule_version']
+        assert estimate['feeScheduleVersion'] == payload['fee_schedule_version']
+
+    def test_empty_cache_falls_back(self, client, monkeypatch):
+        import requests
+        import app as app_module
+
+        def unavailable(*args, **kwargs):
+            raise requests.exceptions.Timeout()
+        monkeypatch.setattr(requests, 'get', unavailable)
+        app_module.exchange_rates_cache['data'] = None
+        app_module.exchange_rates_cache['expires_at'] = None
+        try:
+            payload = client.get('/api/bootstrap').get_json()
+            assert payload['source'] == 'fallback'
+            assert payload['rates']['USD']['EUR'] == 0.92
+        finally:
+            app_module.exchange_rates_cache['data'] = None
+            app_module.exchange_rates_cache['expires_at'] = None
+
+    def test_rate_stream_resumes_from_last_event_id(self, client, rates_snapshot):
+        previous = client.get('/api/bootstrap').get_json()['rates_id']
+        rates = rates_snapshot.get_fallback_rates()
+        rates['USD']['EUR'] = 0.95
+        rates_snapshot.set_cached_rates(rates)
+
+        response = client.get('/api/rates/stream', headers={'Last-Event-ID': previous})
+        frames = iter(response.response)
+        assert response.mimetype == 'text/event-stream'
+        assert next(frames).startswith(b'retry:')
+        frame = next(frames)
+        response.close()
+
+        from services.rate_stream import snapshot_id
+        delta = json.loads(frame.split(b'data: ')[1])
+        assert frame.startswith(f"id: {snapshot_id(rates)}\nevent: rates\n".encode())
+        assert delta['base_version'] == previous
+        assert delta['changed'] == {'USD': {'EUR': 0.95}}
+
+    def test_rate_stream_capped_when_configured(self, client, rates_snapshot, monkeypatch):
+        from services.rate_stream import RATE_STREAM
+
+        monkeypatch.setattr(RATE_STREAM, 'max_subscribers', 1)
+        monkeypatch.setattr(RATE_STREAM, 'subscribers', 1)
+
+        response = client.get('/api/rates/stream')
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '30'
+
+class TestConversion:
+    @pytest.fixture
+    def rates_snapshot(self, monkeypatch):
+        import app as app_module
+
+        upstream_calls = []
+        def upstream(endpoint, url, **kwargs):
+            upstream_calls.append(url)
+            class Response:
+                status_code = 200
+                def json(self):
+                    return {'success': 'to=XAU' in url, 'result': 0.0005}
+            return Response()
+        monkeypatch.setattr(app_module, 'timed_upstream_get', upstream)
+        app_module.set_cached_rates(app_module.get_fallback_rates())
+        app_module.upstream_calls = upstream_calls
+        yield app_module
+        del app_module.upstream_calls
+        app_module.exchange_rates_cache['data'] = None
+        app_module.exchange_rates_cache['expires_at'] = None
+
+    def convert_both(self, client, source, target):
+        by_rate = client.get(f'/api/convert-rate?from={source}&to={target}&amount=100').get_json()
+        by_convert = client.post('/api/convert', json={
+            'fromCurrency': source, 'toCurrency': target, 'amount': 100}).get_json()
+        return by_rate, by_convert
+
+    def test_endpoints_agree_without_upstream_calls(self, client, rates_snapshot):
+        for source, target, expected in (('USD', 'EUR', 'cache'), ('NGN', 'KES', 'derived')):
+            by_rate, by_convert = self.convert_both(client, source, target)
+            assert by_rate['rate'] == by_convert['exchangeRate']
+            assert by_rate['converted_amount'] == by_convert['convertedAmount']
+            assert by_rate['source'] == by_convert['source'] == expected
+
+        assert self.convert_both(client, 'USD', 'EUR')[1]['exchangeRate'] == 0.92
+        assert self.convert_both(client, 'USD', 'EUR')[1]['path'] == ['USD', 'EUR']
+        assert rates_snapshot.upstream_calls == []
+
+    def test_multi_hop_route_through_the_best_base(self, client, rates_snapshot):
+        rates = rates_snapshot.get_fallback_rates()
+        by_rate = self.convert_both(client, 'KES', 'NGN')[0]
+
+        source, via, target = by_rate['path']
+        assert (source, target) == ('KES', 'NGN') and via in ('USD', 'EUR', 'GBP')
+        assert by_rate['rate'] == round(rates[via]['NGN'] / rates[via]['KES'], 4)
+        assert by_rate['rate'] == max(round(rates[base]['NGN'] / rates[base]['KES'], 4) for base in rates)
+
+    def test_unknown_pair_is_fetched_once_per_snapshot(self, client, rates_snapshot):
+        for _ in range(3):
+            by_rate, by_convert = self.convert_both(client, 'USD', 'XAU')
+        assert by_rate['source'] == by_convert['source'] == 'external_api'
+        assert by_rate['rate'] == 0.0005
+        assert len(rates_snapshot.upstream_calls) == 1
+
+        # Unpriceable pairs are an error, not a 1.0 rate, and the miss is remembered
+        for _ in range(3):
+            response = client.get('/api/convert-rate?from=USD&to=XYZ&amount=100')
+            assert response.status_code == 400
+        assert client.post('/api/convert', json={
+            'fromCurrency': 'USD', 'toCurrency': 'XYZ', 'amount': 100}).status_code == 400
+        assert len(rates_snapshot.upstream_calls) == 2
+
+        rates_snapshot.set_cached_rates(rates_snapshot.get_fallback_rates())
+        self.convert_both(client, 'USD', 'XAU')
+        assert len(rates_snapshot.upstream_calls) == 3
+
+@pytest.mark.usefixtures('fallback_rates')
+class TestLockedQuotes:
+    TRANSFER_REQUEST = {
+        'sender': {'name': 'A', 'country': 'US'},
+        'recipient': {'name': 'B', 'country': 'KE'},
+        'amount': 100, 'fromCurrency': 'USD', 'toCurrency': 'KES',
+        'convertedAmount': 99999.0, 'exchangeRate': 999.99,
+    }
+
+    def lock(self, client, source='USD', target='KES'):
+        return client.post('/api/convert', json={
+            'fromCurrency': source, 'toCurrency': target, 'amount': 100, 'lock': True}).get_json()
+
+    def test_transfer_honors_the_locked_rate(self, client, fallback_rates):
+        quote = self.lock(client)
+        assert quote['quoteExpiresAt'].endswith('Z')
+        rates = fallback_rates.get_fallback_rates()
+        for quotes in rates.values():
+            if 'KES' in quotes:
+                quotes['KES'] *= 0.95
+        fallback_rates.set_cached_rates(rates)
+
+        transfer = client.post('/api/transfer', json=dict(self.TRANSFER_REQUEST, quoteId=quote['quoteId']))
+        assert transfer.status_code == 201
+        assert round(transfer.get_json()['exchange_rate'], 4) == quote['exchangeRate']
+        assert transfer.get_json()['converted_amount'] == quote['convertedAmount']
+
+        # Without a quote the current snapshot is used, never the client's numbers
+        current = client.get('/api/convert-rate?from=USD&to=KES&amount=100').get_json()
+        unquoted = client.post('/api/transfer', json=self.TRANSFER_REQUEST).get_json()
+        assert round(unquoted['exchange_rate'], 4) == current['rate'] < quote['exchangeRate']
+        assert unquoted['converted_amount'] == current['converted_amount']
+
+    def test_get_never_issues_quotes(self, app, client, fallback_rates):
+        from models.rate_quote import RateQuote
+
+        response = client.get('/api/convert-rate?from=USD&to=KES&amount=100&lock=1').get_json()
+
+        assert 'quote_id' not in response
+        with app.app_context():
+            assert RateQuote.query.count() == 0
+
+    def test_quote_is_single_use(self, client):
+        quote_id = self.lock(client)['quoteId']
+        request = dict(self.TRANSFER_REQUEST, quoteId=quote_id)
+
+        assert client.post('/api/transfer', json=request).status_code == 201
+        response = client.post('/api/transfer', json=request)
+        assert response.status_code == 409
+        assert 'already used' in response.get_json()['error']
+
+    def test_rejects_forged_mismatched_and_expired_quotes(self, client, monkeypatch):
+        from services.rate_quotes import QUOTES
+
+        quote_id = self.lock(client)['quoteId']
+        forged = quote_id[:-1] + ('A' if quote_id[-1] != 'A' else 'B')
+        assert client.post('/api/transfer', json=dict(self.TRANSFER_REQUEST, quoteId=forged)).status_code == 400
+
+        # A pair mismatch rolls back, so the quote is still redeemable
+        mismatched = dict(self.TRANSFER_REQUEST, toCurrency='NGN', quoteId=quote_id)
+        assert client.post('/api/transfer', json=mismatched).status_code == 400
+        assert client.post('/api/transfer', json=dict(self.TRANSFER_REQUEST, quoteId=quote_id)).status_code == 201
+
+        monkeypatch.setattr(QUOTES, 'ttl', 0)
+        expired = self.lock(client)['quoteId']
+        response = client.post('/api/transfer', json=dict(self.TRANSFER_REQUEST, quoteId=expired))
+        assert response.status_code == 409
+
+    def test_quote_from_another_worker_is_redeemed_from_the_database(self, client):
+        from services.rate_quotes import QUOTES
+
+        quote_id = self.lock(client)['quoteId']
+        assert QUOTES.take(quote_id.partition('.')[0]) is not None  # as if issued elsewhere
+
+        request = dict(self.TRANSFER_REQUEST, quoteId=quote_id)
+        assert client.post('/api/transfer', json=request).status_code == 201
+        assert client.post('/api/transfer', json=request).status_code == 409
+
+class TestAdaptiveRateRefresh:
+    @pytest.fixture
+    def provider(self, monkeypatch):
+        import app as app_module
+
+        calls = []
+        def upstream(endpoint, url, **kwargs):
+            calls.append(url)
+            base = url.split('base=')[1].split('&')[0]
+            rates = {'USD': {'USD': 1, 'EUR': 0.9, 'GBP': 0.8, 'NGN': 800.0, 'XOF': 590.0}}
+            if base != 'USD':
+                rates[base] = {quote: round(rate / rates['USD'][base], 6) for quote, rate in rates['USD'].items()}
+            quotes = rates[base]
+            if 'symbols=' in url:
+                wanted = url.split('symbols=')[1].split(',')
+                quotes = {quote: 801.0 for quote in wanted}
+            class Response:
+                status_code = 200
+                def json(self):
+                    return {'success': True, 'rates': quotes}
+            return Response()
+        monkeypatch.setattr(app_module, 'timed_upstream_get', upstream)
+        app_module.exchange_rates_cache['data'] = None
+        app_module.exchange_rates_cache['expires_at'] = None
+        yield app_module, calls
+        app_module.wait_for_rate_refresh()
+        app_module.exchange_rates_cache['data'] = None
+        app_module.exchange_rates_cache['expires_at'] = None
+
+    def test_only_due_currencies_are_refreshed(self, client, provider):
+        from datetime import datetime, timedelta
+        app_module, calls = provider
+
+        assert client.get('/api/exchange-rates').get_json()['source'] == 'external_api'
+        assert len(calls) == 3
+        cache = app_module.exchange_rates_cache
+        xof_due = cache['due']['XOF']
+        assert xof_due > datetime.now()
+
+        past = datetime.now() - timedelta(seconds=1)
+        cache['due']['NGN'] = cache['expires_at'] = past
+        stale = client.get('/api/exchange-rates').get_json()
+        assert stale['source'] == 'cache' and stale['rates']['USD']['NGN'] == 800.0
+        app_module.wait_for_rate_refresh()
+        payload = client.get('/api/exchange-rates').get_json()
+
+        # One call for NGN against USD; the EUR and GBP rows are crosses
+        assert calls[3:] == ['https://api.exchangerate.host/latest?base=USD&symbols=NGN']
+        assert payload['rates']['USD']['NGN'] == 801.0
+        assert payload['rates']['EUR']['NGN'] == round(801.0 / 0.9, 6)
+        assert payload['rates']['USD']['XOF'] == 590.0
+        assert cache['due']['XOF'] == xof_due
+        assert cache['due']['NGN'] > datetime.now()
+        assert client.get('/api/exchange-rates').get_json()['source'] == 'cache'
+        assert len(calls) == 4
+
+    def test_stale_rates_are_served_during_one_refresh(self, client, provider, monkeypatch):
+        import threading
+        from datetime import datetime, timedelta
+        app_module, calls = provider
+
+        client.get('/api/exchange-rates')
+        upstream, release = app_module.timed_upstream_get, threading.Event()
+        def slow_upstream(endpoint, url, **kwargs):
+            release.wait(5)
+            return upstream(endpoint, url, **kwargs)
+        monkeypatch.setattr(app_module, 'timed_upstream_get', slow_upstream)
+        cache = app_module.exchange_rates_cache
+        cache['due']['NGN'] = cache['expires_at'] = datetime.now() - timedelta(seconds=1)
+
+        # The provider hangs, yet every request is answered from the stale table
+        for _ in range(5):
+            payload = client.get('/api/exchange-rates').get_json()
+            assert payload['source'] == 'cache' and payload['rates']['USD']['NGN'] == 800.0
+        release.set()
+        app_module.wait_for_rate_refresh()
+
+        assert len(calls) == 4
+        assert client.get('/api/exchange-rates').get_json()['rates']['USD']['NGN'] == 801.0
+
+    def test_cold_cache_is_fetched_once(self, provider):
+        import threading
+        app_module, calls = provider
+
+        threads = [threading.Thread(target=app_module.ensure_rate_snapshot) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 3
+        assert app_module.exchange_rates_cache['data']['USD']['NGN'] == 800.0
+
+class TestRateHistoryEndpoint:
+    START = 1_700_006_400
+
+    @pytest.fixture
+    def history(self, app):
+        from services.rate_history import rate_history
+
+        store = rate_history(app)
+        for day in range(3):
+            for hour in range(24):
+                store.append({'USD': {'EUR': 0.9 + hour / 1000}}, ts=self.START + day * 86400 + hour * 3600)
+        return store
+
+    def test_daily_bars(self, client, history):
+        response = client.get(f'/api/rates/history?from=usd&to=EUR&start={self.START}'
+                              f'&end=2023-11-18T00:00:00&resolution=day')
+        payload = response.get_json()
+
+        assert response.status_code == 200
+        assert payload['resolution'] == 'day'
+        assert payload['t'] == [self.START, self.START + 86400, self.START + 2 * 86400]
+        assert payload['o'][0] == 0.9 and payload['h'][0] == 0.923 and payload['c'][0] == 0.923
+
+    def test_rejects_bad_queries(self, client, history):
+        assert client.get(f'/api/rates/history?start={self.START}&resolution=week').status_code == 400
+        assert client.get('/api/rates/history?start=yesterday').status_code == 400
+        assert client.get('/api/rates/history?from=USD&to=XYZ').status_code == 404
+
+class TestMetricsEndpoint:
+    def test_request_metrics_exposed(self, client):
+        from services.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+
+        before = REQUEST_LATENCY.count('GET', '/api/currencies')
+        client.get('/api/currencies')
+        client.get('/api/transfers')
+
+        response = client.get('/api/metrics')
+        body = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert REQUEST_LATENCY.count('GET', '/api/currencies') == before + 1
+        assert 'remitlite_http_request_duration_seconds_bucket{method="GET",route="/api/currencies",le="+Inf"}' in body
+        assert 'remitlite_http_requests_total{method="GET",route="/api/transfers",status="200"}' in body
+        assert 'remitlite_db_queries_total{statement="SELECT"}' in body
+        assert REQUESTS_IN_FLIGHT.value('/api/transfers') == 0
+
+    def test_rate_cache_metrics(self, client):
+        import app as app_module
+        from services.metrics import RATE_CACHE_LOOKUPS
+
+        app_module.set_cached_rates(app_module.get_fallback_rates())
+        try:
+            hits = RATE_CACHE_LOOKUPS.value('convert-rate', 'hit')
+            client.get('/api/convert-rate?from=USD&to=KES&amount=10')
+            body = client.get('/api/metrics').get_data(as_text=True)
+        finally:
+            app_module.exchange_rates_cache['data'] = None
+            app_module.exchange_rates_cache['expires_at'] = None
+
+        assert RATE_CACHE_LOOKUPS.value('convert-rate', 'hit') == hits + 1
+        assert 'remitlite_rate_cache_age_seconds ' in body
+
+    def test_histogram_buckets_are_cumulative(self):
+        from services.metrics import Histogram
+
+        histogram = Histogram('test_latency_seconds', 'test', ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, '/x')
+
+        lines = histogram.render()
+
+        assert 'test_latency_seconds_bucket{route="/x",le="0.1"} 1' in lines
+        assert 'test_latency_seconds_bucket{route="/x",le="1.0"} 2' in lines
+        assert 'test_latency_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+        assert 'test_latency_seconds_count{route="/x"} 3' in lines
+
+
+@pytest.mark.usefixtures('fallback_rates')
+class TestQueryProfiler:
+    TRANSFER_REQUEST = {
+        'sender': {'name': 'Ada', 'country': 'GB', 'email': 'ada@example.com'},
+        'recipient': {'name': 'Kofi', 'country': 'GH', 'email': 'kofi@example.com'},
+        'amount': 100, 'fromCurrency': 'GBP', 'toCurrency': 'GHS',
+        'convertedAmount': 1452.0, 'exchangeRate': 14.52,
+    }
+
+    def test_listing_query_budget(self, client, query_budget):
+        for i in range(5):
+            request = dict(self.TRANSFER_REQUEST)
+            request['sender'] = dict(request['sender'], email=f'sender{i}@example.com')
+            assert client.post('/api/transfer', json=request).status_code == 201
+
+        with query_budget(1):
+            data = client.get('/api/transfers').get_json()
+        assert len(data) == 5
+
+    def test_ids_and_tracking_numbers_sort_by_creation(self, client):
+        created = []
+        for i in range(3):
+            request = dict(self.TRANSFER_REQUEST)
+            request['sender'] = dict(request['sender'], email=f'order{i}@example.com')
+            created.append(client.post('/api/transfer', json=request).get_json())
+
+        assert [t['id'] for t in created] == sorted(t['id'] for t in created)
+        tracking = [t['tracking_number'] for t in created]
+        assert tracking == sorted(tracking) and all(len(t) == 15 and t.startswith('RM') for t in tracking)
+
+    def test_create_transfer_query_budget(self, client, query_budget):
+        # sender + recipient lookups and inserts, the sync counter bump, the transfer
+        with query_budget(6):
+            response = client.post('/api/transfer', json=self.TRANSFER_REQUEST)
+        assert response.status_code == 201
+
+    def test_redeeming_a_quote_costs_one_update(self, client, query_budget):
+        quote_id = client.post('/api/convert', json={
+            'fromCurrency': 'GBP', 'toCurrency': 'GHS', 'amount': 100, 'lock': True}).get_json()['quoteId']
+        with query_budget(7):
+            response = client.post('/api/transfer', json=dict(self.TRANSFER_REQUEST, quoteId=quote_id))
+        assert response.status_code == 201
+
+    def test_lazy_loading_flagged_as_n_plus_one(self, app, client):
+        from models.database import db
+        from models.transfer import Transfer
+        from services.query_profiler import capture_queries
+
+        for i in range(4):
+            request = dict(self.TRANSFER_REQUEST)
+            request['sender'] = dict(request['sender'], email=f'lazy{i}@example.com')
+            client.post('/api/transfer', json=request)
+
+        with app.app_context():
+            with capture_queries(db.engine) as profile:
+                [t.sender.name for t in Transfer.query.all()]
+
+        assert len(profile.repeated()) == 1
+        with pytest.raises(AssertionError):
+            with app.app_context():
+                from services.query_profiler import query_budget
+                with query_budget(db.engine, 10):
+                    [t.sender.name for t in Transfer.query.all()]
+
+    def test_failed_statements_leave_no_state_on_the_connection(self, app):
+        from sqlalchemy.exc import OperationalError
+        from models.database import db
+        from services.query_profiler import capture_queries
+
+        with app.app_context():
+            with db.engine.connect() as connection, capture_queries(db.engine) as profile:
+                for _ in range(3):
+                    with pytest.raises(OperationalError):
+                        connection.exec_driver_sql('SELECT * FROM no_such_table')
+                connection.exec_driver_sql('SELECT 1')
+
+                assert not connection.info.get('query_profiler_started')
+                assert connection.connection.info.get('query_profiler_started') is None
+        assert profile.count == 1
+
+    def test_profiler_headers_when_enabled(self):
+        from app import create_app
+        from models.database import db
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RATE_HISTORY_DIR': '', 'SQL_PROFILER': True})
+        with app.app_context():
+            db.create_all()
+
+        response = app.test_client().get('/api/transfers')
+
+        assert response.headers['X-Query-Count'] == '1'
+        assert float(response.headers['X-Query-Time-Ms']) >= 0
+        assert 'X-Query-Repeated' not in response.headers
+
+    def test_profiler_off_by_default(self, client):
+        assert 'X-Query-Count' not in client.get('/api/transfers').headers
+
+
+class TestRequestProfiler:
+    def make_app(self, tmp_path, **config):
+        from app import create_app
+        from models.database import db
+
+        settings = {'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RATE_HISTORY_DIR': '',
+                    'PROFILER_DIR': str(tmp_path), 'PROFILER_INTERVAL_MS': 1}
+        settings.update(config)
+        app = create_app(settings)
+        with app.app_context():
+            db.create_all()
+        return app
+
+    def test_admin_header_writes_profile(self, tmp_path):
+        app = self.make_app(tmp_path, PROFILER_ADMIN_TOKEN='s3cret')
+        client = app.test_client()
+
+        response = client.get('/api/transfers', headers={'X-Profile': 's3cret'})
+
+        assert response.status_code == 200
+        assert (tmp_path / response.headers['X-Profile-File']).exists()
+        assert response.headers['X-Profile-File'].startswith('api_transfers')
+
+    def test_wrong_token_not_profiled(self, tmp_path):
+        app = self.make_app(tmp_path, PROFILER_ADMIN_TOKEN='s3cret')
+
+        response = app.test_client().get('/api/transfers', headers={'X-Profile': 'guess'})
+
+        assert 'X-Profile-File' not in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+    def test_sampling_and_retention(self, tmp_path):
+        app = self.make_app(tmp_path, PROFILER_SAMPLE_RATE=1, PROFILER_MAX_FILES_PER_ROUTE=2)
+        client = app.test_client()
+
+        for _ in range(4):
+            assert 'X-Profile-File' in client.get('/api/currencies').headers
+
+        assert len(list((tmp_path / 'api_currencies').iterdir())) == 2
+
+    def test_disabled_by_default(self, client):
+        assert 'X-Profile-File' not in client.get('/api/currencies', headers={'X-Profile': ''}).headers
+
+    def test_not_installed_under_gevent(self, tmp_path, monkeypatch):
+        import sys
+        import types
+
+        # What gunicorn's gevent worker leaves behind: threading patched to greenlets
+        patched = types.SimpleNamespace(is_module_patched=lambda name: name == 'threading')
+        monkeypatch.setitem(sys.modules, 'gevent.monkey', patched)
+        app = self.make_app(tmp_path, PROFILER_ADMIN_TOKEN='s3cret')
+
+        response = app.test_client().get('/api/transfers', headers={'X-Profile': 's3cret'})
+
+        assert response.status_code == 200
+        assert 'X-Profile-File' not in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+    def test_sampler_collapses_stacks(self):
+        import threading
+        import time
+        from services.request_profiler import StackSampler
+
+        def busy_wait():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        sampler = StackSampler(threading.get_ident(), 0.001).start()
+        busy_wait()
+        sampler.stop()
+
+        assert sampler.samples > 0
+        stack, count = sampler.collapsed().splitlines()[0].rsplit(' ', 1)
+        assert 'busy_wait (test_routes.py:' in stack
+        assert int(count) > 0
@@ -1,6 +1,11 @@
 import pytest
+import json
+import math
+import random
 import sys
 import os
+from datetime import datetime
+from decimal import Decimal
 
 # Add the backend directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -112,4 +117,874 @@ class TestExchangeRateAPI:
         
         for error_response in error_responses:
             assert error_response['success'] == False
-            assert 'error' in error_response
\ No newline at end of file
+            assert 'error' in error_response
+
+class TestJSONProvider:
+    """Fast JSON provider: native datetime/Decimal handling, same output for every backend"""
+
+    PAYLOAD = {
+        'created_at': datetime(2024, 5, 1, 12, 30, 15, 250000),
+        'fee': Decimal('4.99'),
+        'nested': [{'amount': 10.5, 'currency': '€'}],
+    }
+
+    def test_providers_agree(self):
+        from flask import Flask
+        from services.json_provider import JSON_PROVIDERS, orjson
+
+        app = Flask(__name__)
+        names = [name for name in JSON_PROVIDERS if name != 'orjson' or orjson]
+        decoded = [json.loads(JSON_PROVIDERS[name](app).dumps(self.PAYLOAD)) for name in names]
+
+        for result in decoded:
+            assert result == {
+                'created_at': '2024-05-01T12:30:15.250000',
+                'fee': 4.99,
+                'nested': [{'amount': 10.5, 'currency': '€'}],
+            }
+
+    def test_unknown_provider_rejected(self):
+        from services.json_provider import get_json_provider_class
+
+        with pytest.raises(ValueError):
+            get_json_provider_class('simplejson')
+
+    def test_transfer_datetimes_serialized_as_iso(self, app, client):
+        from models.database import db
+        from models.user import User
+        from models.transfer import Transfer
+
+        with app.app_context():
+            sender = User(name='Ada', country_code='GB')
+            recipient = User(name='Kofi', country_code='GH')
+            db.session.add_all([sender, recipient])
+            db.session.flush()
+            db.session.add(Transfer(
+                sender_id=sender.id, recipient_id=recipient.id, amount=100.0,
+                from_currency='GBP', to_currency='GHS', converted_amount=1452.0,
+                exchange_rate=14.52, fee=2.99, total_amount=102.99,
+                delivery_time='3-5 business days', created_at=datetime(2024, 5, 1, 9, 0)
+            ))
+            db.session.commit()
+
+        data = client.get('/api/transfers').get_json()
+
+        assert data[0]['created_at'] == '2024-05-01T09:00:00'
+        assert data[0]['completed_at'] is None
+        assert data[0]['sender']['name'] == 'Ada'
+
+
+class TestBenchmarkComparison:
+    def test_regressions_flagged_by_direction(self):
+        from benchmarks.common import compare
+
+        baseline = {'micro': {'fee_ns': 100.0}, 'load': {'rates': {'p95_ms': 2.0, 'rps': 1000.0, 'errors': 0}}}
+        current = {'micro': {'fee_ns': 105.0}, 'load': {'rates': {'p95_ms': 3.0, 'rps': 800.0, 'errors': 2}}}
+
+        rows = {row['metric']: row for row in compare(current, baseline, threshold=0.10)}
+
+        assert not rows['micro.fee_ns']['regression']
+        assert rows['load.rates.p95_ms']['regression']
+        assert rows['load.rates.rps']['regression']
+        assert rows['load.rates.errors']['regression']
+
+    def test_micro_suite_runs(self):
+        from benchmarks import micro
+
+        results = micro.run()
+
+        assert results['calculate_fee_ns'] > 0
+        assert results['rate_cache']['hit_ns'] > 0
+
+
+class TestBulkSeeder:
+    def test_rows_are_deterministic_per_chunk(self):
+        import seed
+
+        now = datetime(2025, 1, 1)
+        first = seed.generate_transfer_rows(7, 3, 300, 400, 1000, now, 30)
+        second = seed.generate_transfer_rows(7, 3, 300, 400, 1000, now, 30)
+
+        assert first == second
+        assert len({row['tracking_number'] for row in first}) == 100
+
+    def test_senders_match_corridor_country(self):
+        import seed
+
+        rng = random.Random(1)
+        for country in seed.SLOTS_BY_COUNTRY:
+            index = seed.random_user_index(rng, country, 1000)
+            assert seed.SEED_COUNTRY_SLOTS[index % seed.SLOT_COUNT] == country
+
+    def test_bulk_seed_inserts_in_chunks(self, tmp_path):
+        import seed
+        from app import create_app
+        from models.database import db
+        from models.transfer import Transfer
+
+        uri = f"sqlite:///{tmp_path / 'seed.db'}"
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'RATE_HISTORY_DIR': ''})
+        with app.app_context():
+            db.create_all()
+
+        report = seed.bulk_seed(uri, users=120, transfers=500, chunk_size=64, seed=3)
+
+        assert report['users']['rows'] == 120
+        assert report['transfers']['rows_per_second'] > 0
+        with app.app_context():
+            assert Transfer.query.count() == 500
+
+class TestCompactStorage:
+    def test_ids_round_trip_through_16_bytes(self):
+        from models.types import CompactId
+        from services.id_generator import IdGenerator
+
+        column = CompactId()
+        snowflakes = [IdGenerator(worker_id=3).next_id() for _ in range(3)]
+        for value in ['6f1c2d8e-3b4a-4c5d-9e6f-7a8b9c0d1e2f'] + snowflakes:
+            stored = column.process_bind_param(value, None)
+            assert len(stored) == 16
+            assert column.process_result_value(stored, None) == value
+        stored = [column.process_bind_param(value, None) for value in snowflakes]
+        assert stored == sorted(stored)
+        with pytest.raises(ValueError):
+            column.process_bind_param('bench-user-1', None)
+
+    def test_amounts_use_the_currency_exponent(self, app):
+        from models.database import db
+        from models.transfer import Transfer
+        from models.user import User
+
+        transfer = Transfer(amount=1234.5, fee=4.99, total_amount=1239.49, converted_amount=180000.4,
+                            from_currency='USD', to_currency='JPY', exchange_rate=145.8)
+        assert (transfer.amount_minor, transfer.fee_minor, transfer.converted_amount_minor) == (123450, 499, 180000)
+        assert (transfer.amount, transfer.converted_amount) == (1234.5, 180000.0)
+        assert Transfer.storage_row({'amount': 0.1, 'from_currency': 'KWD', 'fee': None}) == {
+            'amount_minor': 100, 'from_currency': 'KWD', 'fee_minor': None}
+
+        # SQL sees major units too; exact sums go over the minor column
+        with app.app_context():
+            sender = User(name='A')
+            db.session.add(sender)
+            db.session.flush()
+            for currency, amount in (('USD', 0.1), ('USD', 0.2), ('JPY', 500.0)):
+                db.session.add(Transfer(sender_id=sender.id, recipient_id=sender.id, amount=amount,
+                                        from_currency=currency, to_currency='KES', converted_amount=1.0,
+                                        exchange_rate=1.0, total_amount=amount, delivery_time='x'))
+            db.session.flush()
+            assert sorted(db.session.scalars(db.select(Transfer.amount))) == [0.1, 0.2, 500.0]
+            assert db.session.scalar(db.select(db.func.sum(Transfer.amount_minor))
+                                     .where(Transfer.from_currency == 'USD')) == 30
+
+
+class TestStorageMigration:
+    @pytest.fixture
+    def legacy_db(self, tmp_path):
+        from sqlalchemy import Column, DateTime, Float, ForeignKey, MetaData, String, Table, create_engine
+        from models.database import get_database_settings, install_sqlite_pragmas
+
+        uri = f"sqlite:///{tmp_path / 'legacy.db'}"
+        engine = create_engine(uri)
+        install_sqlite_pragmas(engine, get_database_settings({'SQLALCHEMY_DATABASE_URI': uri}))
+        metadata = MetaData()
+        users = Table('users', metadata,
+                      Column('id', String(36), primary_key=True), Column('name', String(100), nullable=False),
+                      Column('email', String(120), unique=True), Column('password_hash', String(255)),
+                      Column('country_code', String(2)), Column('phone', String(20)),
+                      Column('created_at', DateTime), Column('last_login', DateTime))
+        transfers = Table('transfers', metadata,
+                          Column('id', String(36), primary_key=True),
+                          Column('sender_id', String(36), ForeignKey('users.id'), nullable=False),
+                          Column('recipient_id', String(36), ForeignKey('users.id'), nullable=False),
+                          Column('amount', Float, nullable=False), Column('from_currency', String(3), nullable=False),
+                          Column('to_currency', String(3), nullable=False),
+                          Column('converted_amount', Float, nullable=False),
+                          Column('exchange_rate', Float, nullable=False), Column('fee', Float),
+                          Column('total_amount', Float, nullable=False),
+                          Column('delivery_time', String(50), nullable=False), Column('status', String(20)),
+                          Column('tracking_number', String(20), unique=True),
+                          Column('created_at', DateTime), Column('completed_at', DateTime))
+        metadata.create_all(engine)
+        yield engine, users, transfers, uri
+        engine.dispose()
+
+    def transfer_row(self, i, sender, recipient, created_at, currency='KES'):
+        return {'id': f'{i:08x}-0000-4000-8000-000000000000', 'sender_id': sender, 'recipient_id': recipient,
+                'amount': 100.25 + i, 'from_currency': 'USD', 'to_currency': currency,
+                'converted_amount': 15819.45 if currency == 'KES' else 15037.0, 'exchange_rate': 157.8,
+                'fee': 4.99, 'total_amount': 105.24 + i, 'delivery_time': '1-2 hours', 'status': 'completed',
+                'tracking_number': f'RMLEGACY{i:04d}', 'created_at': created_at, 'completed_at': None}
+
+    def test_copy_resume_catch_up_and_swap(self, legacy_db):
+        from app import create_app
+        from models.database import db
+        from models.transfer import Transfer
+        from models.user import User
+        from sqlalchemy import inspect
+        from services.storage_migration import (StorageMigration, StorageMigrationError, add_version_column,
+                                                drop_legacy, storage_format)
+
+        engine, users, transfers, uri = legacy_db
+        with engine.begin() as connection:
+            # init-db ran on it before the migration, so ix_transfers_version is taken
+            assert add_version_column(connection)
+        old = datetime(2024, 1, 1)
+        ids = [f'{i:08x}-1111-4111-8111-111111111111' for i in (10, 20, 30)]
+        with engine.begin() as connection:
+            connection.execute(users.insert(), [{'id': user_id, 'name': f'User {n}', 'email': f'u{n}@example.com',
+                                                 'created_at': old} for n, user_id in enumerate(ids)])
+            connection.execute(transfers.insert(), [
+                self.transfer_row(i, ids[i % 2], ids[2], old, 'JPY' if i == 3 else 'KES') for i in range(1, 6)])
+
+        migration = StorageMigration(engine, chunk_size=2, log=lambda message: None)
+        assert migration.copy() == {'users': 3, 'transfers': 5}
+        assert migration.copy() == {'users': 0, 'transfers': 0}
+        with engine.connect() as connection:
+            indexed = {index['name'] for name in ('users', 'transfers')
+                       for index in inspect(connection).get_indexes(name)}
+        assert {'ix_users__catch_up_last_login', 'ix_transfers__catch_up_created_at'} <= indexed
+
+        # Meanwhile the old app signs up a user behind the cursor, who sends
+        # a transfer behind the cursor, and somebody logs in
+        late_user = '00000001-1111-4111-8111-111111111111'
+        with engine.begin() as connection:
+            connection.execute(users.insert().values(id=late_user, name='Late', created_at=datetime.utcnow()))
+            connection.execute(transfers.insert().values(
+                self.transfer_row(0, late_user, ids[0], datetime.utcnow())))
+            login = datetime.utcnow().replace(microsecond=0)
+            connection.execute(users.update().where(users.c.id == ids[1]).values(last_login=login))
+
+        assert migration.swap() == {'late_transfers': 1, 'users_synced': 1}
+        with engine.connect() as connection:
+            assert storage_format(connection) == 'compact'
+            inspector = inspect(connection)
+            assert ({index['name'] for index in inspector.get_indexes('transfers')}
+                    == {index.name for index in Transfer.__table__.indexes})
+            assert ({index['name'] for index in inspector.get_indexes('transfers__legacy')}
+                    == {'ix_transfers__legacy_version', 'ix_transfers__catch_up_created_at'})
+        with pytest.raises(StorageMigrationError):
+            StorageMigration(engine).copy()
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'RATE_HISTORY_DIR': '', 'ID_WORKER_ID': 1})
+        with app.app_context():
+            migrated = {t.id: t.to_dict() for t in Transfer.query.all()}
+            assert len(migrated) == 6
+            jpy = migrated['00000003-0000-4000-8000-000000000000']
+            assert (jpy['amount'], jpy['fee'], jpy['converted_amount']) == (103.25, 4.99, 15037.0)
+            assert migrated['00000000-0000-4000-8000-000000000000']['sender']['name'] == 'Late'
+            assert db.session.get(User, ids[1]).last_login == login
+            total = db.session.query(db.func.sum(Transfer.amount_minor)).scalar()
+            assert total == sum(10025 + 100 * i for i in range(6))
+        assert drop_legacy(engine) == ['transfers__legacy', 'users__legacy']
+
+
+    def test_release_step_migrates_before_init_db(self, legacy_db):
+        from app import create_app
+
+        engine, users, transfers, uri = legacy_db
+        user_id = '00000001-1111-4111-8111-111111111111'
+        with engine.begin() as connection:
+            connection.execute(users.insert().values(id=user_id, name='Ada', created_at=datetime(2024, 1, 1)))
+            connection.execute(transfers.insert().values(self.transfer_row(1, user_id, user_id, datetime(2024, 1, 1))))
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'RATE_HISTORY_DIR': '', 'ID_WORKER_ID': 1})
+        runner = app.test_cli_runner()
+
+        refused = runner.invoke(args=['init-db'])
+        assert refused.exit_code != 0
+        assert 'migrate-storage --swap' in refused.output
+
+        assert runner.invoke(args=['migrate-storage', '--swap', '--if-legacy']).exit_code == 0
+        again = runner.invoke(args=['migrate-storage', '--swap', '--if-legacy'])
+        assert again.exit_code == 0
+        assert 'nothing to migrate' in again.output
+        assert runner.invoke(args=['init-db']).exit_code == 0
+        with app.test_client() as client:
+            assert client.get('/api/transfers').get_json()[0]['amount'] == 101.25
+
+
+class TestSyncVersions:
+    def test_reserve_versions_hands_out_blocks(self, app):
+        from models.database import db
+        from models.sync_counter import current_version, reserve_versions
+
+        with app.app_context():
+            connection = db.session.connection()
+            assert current_version(connection, 'transfers') == 0
+            assert reserve_versions(connection, 'transfers', 3) == 3
+            assert reserve_versions(connection, 'transfers') == 4
+            assert reserve_versions(connection, 'users', 2) == 2  # no row yet
+            assert current_version(connection, 'transfers') == 4
+
+    def test_version_column_added_to_old_table(self, tmp_path):
+        from sqlalchemy import Column, MetaData, String, Table, create_engine, inspect
+        from services.storage_migration import add_version_column
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        metadata = MetaData()
+        Table('transfers', metadata, Column('id', String(36), primary_key=True))
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO transfers (id) VALUES ('a')")
+            assert add_version_column(connection) is True
+            assert add_version_column(connection) is False
+            assert connection.exec_driver_sql('SELECT version FROM transfers').scalar() == 0
+            assert 'ix_transfers_version' in {index['name'] for index in inspect(connection).get_indexes('transfers')}
+
+
+class TestStructuredLogging:
+    def test_formatter_emits_json_line_with_extras(self):
+        import logging
+        from services.structured_logging import JsonFormatter
+
+        record = logging.LogRecord('remitlite.api', logging.WARNING, __file__, 1,
+                                   'Timeout fetching %s', ('rates',), None)
+        record.request_id = 'abc123'
+        record.base = 'USD'
+
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry['msg'] == 'Timeout fetching rates'
+        assert entry['level'] == 'WARNING'
+        assert entry['request_id'] == 'abc123'
+        assert entry['base'] == 'USD'
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        import logging
+        import queue
+        from services.structured_logging import NonBlockingQueueHandler
+
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        for i in range(5):
+            handler.handle(logging.LogRecord('remitlite', logging.INFO, __file__, 1, 'm%d', (i,), None))
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_sampling_only_thins_configured_levels(self):
+        import logging
+        from services.structured_logging import SamplingFilter
+
+        sampler = SamplingFilter({logging.DEBUG: 0.0})
+        debug = logging.LogRecord('remitlite', logging.DEBUG, __file__, 1, 'noisy', (), None)
+        warning = logging.LogRecord('remitlite', logging.WARNING, __file__, 1, 'kept', (), None)
+        assert not sampler.filter(debug)
+        assert sampler.filter(warning)
+
+    def test_request_id_echoed(self, client):
+        response = client.get('/api/health', headers={'X-Request-ID': 'req-42'})
+        assert response.headers['X-Request-ID'] == 'req-42'
+        assert len(client.get('/api/health').headers['X-Request-ID']) == 32
+
+class TestRateStream:
+    def test_delta_holds_only_changed_pairs(self):
+        from services.rate_stream import diff_rates
+
+        changed, removed = diff_rates(
+            {'USD': {'EUR': 0.92, 'KES': 157.8, 'XOF': 605.8}},
+            {'USD': {'EUR': 0.93, 'KES': 157.8}, 'GBP': {'USD': 1.27}},
+        )
+        assert changed == {'USD': {'EUR': 0.93}, 'GBP': {'USD': 1.27}}
+        assert removed == [['USD', 'XOF']]
+
+    def test_one_frame_fanned_out_to_every_subscriber(self):
+        from services.rate_stream import RateBroadcaster, snapshot_id
+
+        stream = RateBroadcaster(heartbeat=0.01)
+        stream.publish({'USD': {'EUR': 0.92}})
+        subscribers = [stream.subscribe(last_version=stream.version) for _ in range(3)]
+        for subscriber in subscribers:
+            next(subscriber)  # retry hint
+
+        stream.publish({'USD': {'EUR': 0.93}})
+        frames = [next(subscriber) for subscriber in subscribers]
+
+        assert all(frame is frames[0] for frame in frames)
+        assert frames[0].startswith(f"id: {snapshot_id({'USD': {'EUR': 0.93}})}\nevent: rates\n".encode())
+        assert stream.subscribers == 3
+        for subscriber in subscribers:
+            subscriber.close()
+        assert stream.subscribers == 0
+
+    def test_resume_replays_deltas_or_sends_snapshot(self):
+        from services.rate_stream import RateBroadcaster
+
+        stream = RateBroadcaster(history_size=2)
+        ids = []
+        for rate in range(1, 5):
+            stream.publish({'USD': {'EUR': rate}})
+            ids.append(stream.version)
+
+        with stream._cond:
+            assert [f.split(b'\n')[0] for f in stream.frames_after(ids[1])] == [
+                f'id: {ids[2]}'.encode(), f'id: {ids[3]}'.encode()]
+            assert stream.frames_after(ids[3]) == []
+            snapshot = stream.frames_after(ids[0])
+        assert snapshot[0].startswith(f'id: {ids[3]}\nevent: snapshot\n'.encode())
+        payload = json.loads(snapshot[0].split(b'data: ')[1])
+        assert payload['rates'] == {'USD': {'EUR': 4}}
+
+    def test_event_ids_agree_across_processes(self):
+        from services.rate_stream import RateBroadcaster
+
+        # Two workers that reached the same rates by different paths
+        first, second = RateBroadcaster(), RateBroadcaster()
+        first.publish({'USD': {'EUR': 0.91}})
+        first.publish({'USD': {'EUR': 0.92, 'KES': 157.8}})
+        second.publish({'USD': {'KES': 157.8, 'EUR': 0.92}})
+        assert first.version == second.version
+
+        # An ID the other worker never saw as a base gets a full snapshot, not its deltas
+        stale = RateBroadcaster()
+        stale.publish({'USD': {'EUR': 0.5}})
+        with first._cond:
+            frames = first.frames_after(stale.version)
+        assert b'event: snapshot' in frames[0]
+        with second._cond:
+            assert second.frames_after(first.version) == []
+
+    def test_same_rates_publish_nothing(self):
+        from services.rate_stream import RateBroadcaster
+
+        stream = RateBroadcaster()
+        stream.publish({'USD': {'EUR': 0.92}})
+        stream.publish({'USD': {'EUR': 0.92}})
+        assert stream._history == []
+
+    def test_subscriber_cap(self):
+        from services.rate_stream import RateBroadcaster
+
+        stream = RateBroadcaster(max_subscribers=1)
+        stream.publish({'USD': {'EUR': 0.92}})
+        assert not stream.full
+        subscriber = stream.subscribe()
+        next(subscriber)
+        assert stream.full
+        subscriber.close()
+        assert not stream.full
+
+    def test_idle_subscriber_gets_heartbeat(self):
+        from services.rate_stream import RateBroadcaster, HEARTBEAT_FRAME
+
+        stream = RateBroadcaster(heartbeat=0.01)
+        stream.publish({'USD': {'EUR': 0.92}})
+        subscriber = stream.subscribe(last_version=stream.version)
+        next(subscriber)
+        assert next(subscriber) == HEARTBEAT_FRAME
+        subscriber.close()
+
+class TestPairRates:
+    def test_planner_routes_every_pair(self):
+        from services.conversion_graph import ConversionPlanner
+
+        rates = {'USD': {'EUR': 0.8, 'KES': 160.0, 'NGN': 800.0}, 'EUR': {'USD': 1.25, 'NGN': 1000.0}}
+        planner = ConversionPlanner().rebuild(rates, version=7)
+
+        assert planner.route('USD', 'EUR') == (0.8, ('USD', 'EUR'), 'cache')
+        assert planner.route('NGN', 'USD') == (1 / 800.0, ('NGN', 'USD'), 'derived')
+        kes_ngn = planner.route('KES', 'NGN')
+        assert kes_ngn.path == ('KES', 'USD', 'NGN') and kes_ngn.rate == pytest.approx(5.0)
+        assert planner.route('NGN', 'XYZ') is None
+        assert len(planner) == 4 * 3 and planner.version == 7
+
+    def test_planner_takes_a_detour_only_when_it_beats_the_spreads(self):
+        from services.conversion_graph import ConversionPlanner
+
+        # EUR->GBP is quoted 2% below what EUR->USD->GBP delivers
+        rates = {'USD': {'EUR': 0.9, 'GBP': 0.8}, 'EUR': {'GBP': 0.8711}}
+        assert ConversionPlanner().rebuild(rates).route('EUR', 'GBP').path == ('EUR', 'USD', 'GBP')
+        rates['EUR']['GBP'] = 0.8880
+        assert ConversionPlanner().rebuild(rates).route('EUR', 'GBP').path == ('EUR', 'GBP')
+
+    def test_lru_evicts_and_resets_on_new_version(self):
+        from services.rate_lookup import PairRateCache
+
+        cache = PairRateCache(max_pairs=2)
+        assert cache.get(('A', 'B'), 1) is None
+        cache.put(('A', 'B'), 1, 2.0)
+        cache.put(('A', 'C'), 1, 3.0)
+        cache.get(('A', 'B'), 1)
+        cache.put(('A', 'D'), 1, 4.0)
+
+        assert cache.get(('A', 'C'), 1) is None
+        assert cache.get(('A', 'B'), 1) == 2.0
+        assert cache.get(('A', 'B'), 2) is None
+        assert len(cache) == 0
+
+class TestIdGenerator:
+    def test_ids_are_monotonic_and_time_sortable(self):
+        from services.id_generator import IdGenerator, MAX_SEQUENCE, decode, id_timestamp
+
+        clock = iter([1_750_000_000.000] * (MAX_SEQUENCE + 2) + [1_749_999_999.0, 1_750_000_001.0, 1_750_000_002.0])
+        generator = IdGenerator(worker_id=5, clock=lambda: next(clock))
+        ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 4)]
+
+        assert ids == sorted(ids) and len(set(ids)) == len(ids)
+        assert all(len(i) == 13 for i in ids)
+        assert all((decode(i) >> 12) & 1023 == 5 for i in ids)
+        # 4096 IDs in one millisecond, then the clock stepping back, borrow the next millisecond
+        assert id_timestamp(ids[MAX_SEQUENCE + 1]) == id_timestamp(ids[MAX_SEQUENCE + 2]) == 1_750_000_000.001
+        assert id_timestamp(ids[-1]) == 1_750_000_001.0
+        assert generator.next_tracking_number().startswith('RM')
+
+    @pytest.fixture
+    def leases(self, tmp_path):
+        from sqlalchemy import create_engine
+        from models.worker_lease import WorkerLease
+        from services.id_generator import WorkerLeases
+
+        # A file database: every process and host on it sees the same leases
+        engine = create_engine(f"sqlite:///{tmp_path / 'leases.db'}")
+        WorkerLease.__table__.create(engine)
+        yield WorkerLeases(engine)
+        engine.dispose()
+
+    def lease_rows(self, leases):
+        from sqlalchemy import select
+        from models.worker_lease import WorkerLease
+
+        with leases.engine.connect() as connection:
+            return {row.slot: row for row in connection.execute(select(WorkerLease.__table__))}
+
+    def test_processes_lease_distinct_worker_ids(self, leases):
+        from datetime import timedelta
+        from sqlalchemy import update
+        from models.worker_lease import WorkerLease
+        from services.id_generator import IdGenerator
+
+        first, second = IdGenerator(leases=leases), IdGenerator(leases=leases)
+        assert (first.worker_id, second.worker_id) == (0, 1)
+        assert self.lease_rows(leases)[1].holder == second._holder
+
+        # A crashed holder's slot is taken over once its lease runs out
+        with leases.engine.begin() as connection:
+            connection.execute(update(WorkerLease.__table__).where(WorkerLease.slot == 0)
+                               .values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        assert IdGenerator(leases=leases).worker_id == 0
+
+        second.release()
+        assert 1 not in self.lease_rows(leases)
+        assert IdGenerator(leases=leases).worker_id == 1
+        with pytest.raises(ValueError):
+            IdGenerator(worker_id=1024)
+
+    def test_leases_renew_before_they_run_out(self, leases):
+        from datetime import timedelta
+        from services.id_generator import IdGenerator
+
+        generator = IdGenerator(leases=leases)
+        generator.next_id()
+        expires = self.lease_rows(leases)[0].expires_at
+        generator.maintain()
+        assert self.lease_rows(leases)[0].expires_at == expires  # not half way through yet
+
+        generator._lease_expires = datetime.utcnow() + timedelta(seconds=leases.ttl / 2 - 1)
+        generator.maintain()
+        assert self.lease_rows(leases)[0].expires_at > expires
+        assert generator.worker_id == 0
+
+    def test_requests_lease_before_their_transaction(self, tmp_path, fallback_rates):
+        from sqlalchemy import select
+        from app import create_app
+        from models.database import db
+        from models.worker_lease import WorkerLease
+        from services.id_generator import TRANSFER_IDS
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}", 'RATE_HISTORY_DIR': ''})
+        assert app.test_cli_runner().invoke(args=['init-db']).exit_code == 0
+        response = app.test_client().post('/api/transfer', json={
+            'sender': {'name': 'Ada', 'country': 'GB'}, 'recipient': {'name': 'Kofi', 'country': 'GH'},
+            'amount': 100, 'fromCurrency': 'GBP', 'toCurrency': 'GHS'})
+
+        assert response.status_code == 201
+        with app.app_context():
+            leases = db.session.execute(select(WorkerLease)).scalars().all()
+        assert [(lease.slot, lease.holder) for lease in leases] == [(0, TRANSFER_IDS._holder)]
+        TRANSFER_IDS.release()
+
+    def test_fixed_worker_id_is_not_shared(self, leases, monkeypatch):
+        from services.id_generator import IdGenerator, WorkerIdUnavailable
+
+        parent = IdGenerator(worker_id=7, leases=leases)
+        assert parent.worker_id == 7
+
+        # Another dyno with the same ID_WORKER_ID
+        with pytest.raises(WorkerIdUnavailable, match='worker ID 7 is leased'):
+            IdGenerator(worker_id=7, leases=leases).next_id()
+        # A forked gunicorn worker inheriting it
+        monkeypatch.setattr(os, 'getpid', lambda: 999_999)
+        with pytest.raises(WorkerIdUnavailable):
+            parent.next_id()
+
+
+class TestTransferStore:
+    def record(self, transfer_id):
+        from services.transfer_store import TRANSFER_FIELDS, TransferRecord
+
+        return TransferRecord(**dict(dict.fromkeys(TRANSFER_FIELDS), id=transfer_id))
+
+    def test_ring_evicts_oldest_and_lists_newest_first(self):
+        from services.transfer_store import TransferStore
+
+        store = TransferStore(capacity=3)
+        assert store.recent() == []
+        for transfer_id in 'abcde':
+            store.add(self.record(transfer_id))
+
+        assert len(store) == 3
+        assert [r.id for r in store.recent()] == ['e', 'd', 'c']
+        assert [r.id for r in store.recent(2)] == ['e', 'd']
+        assert store.get('c').id == 'c' and store.get('a') is None
+        assert store.get('e').to_dict()['id'] == 'e'
+        with pytest.raises(AttributeError):
+            store.get('e').extra = 1
+        with pytest.raises(ValueError):
+            store.configure(0)
+
+
+class TestRateQuotes:
+    def test_ids_are_signed_and_expire(self):
+        from services.rate_quotes import QuoteBook, QuoteError, QuoteUnavailable
+
+        book = QuoteBook('secret', ttl=60)
+        quote_id, quote = book.issue('USD', 'KES', 157.8, now=1_000_000)
+        body = quote_id.partition('.')[0]
+
+        assert book.verify(quote_id, now=1_000_059) == body == quote.id
+        with pytest.raises(QuoteUnavailable):
+            book.verify(quote_id, now=1_000_060)
+        flipped = ('B' if quote_id[0] == 'A' else 'A') + quote_id[1:]
+        for bad in (body, body + '.x', flipped, quote_id + 'A'):
+            with pytest.raises(QuoteError):
+                book.verify(bad, now=1_000_000)
+        with pytest.raises(QuoteError):
+            QuoteBook('other', ttl=60).verify(quote_id, now=1_000_000)
+
+        assert book.take(body) is quote
+        assert book.take(body) is None
+
+    def test_expired_and_excess_quotes_are_swept(self):
+        from services.rate_quotes import QuoteBook
+
+        book = QuoteBook('secret', ttl=60, max_quotes=3)
+        for now in range(5):
+            book.issue('USD', 'KES', 157.8, now=1_000_000 + now)
+        assert len(book) == 3
+
+        book.issue('USD', 'KES', 157.8, now=1_000_100)
+        assert len(book) == 1
+
+class TestRateTTL:
+    def test_ttl_follows_volatility(self):
+        from services.rate_ttl import VolatilityTracker
+
+        tracker = VolatilityTracker(min_ttl=60, max_ttl=3600, default_ttl=300, tolerance=0.001)
+        for step in range(10):
+            # NGN moves 1% every 5 minutes, XOF not at all
+            tracker.observe({'USD': {'NGN': 800 * 1.01 ** (step % 2), 'XOF': 600.0},
+                             'EUR': {'USD': 1.1}}, timestamp=step * 300)
+
+        assert tracker.ttl('NGN') == 60
+        assert tracker.ttl('XOF') == 3600
+        assert tracker.ttl('KES') == 300
+
+    def test_moderate_volatility_lands_between_bounds(self):
+        from services.rate_ttl import VolatilityTracker
+
+        tracker = VolatilityTracker(min_ttl=60, max_ttl=3600, tolerance=0.001)
+        tracker.observe({'USD': {'GHS': 12.0}}, timestamp=0)
+        # A 0.1% move over 10 minutes -> sigma^2 * t reaches 0.1%^2 after 10 minutes
+        tracker.observe({'USD': {'GHS': 12.0 * math.exp(0.001)}}, timestamp=600)
+
+        assert tracker.ttl('GHS') == pytest.approx(600)
+
+class TestFeeSchedule:
+    SCHEDULE = {
+        'version': 't1',
+        'default': [
+            {'up_to': 100, 'flat': 2.99},
+            {'up_to': None, 'percent': 1.0},
+        ],
+        'corridors': {
+            'USD-NGN': [{'up_to': None, 'flat': 1.0, 'percent': 0.5, 'max': 10}],
+            '*-KES': [{'up_to': None, 'flat': 0.99}],
+        },
+    }
+
+    def test_default_schedule_matches_previous_tiers(self):
+        from app import TransferService
+
+        fees = [TransferService.calculate_fee(a) for a in (50, 100, 100.01, 500, 999, 1000, 2500)]
+        assert fees == [2.99, 2.99, 4.99, 4.99, 7.99, 7.99, 25.0]
+
+    def test_corridor_precedence_and_clamping(self):
+        from services.fee_schedule import FeeSchedule
+
+        schedule = FeeSchedule(self.SCHEDULE)
+        assert schedule.quote(100, 'USD', 'NGN') == 1.5
+        assert schedule.quote(10000, 'USD', 'NGN') == 10
+        assert schedule.quote(5000, 'GBP', 'KES') == 0.99
+        assert schedule.quote(100, 'GBP', 'EUR') == 2.99
+        assert schedule.quote(250, 'GBP', 'EUR') == 2.5
+
+    def test_invalid_schedule_rejected(self):
+        from services.fee_schedule import FeeSchedule, FeeScheduleError
+
+        with pytest.raises(FeeScheduleError):
+            FeeSchedule({'default': [{'up_to': 100, 'flat': 1}]})
+        with pytest.raises(FeeScheduleError):
+            FeeSchedule({'default': [{'up_to': None}], 'corridors': {'USDNGN': [{'up_to': None}]}})
+
+    def test_store_reloads_changed_file_and_keeps_last_good(self, tmp_path):
+        from services.fee_schedule import FeeScheduleStore
+
+        path = tmp_path / 'fees.json'
+        path.write_text(json.dumps(self.SCHEDULE))
+        store = FeeScheduleStore(str(path), check_seconds=0)
+        assert store.current().version == 't1'
+
+        path.write_text(json.dumps(dict(self.SCHEDULE, version='t2')))
+        os.utime(path, ns=(1, 1))
+        assert store.current().version == 't2'
+
+        path.write_text('{not json')
+        os.utime(path, ns=(2, 2))
+        assert store.current().version == 't2'
+
+    def test_revision_follows_content_not_version_label(self):
+        from services.fee_schedule import FeeSchedule
+
+        original = FeeSchedule(self.SCHEDULE)
+        edited = dict(self.SCHEDULE, default=[{'up_to': None, 'flat': 9.99}])
+
+        assert FeeSchedule(edited).version == original.version
+        assert FeeSchedule(edited).revision != original.revision
+        assert FeeSchedule(json.loads(json.dumps(self.SCHEDULE))).revision == original.revision
+
+class TestFeeSimulation:
+    CANDIDATE = {
+        'version': 'flat-3',
+        'default': [{'up_to': None, 'flat': 3.0}],
+        'corridors': {'USD-KES': [{'up_to': None, 'percent': 2.0, 'min': 1.0}]},
+    }
+
+    def test_vector_fees_match_scalar_quotes(self):
+        np = pytest.importorskip('numpy')
+        from services.fee_schedule import FeeSchedule
+        from services.fee_simulation import vector_fees
+
+        schedule = FeeSchedule(TestFeeSchedule.SCHEDULE)
+        amounts = np.array([0.5, 99.99, 100.0, 100.01, 777.77, 12345.67])
+        vector = vector_fees(schedule.default, amounts)
+        assert vector.tolist() == [schedule.quote(a) for a in amounts.tolist()]
+
+    def test_chunks_aggregate_by_corridor_and_band(self):
+        pytest.importorskip('numpy')
+        from services.fee_simulation import simulate_chunks
+
+        pairs = [('USD', 'KES'), ('GBP', 'NGN')]
+        chunks = [
+            [(50.0, 2.99, 0), (600.0, 7.99, 0)],
+            [(2000.0, 20.0, 1), (40.0, 2.99, 0), (75.0, 2.99, -1)],
+        ]
+        report = simulate_chunks(chunks, pairs, {'flat': self.CANDIDATE}, bands=(100, 1000))
+
+        totals = report['totals']
+        assert totals['transfers'] == 4
+        assert totals['current_revenue'] == 33.97
+        # USD-KES: 2% with a 1.00 minimum -> 1.00 + 12.00 + 1.00; GBP-NGN: flat 3.00
+        assert totals['candidates']['flat']['revenue'] == 17.0
+        assert totals['candidates']['flat']['paying_more'] == 1
+
+        by_corridor = {row['corridor']: row for row in report['by_corridor']}
+        assert by_corridor['USD-KES']['transfers'] == 3
+        assert by_corridor['GBP-NGN']['candidates']['flat']['revenue_delta'] == -17.0
+        assert [row['band'] for row in report['by_band']] == ['0-100', '100-1000', '1000+']
+        assert len(report['by_corridor_band']) == 3
+        assert report['skipped'] == 1
+
+class TestRateHistory:
+    DAY = 86400
+    START = 1_700_006_400  # a UTC midnight
+
+    def fill(self, store, days=10, step=900):
+        for i in range(days * self.DAY // step):
+            rate = 1.0 + (i % 97) / 100
+            store.append({'USD': {'EUR': rate, 'KES': 150 + rate}}, ts=self.START + i * step)
+
+    def test_compaction_keeps_daily_ohlc(self):
+        from services.rate_history import RateHistoryStore
+
+        store = RateHistoryStore(raw_days=1, hour_days=3, day_days=0)
+        self.fill(store)
+        end = self.START + 10 * self.DAY
+        before = store.bars('USD', 'EUR', self.START, end, 'day')
+        hourly = store.bars('USD', 'EUR', end - 2 * self.DAY, end, 'hour')
+
+        assert store.compact(now=end) > 0
+        history = store._pairs[('USD', 'EUR')]
+        assert len(history.days) == 7 and len(history.hours) == 48 and len(history.raw) == 96
+        assert store.bars('USD', 'EUR', self.START, end, 'day') == before
+        assert store.bars('USD', 'EUR', end - 2 * self.DAY, end, 'hour') == hourly
+        assert before['t'][0] == self.START and len(before['t']) == 10
+        assert before['h'][0] == max(1.0 + (i % 97) / 100 for i in range(96))
+
+    def test_inverse_pair_and_auto_resolution(self):
+        from services.rate_history import RateHistoryStore
+
+        store = RateHistoryStore()
+        store.append({'USD': {'EUR': 0.8}}, ts=self.START)
+        store.append({'USD': {'EUR': 0.5}}, ts=self.START + 60)
+
+        bars = store.bars('EUR', 'USD', self.START, self.START + 3600)
+        assert bars['resolution'] == 'minute'
+        assert (bars['o'], bars['h'], bars['l'], bars['c']) == ([1.25, 2.0], [1.25, 2.0], [1.25, 2.0], [1.25, 2.0])
+        assert store.bars('USD', 'EUR', self.START, self.START + 365 * self.DAY)['resolution'] == 'day'
+        assert store.bars('USD', 'GBP', self.START, self.START + 60) is None
+
+    def test_files_shared_between_processes(self, tmp_path):
+        from services.rate_history import RateHistoryStore
+
+        writer = RateHistoryStore(str(tmp_path), raw_days=1, hour_days=3)
+        reader = RateHistoryStore(str(tmp_path), raw_days=1, hour_days=3)
+        self.fill(writer, days=5)
+        end = self.START + 5 * self.DAY
+        expected = writer.bars('USD', 'KES', self.START, end, 'day')
+
+        assert reader.bars('USD', 'KES', self.START, end, 'day') == expected
+        writer.compact(now=end)
+        assert reader._generation == 0
+        assert reader.bars('USD', 'KES', self.START, end, 'day') == expected
+        assert reader._generation == 1
+
+        # A torn record is ignored, then overwritten by the next append
+        with open(tmp_path / 'raw.log', 'ab') as f:
+            f.write(b'\x00\x01\x02')
+        assert reader.bars('USD', 'KES', self.START, end, 'day') == expected
+        writer.append({'USD': {'KES': 999.0}}, ts=end + 10)
+        assert reader.bars('USD', 'KES', end, end + 60, 'minute')['c'] == [999.0]
+        assert RateHistoryStore(str(tmp_path)).bars('USD', 'KES', self.START, end, 'day') == expected
+
+    def test_snapshots_are_written_off_the_request_thread(self, tmp_path):
+        import fcntl
+        import time
+        from app import create_app
+        from services.rate_history import rate_history, record_snapshot
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RATE_HISTORY_DIR': str(tmp_path)})
+        other = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'RATE_HISTORY_DIR': ''})
+        assert rate_history(app) is not rate_history(other)
+
+        with open(tmp_path / 'lock', 'a') as lock_file:
+            # Another worker holds the file lock (say, mid-compaction)
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with app.app_context():
+                started = time.perf_counter()
+                record_snapshot({'USD': {'EUR': 0.9}})
+                assert time.perf_counter() - started < 0.5
+            time.sleep(0.05)
+            assert not (tmp_path / 'raw.log').exists()
+        app.extensions['rate_history_writer'].flush()
+
+        assert (tmp_path / 'raw.log').stat().st_size > 0
+        assert rate_history(app).bars('USD', 'EUR', 0, time.time() + 60)['c'] == [0.9]
+        assert rate_history(other).pairs() == []
+        record_snapshot({'USD': {'EUR': 0.8}})  # no app context: nothing to record in
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import { apiService, applyRateDelta } from '../services/api';
 
 const ExchangeRates = () => {
   const [rates, setRates] = useState({});
@@ -16,6 +17,16 @@ const ExchangeRates = () => {
 
   useEffect(() => {
     fetchExchangeRatesFromBackend();
+
+    // After the initial load, the server pushes only the pairs that change
+    const unsubscribe = apiService.subscribeToRates({
+      onSnapshot: (data) => {
+        setRates(data.rates);
+        setDataSource('live');
+      },
+      onDelta: (delta) => setRates((current) => applyRateDelta(current, delta)),
+    });
+    return unsubscribe;
   }, []);
 
   const fetchExchangeRatesFromBackend = async () => {
@@ -23,21 +34,11 @@ const ExchangeRates = () => {
       setLoading(true);
       setError(null);
 
-      const response = await fetch('https://remitlite-12.onrender.com/api/exchange-rates', {
-        method: 'GET',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-      });
-
-      if (response.ok) {
-        const data = await response.json();
-        console.log('Exchange rates from backend:', data);
-        setRates(data.rates || data);
-        setDataSource(data.source || 'live');
-      } else {
-        throw new Error('Failed to fetch rates from backend');
-      }
+      // Shares the page's single /bootstrap request with the send form; the
+      // browser revalidates it with If-None-Match, so unchanged rates cost a 304
+      const data = await apiService.getBootstrap();
+      setRates(data.rates);
+      setDataSource(data.source || 'live');
     } catch (err) {
       console.error('Error fetching from backend:', err);
       setError('Unable to fetch live rates. Using reference rates.');
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import { apiService, rateFromSnapshot, feeFromSchedule } from '../services/api';
 
 const SendMoneyForm = ({ user, onTransactionComplete }) => {
   const [formData, setFormData] = useState({
@@ -17,6 +18,7 @@ const SendMoneyForm = ({ user, onTransactionComplete }) => {
   const [estimatedDelivery, setEstimatedDelivery] = useState('');
   const [convertedAmount, setConvertedAmount] = useState(0);
   const [error, setError] = useState(null);
+  const [feeSchedule, setFeeSchedule] = useState(null);
 
   useEffect(() => {
     if (formData.fromCurrency && formData.toCurrency && formData.fromCurrency !== formData.toCurrency) {
@@ -37,23 +39,22 @@ const SendMoneyForm = ({ user, onTransactionComplete }) => {
       setFee(0);
       setEstimatedDelivery('');
     }
-  }, [formData.amount, exchangeRate]);
+  }, [formData.amount, exchangeRate, feeSchedule]);
 
   const fetchExchangeRate = async () => {
     try {
       setRateLoading(true);
       setError(null);
 
-      const response = await fetch(
-        `https://remitlite-12.onrender.com/api/convert-rate?from=${formData.fromCurrency}&to=${formData.toCurrency}&amount=1`
-      );
-
-      if (response.ok) {
-        const data = await response.json();
-        setExchangeRate(data.rate);
-      } else {
-        throw new Error('Failed to fetch exchange rate');
+      // Converted locally from the shared bootstrap snapshot instead of a
+      // /convert-rate round trip per currency change
+      const bootstrap = await apiService.getBootstrap();
+      setFeeSchedule(bootstrap.fee_schedule);
+      const rate = rateFromSnapshot(bootstrap.rates, formData.fromCurrency, formData.toCurrency);
+      if (!rate) {
+        throw new Error(`No rate for ${formData.fromCurrency}-${formData.toCurrency}`);
       }
+      setExchangeRate(rate);
     } catch (err) {
       console.error('Error fetching exchange rate:', err);
       setError('Using reference exchange rate');
@@ -77,8 +78,10 @@ const SendMoneyForm = ({ user, onTransactionComplete }) => {
   };
 
   const calculateFeeAndDelivery = (amount) => {
-    // Calculate fee (1.5% of amount, minimum $2, maximum $15)
-    const calculatedFee = Math.min(Math.max(amount * 0.015, 2), 15);
+    // Server fee schedule when loaded, otherwise 1.5% of amount (minimum $2, maximum $15)
+    const calculatedFee = feeSchedule
+      ? feeFromSchedule(feeSchedule, amount, formData.fromCurrency, formData.toCurrency)
+      : Math.min(Math.max(amount * 0.015, 2), 15);
     setFee(calculatedFee);
 
     // Estimate delivery time based on currencies
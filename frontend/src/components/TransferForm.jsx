@@ -38,7 +38,8 @@ const TransferForm = () => {
       const conversionResult = await apiService.convertAmount(
         parseFloat(formData.amount),
         formData.fromCurrency,
-        formData.toCurrency
+        formData.toCurrency,
+        true
       );
       setConversion(conversionResult);
 
@@ -67,6 +68,7 @@ const TransferForm = () => {
         amount: parseFloat(formData.amount),
         convertedAmount: conversion.convertedAmount,
         exchangeRate: conversion.rate,
+        quoteId: conversion.quoteId,
         fee: estimate?.fee || 0,
         deliveryTime: estimate?.deliveryTime || '1-2 business days'
       };
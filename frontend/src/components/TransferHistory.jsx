@@ -1,23 +1,43 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { apiService } from '../services/api';
 
+const SYNC_INTERVAL_MS = 15000;
+
+// Merge a delta into the list by id; changed transfers replace their old copy
+const mergeTransfers = (current, changes) => {
+  const byId = new Map(current.map((transfer) => [transfer.id, transfer]));
+  changes.forEach((transfer) => byId.set(transfer.id, transfer));
+  return [...byId.values()].sort((a, b) => String(b.created_at).localeCompare(String(a.created_at)));
+};
+
 const TransferHistory = () => {
   const [transfers, setTransfers] = useState([]);
   const [loading, setLoading] = useState(true);
+  const version = useRef(0);
 
   useEffect(() => {
     loadTransfers();
+    // Polls are cheap: an unchanged history costs the server one lookup
+    const timer = setInterval(loadTransfers, SYNC_INTERVAL_MS);
+    return () => clearInterval(timer);
   }, []);
 
   const loadTransfers = async () => {
     try {
-      const data = await apiService.getTransfers();
-      setTransfers(data.transfers || []);
+      const data = await apiService.syncTransfers(version.current);
+      version.current = data.version;
+      if (data.full) {
+        setTransfers(mergeTransfers([], data.transfers));
+      } else if (data.transfers.length) {
+        setTransfers((current) => mergeTransfers(current, data.transfers));
+      }
     } catch (error) {
       console.error('Error loading transfers:', error);
       // Fallback to local storage if API fails
-      const localTransfers = JSON.parse(localStorage.getItem('remitlite-transfers') || '[]');
-      setTransfers(localTransfers);
+      if (version.current === 0) {
+        const localTransfers = JSON.parse(localStorage.getItem('remitlite-transfers') || '[]');
+        setTransfers(localTransfers);
+      }
     } finally {
       setLoading(false);
     }
@@ -38,20 +58,20 @@ const TransferHistory = () => {
       ) : (
         <div className="space-y-4">
           {transfers.map((transfer, index) => (
-            <div key={index} className="p-4 border rounded-lg bg-white shadow-sm">
+            <div key={transfer.id || index} className="p-4 border rounded-lg bg-white shadow-sm">
               <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
                 <div>
                   <p className="text-sm text-gray-500">Sender</p>
-                  <p className="font-medium">{transfer.senderName}</p>
+                  <p className="font-medium">{transfer.sender?.name ?? transfer.senderName}</p>
                 </div>
                 <div>
                   <p className="text-sm text-gray-500">Recipient</p>
-                  <p className="font-medium">{transfer.recipientName}</p>
+                  <p className="font-medium">{transfer.recipient?.name ?? transfer.recipientName}</p>
                 </div>
                 <div>
                   <p className="text-sm text-gray-500">Amount</p>
                   <p className="font-medium">
-                    {transfer.amount} {transfer.fromCurrency} → {transfer.convertedAmount} {transfer.toCurrency}
+                    {transfer.amount} {transfer.from_currency ?? transfer.fromCurrency} → {transfer.converted_amount ?? transfer.convertedAmount} {transfer.to_currency ?? transfer.toCurrency}
                   </p>
                 </div>
                 <div>
@@ -61,7 +81,7 @@ const TransferHistory = () => {
               </div>
               {transfer.fee && (
                 <div className="mt-2 text-sm text-gray-600">
-                  Fee: ${transfer.fee} • Delivery: {transfer.deliveryTime}
+                  Fee: ${transfer.fee} • Delivery: {transfer.delivery_time ?? transfer.deliveryTime}
                 </div>
               )}
             </div>
@@ -1,6 +1,47 @@
 const API_BASE = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5000/api';
+// The rate stream is served by its own gevent process in production (`stream` in the Procfile)
+const STREAM_BASE = import.meta.env.VITE_STREAM_BASE_URL || API_BASE;
 
 class ApiService {
+  constructor() {
+    this.bootstrapRequest = null;
+  }
+
+  // Currencies, the rate snapshot (with its version), fee schedule and delivery
+  // times in one response. Components share a single in-flight request; once the
+  // snapshot expires the next call refetches, and the browser revalidates with
+  // If-None-Match so an unchanged snapshot costs a 304.
+  async getBootstrap() {
+    const current = this.bootstrapRequest;
+    if (current) {
+      const data = await current.catch(() => null);
+      if (data && new Date(data.rates_expire_at) > new Date()) {
+        return data;
+      }
+    }
+    this.bootstrapRequest = fetch(`${API_BASE}/bootstrap`).then((response) => {
+      if (!response.ok) {
+        throw new Error('Failed to load bootstrap data');
+      }
+      return response.json();
+    });
+    return this.bootstrapRequest;
+  }
+
+  // Live rate updates over server-sent events. onSnapshot gets the full rate
+  // table; onDelta gets { version, changed, removed } with only the pairs that
+  // moved. EventSource reconnects on its own and resumes via Last-Event-ID,
+  // on any stream process: event IDs are hashes of the rate table.
+  subscribeToRates({ onSnapshot, onDelta, onError }) {
+    const source = new EventSource(`${STREAM_BASE}/rates/stream`);
+    source.addEventListener('snapshot', (event) => onSnapshot(JSON.parse(event.data)));
+    source.addEventListener('rates', (event) => onDelta(JSON.parse(event.data)));
+    if (onError) {
+      source.onerror = onError;
+    }
+    return () => source.close();
+  }
+
   async getHealth() {
     const response = await fetch(`${API_BASE}/health`);
     return response.json();
@@ -11,7 +52,8 @@ class ApiService {
     return response.json();
   }
 
-  async convertAmount(amount, fromCurrency, toCurrency) {
+  // lock: also issue a quote ID that a transfer can redeem at this rate
+  async convertAmount(amount, fromCurrency, toCurrency, lock = false) {
     const response = await fetch(`${API_BASE}/convert`, {
       method: 'POST',
       headers: {
@@ -20,7 +62,8 @@ class ApiService {
       body: JSON.stringify({
         amount,
         fromCurrency,
-        toCurrency
+        toCurrency,
+        lock
       })
     });
     return response.json();
@@ -51,10 +94,66 @@ class ApiService {
     return response.json();
   }
 
-  async getTransfers() {
-    const response = await fetch(`${API_BASE}/transfers`);
+  // fields: optional list such as ['id', 'amount', 'sender.name'] to fetch a slimmer payload
+  async getTransfers(fields) {
+    const query = fields && fields.length ? `?fields=${encodeURIComponent(fields.join(','))}` : '';
+    const response = await fetch(`${API_BASE}/transfers${query}`);
+    return response.json();
+  }
+
+  // Delta sync: transfers created or changed after `since` (0 = everything),
+  // plus the new `version` to send next time. `full` means replace, not merge.
+  async syncTransfers(since = 0, fields) {
+    const params = new URLSearchParams({ since: String(since) });
+    if (fields && fields.length) params.set('fields', fields.join(','));
+    const response = await fetch(`${API_BASE}/transfers?${params}`);
     return response.json();
   }
 }
 
+// Rate between two currencies from a bootstrap snapshot: direct when the
+// snapshot has `from` as a base, otherwise crossed through a base that quotes both
+export function rateFromSnapshot(rates, fromCurrency, toCurrency) {
+  if (fromCurrency === toCurrency) return 1;
+  if (rates[fromCurrency]?.[toCurrency]) return rates[fromCurrency][toCurrency];
+  for (const base of Object.keys(rates)) {
+    const quotes = rates[base];
+    if (quotes[fromCurrency] && quotes[toCurrency]) {
+      return quotes[toCurrency] / quotes[fromCurrency];
+    }
+  }
+  return null;
+}
+
+// Apply a stream delta to a { base: { quote: rate } } table without mutating it
+export function applyRateDelta(rates, { changed, removed }) {
+  const next = { ...rates };
+  for (const [base, quotes] of Object.entries(changed)) {
+    next[base] = { ...next[base], ...quotes };
+  }
+  for (const [base, quote] of removed) {
+    if (next[base]) {
+      next[base] = { ...next[base] };
+      delete next[base][quote];
+    }
+  }
+  return next;
+}
+
+// Same rules the server applies (services/fee_schedule.py): pick the corridor's
+// brackets, the first bracket whose up_to covers the amount, then
+// flat + percent, clamped to min/max and rounded to cents
+export function feeFromSchedule(schedule, amount, fromCurrency, toCurrency) {
+  const corridors = schedule.corridors || {};
+  const brackets = corridors[`${fromCurrency}-${toCurrency}`]
+    || corridors[`${fromCurrency}-*`]
+    || corridors[`*-${toCurrency}`]
+    || schedule.default;
+  const sorted = [...brackets].sort((a, b) => (a.up_to ?? Infinity) - (b.up_to ?? Infinity));
+  const bracket = sorted.find((b) => b.up_to === null || b.up_to === undefined || amount <= b.up_to);
+  const fee = (bracket.flat || 0) + amount * (bracket.percent || 0) / 100;
+  const clamped = Math.min(Math.max(fee, bracket.min || 0), bracket.max ?? Infinity);
+  return Math.round(clamped * 100) / 100;
+}
+
 export const apiService = new ApiService();
\ No newline at end of file